@@ -7,8 +7,11 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if BASE_DIR not in sys.path:
     sys.path.append(BASE_DIR)
 
-# ========== 📦 标准库导入 ==========
-from datetime import timedelta
+# ✅ 附件目录：默认为项目根目录下的 attachments/，可通过环境变量覆盖（压测 / 本地调试使用）
+ATTACHMENTS_DIR = os.environ.get("DASHBOARD_ATTACHMENTS_DIR") or os.path.join(BASE_DIR, "attachments")
+
+# ✅ 数据后端：memory（默认，内存 DataFrame）/ sqlite（本地 SQLite，筛选与分组下推为 SQL）
+DATA_BACKEND = os.environ.get("DASHBOARD_BACKEND", "memory")
 
 # ========== 🔧 第三方库 ==========
 import streamlit as st
@@ -26,17 +29,25 @@ st.title("🎮 游戏渠道数据分析仪表盘")
 
 # ========== 📁 侧边栏：上传数据文件 ==========
 st.sidebar.header("📁 数据源设置")
-uploaded_file = st.sidebar.file_uploader("上传 Excel 文件", type=["xlsx"])
+uploaded_files = st.sidebar.file_uploader(
+    "上传 Excel 文件（支持多选 / zip 批量）", type=["xlsx", "zip"], accept_multiple_files=True
+)
 
 # ✅ 引入使用封装好的excel附件导入模块
-from config.attachments_loader import load_data  # 🆕 模块封装版本
+from config.attachments_loader import load_backend  # 🆕 模块封装版本（返回统一查询后端）
 
-df = load_data(uploaded_file, BASE_DIR)
+backend = load_backend(uploaded_files, BASE_DIR, attachments_dir=ATTACHMENTS_DIR, backend=DATA_BACKEND)
 
 # ✅ 若数据加载失败，则终止后续执行
-if df is None:
+if backend is None:
     st.stop()
 
+# ✅ 经 management_tools/serve.py 启动时，显示服务进程启动预热的耗时与数据来源
+from config.warm_start import WARM_REPORT
+
+if WARM_REPORT:
+    st.sidebar.caption(f"♨️ 启动预热 {WARM_REPORT['seconds']:.1f} 秒（{WARM_REPORT['source']}）")
+
 
 # ========== 🧭 图表渲染方式设置（v1 / v2） ==========
 st.sidebar.header("🧭 图表显示设置")
@@ -53,122 +64,293 @@ draw_bar_chart = charts["draw_bar_chart"]
 apply_chinese_font = charts["apply_chinese_font"]
 render_info_card = charts["render_info_card"]  # ✅ 统一从封装中取，避免主程序判断
 
-# ✅ 无有效数据则终止执行
-if df is None:
-    st.stop()
-
 
-# ========== 🧹 数据预处理 ==========
-# ✅ 转换日期列为 datetime 类型
-if "dt" in df.columns:
-    df["dt"] = pd.to_datetime(df["dt"])
-else:
-    st.error("❌ Excel 中必须包含 'dt' 列（日期）")
-    st.stop()
+# ========== 🧹 数据准备 ==========
+# ✅ 日期范围：预设 / 自定义区间，并自动计算紧邻的上一等长周期（环比）
+from config.date_range import render_date_range_picker, format_range
 
-# ✅ 获取“今天”与“近7日”的起始日期
-today = df["dt"].max()
-seven_days_ago = today - timedelta(days=6)
+start, end, prev_start, prev_end = render_date_range_picker(backend.min_date(), backend.max_date())
+period_days = (end - start).days + 1
+period_text = format_range(start, end)
+delta_label = "前一日" if period_days == 1 else "上期"
 
-# ✅ 筛选近7日数据
-df_7d = df[df["dt"] >= seven_days_ago]
+# ✅ 分层保留（DASHBOARD_RAW_DAYS）：较早日期只有按日汇总，商户级图表只覆盖明细范围
+detail_start = backend.detail_start()
+if start < detail_start:
+    st.caption(f"🧊 {detail_start:%Y-%m-%d} 之前的日期只保留按日汇总：活跃商户数为 HyperLogLog 估算值（误差约 3%），"
+               f"商户排行 / 留存 / 商户异常仅统计 {detail_start:%Y-%m-%d} 起的明细")
 
 
 # ========== 🎮 游戏筛选器 ==========
-game_list = sorted(df["游戏名称"].unique())
+game_list = backend.game_list()
 selected_games = st.multiselect("选择要展示的游戏", game_list, default=game_list)
 
-# ✅ 根据选择结果筛选数据
-filtered_df = df[df["游戏名称"].isin(selected_games)]
-filtered_df_7d = df_7d[df_7d["游戏名称"].isin(selected_games)]
+# ✅ 导出：各卡片 / 图表的汇总表 + 当前筛选下的明细（点击下载时才按块读取后端）
+from config.export import detail_rows, range_suffix, render_export
+
+export_suffix = range_suffix(start, end)
+export_rows = detail_rows(backend, start, end, selected_games)
 
 # ========== 🧮 图 1：数据概览（卡片样式-数组） ==========
 st.subheader("📌 数据概览")
 
 from config.card_renderer import render_card  # ✅ 卡片渲染封装器
 
-# ✅ 日期准备
-day_before = today - timedelta(days=1)
-
 # ✅ 创建三列容器
 col1, col2, col3 = st.columns(3)  # 👉 横向一行三卡片展示
 
-# ✅ 图 1.1：活跃商户数
+# ✅ 图 1.1：活跃商户数（区间内去重）
 with col1:
-    active_merchants_yesterday = df[df["dt"] == today]["商户昵称"].nunique()
-    active_merchants_before = df[df["dt"] == day_before]["商户昵称"].nunique()
-    delta_merchants = active_merchants_yesterday - active_merchants_before
+    active_merchants = backend.distinct_count("商户昵称", start=start, end=end)
+    active_merchants_before = backend.distinct_count("商户昵称", start=prev_start, end=prev_end)
+    delta_merchants = active_merchants - active_merchants_before
 
     render_card(
         render_func=charts["render_info_card"],
-        title="活跃商户数（昨日）",
+        title=f"活跃商户数（{period_text}）",
         #subtitle="活跃商户数",
-        value=active_merchants_yesterday,
+        value=active_merchants,
         delta=delta_merchants,
         unit=" 家",
-        color="#1890ff"
+        color="#1890ff",
+        delta_label=delta_label
     )
 
-# ✅ 图 1.2：在售总数
+# ✅ 图 1.2：在售总数（库存是时点值：取区间内最后一个有数据的日期，不逐日求和）
+from config.inventory import stock_total  # ✅ 期末在售（与库存分析口径一致）
 with col2:
-    on_sale_yesterday = df[df["dt"] == today]["在售商品数量"].sum()
-    on_sale_before = df[df["dt"] == day_before]["在售商品数量"].sum()
-    delta_on_sale = on_sale_yesterday - on_sale_before
+    on_sale = stock_total(backend, start, end)
+    on_sale_before = stock_total(backend, prev_start, prev_end)
+    delta_on_sale = on_sale - on_sale_before
 
     render_card(
         render_func=charts["render_info_card"],
-        title="在售总数（昨日）",
+        title=f"在售总数（{period_text}·期末）",
         #subtitle="在售商品数量",
-        value=on_sale_yesterday,
+        value=on_sale,
         delta=delta_on_sale,
         unit=" 件",
-        color="#faad14"
+        color="#faad14",
+        delta_label=delta_label
     )
 
 # ✅ 图 1.3：支付单数
 with col3:
-    paid_orders_yesterday = df[df["dt"] == today]["支付单量"].sum()
-    paid_orders_before = df[df["dt"] == day_before]["支付单量"].sum()
-    delta_paid_orders = paid_orders_yesterday - paid_orders_before
+    paid_orders = backend.metric_sum("支付单量", start=start, end=end)
+    paid_orders_before = backend.metric_sum("支付单量", start=prev_start, end=prev_end)
+    delta_paid_orders = paid_orders - paid_orders_before
 
     render_card(
         render_func=charts["render_info_card"],
-        title="支付单数（昨日）",
+        title=f"支付单数（{period_text}）",
         #subtitle="支付成功订单数",
-        value=paid_orders_yesterday,
+        value=paid_orders,
         delta=delta_paid_orders,
         unit=" 单",
-        color="#13c2c2"
+        color="#13c2c2",
+        delta_label=delta_label
     )
 
+render_export("数据概览", pd.DataFrame({
+    "指标": ["活跃商户数", "在售总数", "支付单数"],
+    "本期": [active_merchants, on_sale, paid_orders],
+    delta_label: [active_merchants_before, on_sale_before, paid_orders_before],
+    "差值": [delta_merchants, delta_on_sale, delta_paid_orders],
+}), key="overview_export", suffix=export_suffix, rows=detail_rows(backend, start, end))     # 概览卡片不受游戏筛选影响
+
 
 # ========== 📈 图表 2：每日支付单量趋势（折线图样式） ==========
 st.subheader("📈 每日支付单量趋势")
-line_data = filtered_df.groupby("dt")["支付单量"].sum().reset_index()
-fig_line = draw_line_chart(line_data)
-st.plotly_chart(fig_line, use_container_width=True, key="line_chart")
+line_data = backend.sum_by("dt", "支付单量", start=start, end=end, games=selected_games)
+# ✅ 上期数据平移 period_days 天，与本期逐日对齐后以虚线叠加
+compare_raw = backend.sum_by("dt", "支付单量", start=prev_start, end=prev_end, games=selected_games)
+compare_data = compare_raw.assign(dt=compare_raw["dt"] + pd.Timedelta(days=period_days))
+if line_data.empty:
+    st.info(f"{period_text} 没有支付数据")
+else:
+    fig_line = draw_line_chart(line_data, max_days=None, compare_df=compare_data)     # 范围由日期选择器决定，不再截断为 30 天
+    st.plotly_chart(fig_line, use_container_width=True, theme=None, key="line_chart")  # theme=None：以项目模板为准
+    render_export("每日支付单量", pd.concat([line_data.assign(期间="本期"), compare_raw.assign(期间=delta_label)],
+                                          ignore_index=True),
+                  key="line_export", suffix=export_suffix, rows=export_rows)
+
+
+# ========== 📊 图表 2.1：订单量 vs 比率（双轴图 + 比率卡片） ==========
+st.subheader("📊 订单量 vs 转化率")
+
+from config.ratios import RATIOS, available_ratios, ratio_by, ratio_total  # ✅ 比率一律由分子、分母之和重新计算
+
+# ✅ 只展示分子、分母均已加载的比率（DASHBOARD_COLUMNS 可能未读取 完结单量）
+ratio_names = available_ratios(backend)
+if not ratio_names:
+    st.info("未加载比率所需的列（见 DASHBOARD_COLUMNS）")
+else:
+    # ✅ 整体比率卡片：本期 vs 上期（差值单位为百分点）
+    ratio_cols = st.columns(len(ratio_names))
+    ratio_cards = []
+    for ratio_col, (name, color) in zip(ratio_cols, zip(ratio_names, ["#52c41a", "#722ed1"])):
+        with ratio_col:
+            current = ratio_total(backend, name, start, end, selected_games)
+            previous = ratio_total(backend, name, prev_start, prev_end, selected_games)
+            ratio_cards.append({"比率": name, "本期": current, delta_label: previous, "差值": current - previous})
+            render_card(
+                render_func=charts["render_info_card"],
+                title=f"{name}（{period_text}）",
+                value=float(f"{current * 100:.3g}"),                    # 保留 3 位有效数字（在售转化率通常远小于 1%）
+                delta=float(f"{(current - previous) * 100:.3g}"),
+                unit="%",
+                color=color,
+                delta_label=delta_label
+            )
+
+    render_export("比率概览", pd.DataFrame(ratio_cards), key="ratio_cards_export", suffix=export_suffix, rows=export_rows)
+
+    ratio_name = st.radio("右轴比率", ratio_names, horizontal=True, key="ratio_metric")
+    ratio_daily = ratio_by(backend, "dt", ratio_name, start, end, selected_games)
+    if ratio_daily.empty:
+        st.info(f"{period_text} 没有订单数据")
+    else:
+        fig_ratio = charts["draw_dual_axis_chart"](ratio_daily, bar_col="支付单量", rate_col=ratio_name)
+        st.plotly_chart(fig_ratio, use_container_width=True, theme=None, key="ratio_chart")
+        render_export(f"每日{ratio_name}", ratio_daily, key="ratio_export", suffix=export_suffix, rows=export_rows)
+        with st.expander(f"按游戏查看{ratio_name}"):
+            st.dataframe(
+                ratio_by(backend, "游戏名称", ratio_name, start, end, selected_games)
+                .sort_values(RATIOS[ratio_name][1], ascending=False, kind="stable"),     # 分母大的游戏在前
+                hide_index=True,
+                use_container_width=True,
+                column_config={ratio_name: st.column_config.NumberColumn(format="percent")},
+            )
 
 
 # ========== 🥧 🥠 图表 3: 横向排列显示 3 个支付占比图表 （饼图样式）==========
 # ✅ 创建横向三列容器
 col1, col2, col3 = st.columns(3)
 
-# ✅ 数据准备：昨天 / 近7日 / 累计
-df_yesterday = filtered_df[filtered_df["dt"] == today]
-pie_yesterday_data = df_yesterday.groupby("游戏名称")["支付单量"].sum().reset_index()
-
-pie_7d_data = filtered_df_7d.groupby("游戏名称")["支付单量"].sum().reset_index()
-pie_all_data = filtered_df.groupby("游戏名称")["支付单量"].sum().reset_index()
+# ✅ 数据准备：本期 / 上期 / 累计（由每日汇总回答，任意区间的代价只与天数 × 游戏数有关）
+pie_period_data = backend.sum_by("游戏名称", "支付单量", start=start, end=end, games=selected_games)
+pie_previous_data = backend.sum_by("游戏名称", "支付单量", start=prev_start, end=prev_end, games=selected_games)
+pie_all_data = backend.sum_by("游戏名称", "支付单量", games=selected_games)
 
 # ✅ 在三列中分别渲染图表（标题 + 图表都放入对应容器）
 with col1:
-    render_pie_chart("🍩 昨日支付", pie_yesterday_data, "pie_chart_yesterday", container=col1, charts=charts)
+    render_pie_chart(f"🍩 本期支付（{period_text}）", pie_period_data, "pie_chart_period", container=col1, charts=charts)
+    render_export("本期支付占比", pie_period_data, key="pie_period_export", suffix=export_suffix, rows=export_rows)
 
 with col2:
-    render_pie_chart("🥧 近7日支付", pie_7d_data, "pie_chart_7d", container=col2, charts=charts)
+    render_pie_chart(f"🥧 上期支付（{format_range(prev_start, prev_end)}）", pie_previous_data, "pie_chart_previous", container=col2, charts=charts)
+    render_export("上期支付占比", pie_previous_data, key="pie_previous_export", suffix=range_suffix(prev_start, prev_end),
+                  rows=detail_rows(backend, prev_start, prev_end, selected_games))
 
 with col3:
     render_pie_chart("🥠 累计支付", pie_all_data, "pie_chart_all", container=col3, charts=charts)
+    render_export("累计支付占比", pie_all_data, key="pie_all_export", rows=detail_rows(backend, games=selected_games))
+
+
+# ========== 🗓️ 图表 3.1：游戏 × 日期热力图（快照中的稠密矩阵切片） ==========
+st.subheader("🗓️ 每日热力图")
+
+# ✅ 换指标 = 换一张 (日期, 游戏) 矩阵，换游戏 = 取列，不在明细上做透视
+heatmap_metric = st.radio("指标", ["支付单量", "在售商品数量"], horizontal=True, key="heatmap_metric")
+heatmap_data = backend.daily_matrix(heatmap_metric, start=start, end=end, games=selected_games)
+if heatmap_data.empty:
+    st.info(f"{period_text} 没有数据")
+else:
+    fig_heatmap = charts["draw_heatmap"](heatmap_data, heatmap_metric, key="game_heatmap")
+    if fig_heatmap is not None:
+        st.plotly_chart(fig_heatmap, use_container_width=True, theme=None, key="game_heatmap")
+    render_export(f"每日{heatmap_metric}热力图", heatmap_data.reset_index(), key="heatmap_export",
+                  suffix=export_suffix, rows=export_rows)
+
+
+# ========== 🚨 图表 4：异常（EWMA z-score，快照生成时对全部序列打分） ==========
+st.subheader("🚨 异常")
+
+anomaly_level = st.radio("级别", ["全部", "游戏", "商户"], horizontal=True, key="anomaly_level")
+anomalies = backend.top_anomalies(
+    start=start, end=end, games=selected_games,
+    level=None if anomaly_level == "全部" else anomaly_level, limit=20,
+)
+if anomalies.empty:
+    st.success(f"{period_text} 未发现异常波动")
+else:
+    st.dataframe(
+        anomalies.assign(dt=anomalies["dt"].dt.strftime("%m/%d")),
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption("z = (当日值 − 基线) / 波动幅度；基线与波动幅度为此前各天的指数加权均值 / 标准差，|z| ≥ 4 视为异常")
+
+
+# ========== 📦 图表 5：库存分析（柱状图 + 指标明细） ==========
+st.subheader("📦 库存分析")
+
+# ✅ 库存占比 / 库存变化 / 售罄率在快照生成时由每日汇总算好，这里只按日期范围与游戏取数
+inventory_data = backend.inventory_by_game(start=start, end=end, games=selected_games)
+if inventory_data.empty:
+    st.info(f"{period_text} 没有库存数据")
+else:
+    st.plotly_chart(draw_bar_chart(inventory_data), use_container_width=True, theme=None, key="inventory_bar_chart")
+    render_export("库存分析", inventory_data, key="inventory_export", suffix=export_suffix, rows=export_rows)
+    st.dataframe(
+        inventory_data,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "库存占比": st.column_config.NumberColumn(format="percent"),
+            "售罄率": st.column_config.NumberColumn(format="percent"),
+        },
+    )
+    st.caption("在售商品数量与库存占比取区间内最后一天；库存变化为区间内“商品数量与昨日差值”之和；售罄率 = 支付单量 / 在售商品数量（区间合计）")
+
+
+# ========== 🏆 图表 6：商户排行榜（服务端分页，只发送当前页） ==========
+st.subheader("🏆 商户排行")
+
+from config.leaderboard import render_leaderboard  # ✅ 区间汇总进程级缓存，切换排序 / 翻页不重算
+
+render_leaderboard(backend, start=start, end=end, games=selected_games)
+
+
+# ========== 👥 图表 7：商户留存（活跃位图按位运算，卡片 + 同期群热力图） ==========
+st.subheader("👥 商户留存")
+
+# ✅ 本期构成以上一等长区间为参照；卡片差值为本期与上期构成之差
+retention = backend.merchant_retention(start=start, end=end, games=selected_games)
+retention_before = backend.merchant_retention(start=prev_start, end=prev_end, games=selected_games)
+retention_cols = st.columns(4)
+retention_names = ["新增", "回流", "留存", "流失"]
+for retention_col, (name, color) in zip(retention_cols, zip(retention_names, ["#52c41a", "#1890ff", "#13c2c2", "#f5222d"])):
+    with retention_col:
+        render_card(
+            render_func=charts["render_info_card"],
+            title=f"{name}商户（{period_text}）",
+            value=retention[name],
+            delta=retention[name] - retention_before[name],
+            unit=" 家",
+            color=color,
+            delta_label=delta_label
+        )
+
+render_export("商户留存", pd.DataFrame({
+    "构成": retention_names,
+    "本期": [retention[n] for n in retention_names],
+    delta_label: [retention_before[n] for n in retention_names],
+}), key="retention_export", suffix=export_suffix, rows=export_rows)
+
+cohorts = backend.retention_cohorts(start=start, end=end, games=selected_games)
+if cohorts.empty:
+    st.info(f"{period_text} 没有商户数据")
+else:
+    st.plotly_chart(charts["draw_cohort_heatmap"](cohorts), use_container_width=True, theme=None, key="cohort_heatmap")
+    render_export("同期群留存", cohorts, key="cohort_export", suffix=export_suffix, rows=export_rows)
+    st.caption("新增：此前从未出现；回流：上期未活跃但更早出现过；流失：上期活跃、本期未活跃。"
+               "热力图每行为当天首次出现的商户，第 N 天留存 = 其中第 N 天仍有数据的比例（数据首日的商户全部计为新增）")
+
 
+# ========== 🔍 图表 8：商户明细（搜索 + 单商户走势） ==========
+st.subheader("🔍 商户明细")
 
+from config.merchant_view import render_merchant_drilldown  # ✅ 商户检索与明细由后端索引回答
 
+render_merchant_drilldown(backend, start=start, end=end, games=selected_games)
@@ -0,0 +1,208 @@
+# 异常检测：对全部（游戏）与（商户, 游戏）逐日序列做向量化 EWMA z-score，新的一天到来时增量更新
+
+# config/anomaly.py
+
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+ANOMALY_METRICS = ["支付单量", "在售商品数量"]
+MIN_SCALE = {"支付单量": 1.0, "在售商品数量": 5.0}    # 标准差下限：防止长期平稳的序列一有波动就被标记
+EWMA_SPAN = 7                                         # EWMA 跨度（天），alpha = 2 / (span + 1)
+MIN_HISTORY = 5                                       # 至少观测到 5 天后才开始打分
+Z_THRESHOLD = 4.0                                     # |z| 达到该值视为异常
+TOP_PER_DAY = 200                                     # 每天每个（级别, 指标）最多保留的异常条数
+
+LEVEL_GAME = "游戏"
+LEVEL_MERCHANT = "商户"
+ANOMALY_COLUMNS = ["dt", "级别", "游戏名称", "商户昵称", "指标", "当日值", "基线", "z", "方向"]
+
+
+# ========== 🧮 序列矩阵 ==========
+def game_matrix(rollup, metric):
+    """(天, 游戏) 矩阵：当天该游戏没有任何行时为 NaN（未观测，不参与打分与更新）"""
+    values = rollup.totals[metric].astype("float64")
+    values[rollup.counts == 0] = np.nan
+    games = np.asarray(rollup.games, dtype=object)
+    return values, games, np.full(len(games), "", dtype=object)
+
+
+def pair_matrix(rollup, metric):
+    """(天, 商户×游戏) 矩阵：由每日汇总中按天排序的 (商户, 游戏) 对直接散列写入，不访问明细行"""
+    n_games = len(rollup.games)
+    series = rollup.pair_merchants.astype(np.int64) * n_games + rollup.pair_games
+    codes, uniques = pd.factorize(series, sort=True)
+    day = np.repeat(np.arange(len(rollup.pair_offsets) - 1), np.diff(rollup.pair_offsets))
+
+    values = np.full((len(rollup.pair_offsets) - 1, len(uniques)), np.nan)
+    values[day, codes] = rollup.pair_values[metric]
+    merchants = np.asarray(rollup.merchants, dtype=object)[uniques // n_games]
+    games = np.asarray(rollup.games, dtype=object)[uniques % n_games]
+    return values, games, merchants
+
+
+def matrix_digest(values):
+    """矩阵内容摘要（判断已处理的历史天数是否发生变化）"""
+    return hashlib.blake2b(np.ascontiguousarray(values).tobytes(), digest_size=16).hexdigest()
+
+
+# ========== 📈 EWMA 状态（增量） ==========
+class EwmaState:
+    """
+    一组序列的 EWMA 状态：均值 / 方差 / 观测次数，以及已处理到的天数与历史数据摘要。
+    新快照只在历史天数未变化时续算新增的天；新出现的序列从零状态开始（等价于此前全部未观测）。
+    """
+
+    def __init__(self, keys):
+        n = len(keys)
+        self.keys = pd.Index(keys)  # 序列键："游戏名称\x1f商户昵称"
+        self.mean = np.zeros(n)
+        self.var = np.zeros(n)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.days = 0               # 已处理的天数（矩阵前 days 行）
+        self.start = None
+        self.digest = None
+        self.flagged = []           # 已处理各天的异常记录（DataFrame 列表）
+
+    def reindexed(self, keys):
+        """
+        按新的序列键重排状态：已有序列沿用状态，新序列为零状态。
+
+        返回：
+            (新状态, positions)：positions[i] 为第 i 个新序列在旧状态中的位置，新序列为 -1
+        """
+        state = EwmaState(keys)
+        positions = self.keys.get_indexer(state.keys)
+        known = positions >= 0
+        for name in ("mean", "var", "count"):
+            getattr(state, name)[known] = getattr(self, name)[positions[known]]
+        state.days, state.start, state.flagged = self.days, self.start, list(self.flagged)
+        return state, positions
+
+
+def scan(values, state, metric, level, games, merchants, start):
+    """
+    从 state.days 行开始逐日更新 EWMA（每天一次向量运算，覆盖全部序列），记录 |z| ≥ 阈值的异常。
+    z 使用更新前的均值 / 标准差（即只用历史数据判断当天是否异常）。
+    """
+    alpha = 2.0 / (EWMA_SPAN + 1)
+    min_scale = MIN_SCALE.get(metric, 1.0)
+
+    for t in range(state.days, values.shape[0]):
+        x = values[t]
+        observed = ~np.isnan(x)
+
+        scale = np.maximum(np.sqrt(state.var), min_scale)
+        z = np.where(observed, (np.nan_to_num(x) - state.mean) / scale, 0.0)
+        candidates = np.flatnonzero(observed & (state.count >= MIN_HISTORY) & (np.abs(z) >= Z_THRESHOLD))
+        if candidates.size:
+            if candidates.size > TOP_PER_DAY:
+                candidates = candidates[np.argpartition(-np.abs(z[candidates]), TOP_PER_DAY - 1)[:TOP_PER_DAY]]
+            state.flagged.append(pd.DataFrame({
+                "dt": start + pd.Timedelta(days=t),
+                "级别": level,
+                "游戏名称": games[candidates],
+                "商户昵称": merchants[candidates],
+                "指标": metric,
+                "当日值": x[candidates].astype(np.int64),
+                "基线": np.round(state.mean[candidates], 1),
+                "z": np.round(z[candidates], 2),
+                "方向": np.where(z[candidates] > 0, "↑ 激增", "↓ 骤降"),
+            }))
+
+        # ✅ 首次观测：以当天值作为初始均值；其余已观测序列按 EWMA 递推，未观测序列保持不变
+        first = observed & (state.count == 0)
+        rest = observed & ~first
+        state.mean[first] = x[first]
+        delta = np.where(rest, np.nan_to_num(x) - state.mean, 0.0)
+        state.mean = state.mean + alpha * delta
+        state.var = np.where(rest, (1 - alpha) * (state.var + alpha * delta ** 2), state.var)
+        state.count = state.count + observed
+
+    state.days = values.shape[0]
+    return state
+
+
+_STATES = {}                # {(级别, 指标): EwmaState}，进程级，供下一次快照增量续算
+_STATES_LOCK = threading.Lock()
+
+
+def update_state(level, metric, values, games, merchants, start):
+    """
+    取得（并增量更新）某级别某指标的 EWMA 状态。
+    与上次相比起始日期相同、已处理的历史天数内容未变、且新序列在历史中均未出现时，只处理新增的天；否则全量重算。
+    """
+    with _STATES_LOCK:
+        previous = _STATES.get((level, metric))
+
+    keys = games + "\x1f" + merchants
+    state = None
+    if previous is not None and previous.start == start and previous.days <= values.shape[0]:
+        candidate, positions = previous.reindexed(keys)
+        known = positions >= 0
+        if known.sum() == len(previous.keys):
+            # ✅ 历史天数按旧序列顺序取出后与上次的摘要比较；新序列在历史中必须全部未观测
+            old_order = np.empty(len(previous.keys), dtype=np.int64)
+            old_order[positions[known]] = np.flatnonzero(known)
+            history = values[:previous.days]
+            if np.isnan(history[:, ~known]).all() and matrix_digest(history[:, old_order]) == previous.digest:
+                state = candidate
+
+    if state is None:
+        state = EwmaState(keys)
+        state.start = start
+
+    state = scan(values, state, metric, level, games, merchants, start)
+    state.digest = matrix_digest(values)
+    with _STATES_LOCK:
+        _STATES[(level, metric)] = state
+    return state
+
+
+# ========== 📋 结果 ==========
+class AnomalyReport:
+    """
+    🚨 异常检测结果（数据快照生成时构建，所有会话共享，只读）：各天被标记的序列记录。
+    """
+
+    def __init__(self, records):
+        self.records = records
+
+    @classmethod
+    def from_rollup(cls, rollup):
+        """对每日汇总中的全部游戏序列与（商户, 游戏）序列打分，汇总为空时返回 None"""
+        if rollup is None:
+            return None
+
+        frames = []
+        for metric in [m for m in ANOMALY_METRICS if m in rollup.totals]:
+            for level, build in ((LEVEL_GAME, game_matrix), (LEVEL_MERCHANT, pair_matrix)):
+                values, games, merchants = build(rollup, metric)
+                frames.extend(update_state(level, metric, values, games, merchants, rollup.start).flagged)
+
+        records = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ANOMALY_COLUMNS)
+        return cls(records.assign(强度=records["z"].abs()))
+
+    def top(self, start=None, end=None, games=None, level=None, limit=20):
+        """
+        区间内 |z| 最大的异常记录。
+
+        参数说明：
+        - start / end: 日期闭区间；games: 游戏筛选；level: "游戏" / "商户" / None（全部）
+        - limit: 最多返回条数
+
+        返回：
+            DataFrame[ANOMALY_COLUMNS]
+        """
+        records = self.records
+        if start is not None:
+            records = records[records["dt"] >= pd.Timestamp(start)]
+        if end is not None:
+            records = records[records["dt"] <= pd.Timestamp(end)]
+        if games is not None:
+            records = records[records["游戏名称"].isin(list(games))]
+        if level is not None:
+            records = records[records["级别"] == level]
+        return records.nlargest(limit, "强度")[ANOMALY_COLUMNS].reset_index(drop=True)
@@ -0,0 +1,238 @@
+# 共享只读数据集：导入进程写出 Arrow IPC 文件与查询索引文件，所有 Streamlit 服务进程以内存映射方式零拷贝打开
+
+# config/arrow_dataset.py
+
+import os
+import glob
+import json
+import mmap
+import uuid
+import pickle
+import struct
+import logging
+import threading
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:                     # Windows：无 flock，每个进程各自导入
+    fcntl = None
+
+from config.data_backend import NAME_COLUMNS, build_indexes, empty_frame
+from config.cold_tier import COLD_FILE_NAME, ColdTier
+
+logger = logging.getLogger(__name__)
+
+DATASET_FILE_NAME = "dataset.arrow"
+INGEST_LOCK_FILE_NAME = "ingest.lock"
+SNAPSHOT_METADATA_KEY = b"dashboard.snapshot"     # 快照信息（文件数 / 校验结果等）写在 schema 元数据中
+
+INDEX_FILE_KEY = "index_file"                     # 快照信息中对应的索引文件名（每个数据集版本一个，见 write_indexes）
+INDEX_FILE_PATTERN = "indexes_*.bin"
+INDEX_MAGIC = b"DASHIDX1"
+INDEX_ALIGN = 64                                  # 数组缓冲区按 64 字节对齐写入
+INDEX_MMAP_MIN_BYTES = 1 << 16                    # 小于该大小的数组直接写在 pickle 流中（如商户倒排表的短列表）
+
+
+# ========== 🗂️ 查询索引文件（导入进程写出一次，各进程内存映射） ==========
+def _aligned(offset):
+    return -(-offset // INDEX_ALIGN) * INDEX_ALIGN
+
+
+def write_indexes(indexes, directory):
+    """
+    将查询索引（每日汇总 / 商户索引 / 库存 / 异常 / 留存）写为 indexes_<随机标识>.bin，返回文件名。
+
+    pickle 协议 5：较大的 numpy 数组不进入 pickle 流，其数据缓冲区按 64 字节对齐依次写在文件后部；
+    load_indexes 以内存映射打开，数组直接引用映射的页（只读），多个进程共享页缓存中的一份。
+    文件名每个版本不同：替换数据集时，已打开旧版本的进程继续读取旧文件的映射。
+
+    文件结构：魔数 | pickle 长度, 缓冲区个数 | 各缓冲区 (偏移, 长度) | pickle 流 | 对齐的缓冲区...
+    """
+    buffers = []
+
+    def out_of_band(buffer):
+        raw = buffer.raw()
+        if raw.nbytes < INDEX_MMAP_MIN_BYTES:
+            return True                             # ✅ 返回真值：写在 pickle 流中
+        buffers.append(raw)
+        return False
+
+    payload = pickle.dumps(indexes, protocol=5, buffer_callback=out_of_band)
+    header_size = len(INDEX_MAGIC) + 16 + 16 * len(buffers)
+    spans, offset = [], _aligned(header_size + len(payload))
+    for raw in buffers:
+        spans.append((offset, raw.nbytes))
+        offset = _aligned(offset + raw.nbytes)
+
+    name = f"indexes_{uuid.uuid4().hex[:12]}.bin"
+    path = os.path.join(directory, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(INDEX_MAGIC + struct.pack("<QQ", len(payload), len(buffers)))
+        for span in spans:
+            f.write(struct.pack("<QQ", *span))
+        f.write(payload)
+        for (start, _), raw in zip(spans, buffers):
+            f.seek(start)
+            f.write(raw)
+    os.replace(tmp_path, path)
+    return name
+
+
+def load_indexes(path):
+    """
+    以内存映射方式读取 write_indexes 写出的索引（数组只读、不复制）。
+
+    返回：
+        dict：{索引名: 索引对象}；文件不存在（已被新版本清理）或格式不符时返回 None
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+    view = memoryview(mapped)
+    if bytes(view[:len(INDEX_MAGIC)]) != INDEX_MAGIC:
+        return None
+    position = len(INDEX_MAGIC)
+    payload_size, count = struct.unpack_from("<QQ", view, position)
+    position += 16
+    buffers = []
+    for _ in range(count):
+        start, size = struct.unpack_from("<QQ", view, position)
+        buffers.append(view[start:start + size])
+        position += 16
+    return pickle.loads(view[position:position + payload_size], buffers=buffers)
+
+
+def remove_stale_indexes(directory, keep=None):
+    """删除当前数据集不再引用的索引文件（已映射这些文件的进程不受影响；Windows 下仍被占用的文件留待下次清理）"""
+    for path in glob.glob(os.path.join(directory, INDEX_FILE_PATTERN)):
+        if os.path.basename(path) != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# ========== ✏️ 写入端（仅导入进程） ==========
+def write_dataset(df, path, snapshot, indexes=None):
+    """
+    将合并后的数据写为未压缩的 Arrow IPC 文件（可直接内存映射），名称列使用字典编码。
+    先写临时文件再 os.replace 原子替换：已打开旧文件的进程继续读取旧映射，不受影响。
+
+    参数说明：
+    - df: 合并后的 DataFrame（为 None 时写出空表）
+    - path: 目标文件路径
+    - snapshot: 快照信息（不含 frame），须可 JSON 序列化
+    - indexes: 导入时构建的查询索引（见 data_backend.build_indexes），先于数据集写为索引文件并记入快照信息；
+      为 None 时沿用 snapshot 中已记录的索引文件（数据不变的重写，如 maintain.py vacuum）
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if df is None:
+        df = empty_frame()
+    directory = os.path.dirname(path)
+    if indexes is not None:
+        snapshot = {**snapshot, INDEX_FILE_KEY: write_indexes(indexes, directory)}
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for name in NAME_COLUMNS:
+        i = table.schema.get_field_index(name)
+        if i >= 0 and not pa.types.is_dictionary(table.schema.field(i).type):
+            table = table.set_column(i, name, pc.dictionary_encode(table[name]))   # ✅ 每个名称只存一份
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        SNAPSHOT_METADATA_KEY: json.dumps(snapshot, ensure_ascii=False, default=str).encode("utf-8"),
+    })
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=None)
+    os.replace(tmp_path, path)
+    remove_stale_indexes(directory, keep=snapshot.get(INDEX_FILE_KEY))
+
+
+# ========== 📖 读取端（所有服务进程） ==========
+def open_dataset(path):
+    """
+    以内存映射方式打开数据集，返回 (DataFrame, 快照信息 dict)。
+
+    各列以 ArrowDtype 直接引用映射的缓冲区，不复制数据：多个进程打开同一文件时，
+    物理内存中只有操作系统页缓存里的一份。
+    """
+    import pyarrow as pa
+
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    snapshot = json.loads((table.schema.metadata or {}).get(SNAPSHOT_METADATA_KEY, b"{}"))
+    return table.to_pandas(types_mapper=pd.ArrowDtype), snapshot
+
+
+_OPENED = {}                            # {文件路径: (文件标识, DataFrame, 快照信息)}
+_OPENED_LOCK = threading.Lock()
+
+
+def load_dataset(path):
+    """
+    获取数据集的最新版本（进程级缓存）：每次调用只 stat 一次文件，文件被替换后才重新映射。
+    查询索引由导入进程写在数据集旁（见 write_indexes），各进程内存映射后放在快照信息中，不在本进程重建；
+    索引文件缺失时（旧版本写出的数据集，或打开期间已被新版本清理）才在本进程构建一次，
+    同目录下存在汇总层文件（分层保留，见 config.cold_tier）时一并拼接。
+
+    返回：
+        (DataFrame, 快照信息 dict)，文件不存在时返回 (None, None)
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None, None
+    ident = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    with _OPENED_LOCK:
+        cached = _OPENED.get(path)
+        if cached is None or cached[0] != ident:
+            df, snapshot = open_dataset(path)
+            directory = os.path.dirname(path)
+            indexes = load_indexes(os.path.join(directory, snapshot[INDEX_FILE_KEY])) if snapshot.get(INDEX_FILE_KEY) else None
+            if indexes is None:
+                logger.info("数据集未附带可用的索引文件，在本进程构建：%s", path)
+                cold = ColdTier.load(os.path.join(directory, COLD_FILE_NAME)) if snapshot.get("cold_rows") else None
+                indexes = build_indexes(df, cold=cold)
+            snapshot.update(indexes)
+            cached = _OPENED[path] = (ident, df, snapshot)
+    return cached[1], cached[2]
+
+
+# ========== 🗳️ 导入进程选举 ==========
+_INGEST_LOCKS = {}                      # {锁文件路径: 已持有锁的文件对象}（进程存活期间一直持有）
+_INGEST_LOCKS_LOCK = threading.Lock()
+
+
+def acquire_ingest_role(cache_dir):
+    """
+    尝试成为负责导入的进程（flock 非阻塞排他锁）。同一时刻只有一个进程解析附件并写出数据集，
+    其余进程只读；导入进程退出后锁自动释放，下一个调用的进程接替。
+
+    返回：
+        bool：当前进程是否为导入进程（不支持 flock 的平台恒为 True）
+    """
+    if fcntl is None:
+        return True
+
+    lock_path = os.path.join(cache_dir, INGEST_LOCK_FILE_NAME)
+    with _INGEST_LOCKS_LOCK:
+        if lock_path in _INGEST_LOCKS:
+            return True
+        handle = open(lock_path, "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        _INGEST_LOCKS[lock_path] = handle
+        return True
@@ -1,9 +1,82 @@
-# excel导入加载封装 （需要增加文件模版校错工具）
+# excel导入加载封装 （文件模版校错见 config/template_validator.py）
 
 import os
+import time
+import threading
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pandas as pd
 import streamlit as st
 from datetime import datetime
+from config.template_validator import validate_file, file_in_date_range, projected_columns
+from config.keyed_store import KeyedStore
+from config.data_backend import (
+    BACKEND_MEMORY, BACKEND_SQLITE, BACKEND_ARROW, INDEX_KEYS, MemoryBackend, backend_indexes, build_indexes, empty_frame,
+    use_arrow_strings,
+)
+from config.cold_tier import RAW_DAYS, raw_date_range, sync_cold_tier
+from config.mappings import canonicalize_games, stamp_current
+from config.attachments_watcher import directory_signature, get_watcher
+from config.warm_start import ENABLE_WARM_START, restore_warm_start, save_warm_start, warm_cache_path, warm_key
+from config.upload_pipeline import save_uploads
+
+
+# ========== 🚫 读取失败缓存（负缓存）& 隔离目录 ==========
+# ✅ 进程级缓存：所有会话共享，坏文件只解析失败一次，直到文件内容变化（指纹改变）才会重试
+_FAILED_FILES = {}                      # {(文件路径, 文件大小, 修改时间ns): 错误信息}
+_FAILED_FILES_LOCK = threading.Lock()
+
+# ✅ 可选隔离目录：开启后坏文件会被移动到 attachments/_quarantine/，不再参与扫描
+QUARANTINE_DIR_NAME = "_quarantine"
+ENABLE_QUARANTINE = os.environ.get("DASHBOARD_QUARANTINE", "0") == "1"
+
+# ========== 🗂️ 增量数据存储 ==========
+# ✅ 进程级：每个附件目录一个 KeyedStore，未变化的文件不会被重复解析
+_STORES = {}                            # {目录 / 数据库路径: KeyedStore / SQLiteStore}
+_STORES_LOCK = threading.Lock()
+
+# ✅ 本地缓存目录（SQLite 数据库等派生文件，位于项目根目录下，已加入 .gitignore）
+CACHE_DIR_NAME = ".dashboard_cache"
+SQLITE_FILE_NAME = "dashboard.sqlite"
+
+# ✅ 后台导入：默认开启（DASHBOARD_WATCH=0 时退回到每次 rerun 同步目录）
+WATCH_ATTACHMENTS = os.environ.get("DASHBOARD_WATCH", "1") == "1"
+INITIAL_LOAD_TIMEOUT = 300               # 进程首次启动等待首个快照的最长时间（秒）
+
+# ✅ Arrow 后端是否参与导入选举：设为 0 时服务进程只读，数据集由定时任务（management_tools/maintain.py compact）写出
+ARROW_INGEST = os.environ.get("DASHBOARD_ARROW_INGEST", "1") == "1"
+
+# ✅ 并行解析：待解析文件数达到阈值时使用进程池
+PARSE_WORKERS = int(os.environ.get("DASHBOARD_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+PARALLEL_MIN_FILES = 4
+
+# ========== ✂️ 读取范围下推（列投影 + 日期范围） ==========
+# ✅ DASHBOARD_COLUMNS：只解码这些列（逗号分隔，唯一键三列始终保留），为空时读取全部模版列
+# ✅ DASHBOARD_RECENT_DAYS：只加载最近 N 天的数据，范围外的文件按文件名 MMDD 直接跳过（不打开），0 表示不限
+READ_COLUMNS = [c.strip() for c in os.environ.get("DASHBOARD_COLUMNS", "").split(",") if c.strip()] or None
+RECENT_DAYS = int(os.environ.get("DASHBOARD_RECENT_DAYS", "0"))
+
+
+def recent_date_range(days=RECENT_DAYS):
+    """最近 N 天（含今天）的日期范围 (start, end)；N <= 0 时返回 None（不限）"""
+    if days <= 0:
+        return None
+    today = pd.Timestamp.today().normalize()
+    return today - pd.Timedelta(days=days - 1), today
+
+
+def tier_ranges(recent_days=RECENT_DAYS, raw_days=RAW_DAYS):
+    """
+    加载范围与分层范围：(加载范围, 明细层范围, 明细层读取范围)，各项为 None 表示不限 / 不分层。
+    明细层读取范围 = 加载范围 ∩ 明细层范围，其余已加载的日期进入汇总层。
+    """
+    date_range = recent_date_range(recent_days)
+    raw_range = raw_date_range(raw_days)
+    if raw_range is None:
+        return date_range, None, date_range
+    hot_range = raw_range if date_range is None else (max(date_range[0], raw_range[0]), raw_range[1])
+    return date_range, raw_range, hot_range
 
 
 def ensure_dir_exists(path):
@@ -39,42 +112,319 @@ def save_uploaded_file(uploaded_file, save_dir):
         return None
 
 
-def load_all_excel_files_from_dir(directory):
+def file_fingerprint(path, columns=None):
     """
-    读取目录下所有 Excel 文件并合并为一个 DataFrame。
+    文件指纹：(路径, 大小, 修改时间ns)。文件被覆盖 / 重新导出后指纹随之变化。
+    指定列投影时追加投影标记，投影配置变化后（如 SQLite 库跨重启保留）文件会被重新解析。
+    写入存储时再追加游戏名映射标记（见 config.mappings.canonicalize_games），比较时使用 stamp_current。
     """
-    excel_files = sorted([f for f in os.listdir(directory) if f.endswith(".xlsx")])
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    return key + ("|".join(projected_columns(columns)),) if columns else key
 
-    if not excel_files:
-        st.sidebar.warning("📂 未找到任何 Excel 文件")
-        return None
 
-    all_dfs = []
-    for f in excel_files:
-        path = os.path.join(directory, f)
-        try:
-            df = pd.read_excel(path)
-            df["来源文件"] = f
-            all_dfs.append(df)
-        except Exception as e:
-            st.sidebar.warning(f"❌ 文件读取失败：{f} - {e}")
-
-    if not all_dfs:
-        st.sidebar.error("❌ 所有 Excel 文件均读取失败")
+def quarantine_file(path):
+    """
+    将坏文件移动到同级的隔离目录中，返回新路径（失败返回 None）。
+    """
+    quarantine_dir = os.path.join(os.path.dirname(path), QUARANTINE_DIR_NAME)
+    ensure_dir_exists(quarantine_dir)
+    target = os.path.join(quarantine_dir, os.path.basename(path))
+    try:
+        os.replace(path, target)
+        return target
+    except OSError:
         return None
 
-    st.sidebar.success(f"📚 成功读取 {len(all_dfs)} 个文件")
-    return pd.concat(all_dfs, ignore_index=True)
 
+def render_failure_report(failures, quarantined, warnings=None):
+    """
+    汇总展示读取失败的文件（每次 rerun 仅一条提示，明细收纳在折叠面板中）。
 
-def load_data(uploaded_file, base_dir):
+    参数说明：
+    - failures: [(文件名, 错误信息)] 当前仍在 attachments/ 中的坏文件
+    - quarantined: [文件名] 本次被移入隔离目录的文件
+    - warnings: [(文件名, 提示信息)] 已加载但存在数据质量问题的文件（模版校验提示）
     """
-    主入口：处理上传文件 & 加载 attachments/ 中所有 Excel 文件。
-    使用 session_state 防止重复保存。
+    warnings = warnings or []
+
+    if failures or quarantined:
+        st.sidebar.warning(f"⚠️ {len(failures) + len(quarantined)} 个文件无法读取，已跳过")
+    if warnings:
+        st.sidebar.info(f"ℹ️ {len(warnings)} 条模版校验提示")
+    if not failures and not quarantined and not warnings:
+        return
+
+    with st.sidebar.expander("查看文件校验明细"):
+        for name, error in failures:
+            st.markdown(f"- ❌ `{name}`：{error}")
+        for name in quarantined:
+            st.markdown(f"- 🗃️ `{name}` 已移入 `{QUARANTINE_DIR_NAME}/`")
+        for name, message in warnings:
+            st.markdown(f"- ⚠️ `{name}`：{message}")
+
+
+def get_store(directory):
     """
-    attachments_dir = os.path.join(base_dir, "attachments")
-    ensure_dir_exists(attachments_dir)
+    获取目录对应的进程级 KeyedStore（所有会话共享，不存在则新建）。
+    """
+    with _STORES_LOCK:
+        if directory not in _STORES:
+            _STORES[directory] = KeyedStore()
+        return _STORES[directory]
+
+
+def parse_attachment(path, columns=None, date_range=None):
+    """
+    解析并校验单个附件（纯函数，可在子进程中执行）。
+
+    参数说明：
+    - columns: 列投影，只解码所需的列（见 template_validator.projected_columns）
+    - date_range: (start, end) 日期闭区间，只保留范围内的行；None 表示不限
+
+    返回：
+        (DataFrame 或 None, 校验提示列表, 错误信息)
+    """
+    try:
+        df, report = validate_file(path, columns=columns)
+        if df is not None and date_range is not None:
+            dt = pd.to_datetime(df["dt"])
+            df = df[(dt >= date_range[0]) & (dt <= date_range[1])].reset_index(drop=True)
+        return df, report["warnings"], "；".join(report["errors"])
+    except Exception as e:
+        return None, [], str(e)
+
+
+def parse_attachments(paths, max_workers=PARSE_WORKERS, columns=None, date_range=None):
+    """
+    批量解析附件：文件较多时使用进程池并行解析（openpyxl 解析受 GIL 限制，线程无法提速），
+    进程池不可用时退回顺序解析。返回结果与 paths 顺序一致。
+    """
+    parse = partial(parse_attachment, columns=columns, date_range=date_range)
+    if len(paths) < PARALLEL_MIN_FILES or max_workers <= 1:
+        return [parse(p) for p in paths]
+    try:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+            return list(pool.map(parse, paths))
+    except (OSError, BrokenProcessPool):
+        return [parse(p) for p in paths]
+
+
+def in_date_range(filename, date_range):
+    """文件名 MMDD 是否可能落在日期范围内（date_range 为 None 时恒为 True）"""
+    return date_range is None or file_in_date_range(filename, *date_range)
+
+
+def apply_parsed(store, path, key, parsed, quarantine, failures, quarantined):
+    """
+    将一个文件的解析结果写入存储：成功则 upsert，失败则移出旧数据并记录负缓存 / 隔离。
+    游戏名在写入前按类别改写为规范名（config.mappings），唯一键去重以规范名为准。
+    调用方需持有 store.lock。
+    """
+    f = os.path.basename(path)
+    df, warnings, error = parsed
+
+    if df is not None:
+        df, stamp = canonicalize_games(df)
+        df = use_arrow_strings(df.assign(来源文件=f))      # ✅ 名称列以 Arrow 字符串入库，合并 / 去重不再拷贝 Python 对象
+        # 版本号：修改时间优先，同一时间按文件名（如 “0618 v2” 晚于 “0618”）
+        store.upsert(f, df, version=(key[2], f), fingerprint=key + stamp, warnings=warnings)
+        return
+
+    # ✅ 文件由好变坏：旧数据一并移出
+    store.remove(f)
+    if quarantine and quarantine_file(path) is not None:
+        quarantined.append(f)
+    else:
+        with _FAILED_FILES_LOCK:
+            _FAILED_FILES[key] = error
+        failures.append((f, error))
+
+
+def sync_store(directory, quarantine=ENABLE_QUARANTINE, store=None, columns=None, date_range=None):
+    """
+    将目录中的 Excel 文件增量同步到 KeyedStore（不涉及任何 Streamlit 渲染）：
+    - 未变化的文件（指纹相同）直接跳过，不重复解析
+    - 新增 / 变化的文件校验后 upsert，同一 (dt, 商户昵称, 游戏名称) 以最新文件为准
+    - 已删除的文件从存储中移除，并恢复被其覆盖的旧行
+
+    store 为空时使用目录对应的内存 KeyedStore；也可传入接口一致的其他存储（如 SQLiteStore）。
+
+    读取范围下推：
+    - columns: 只解码这些列（唯一键三列始终保留），None 表示全部模版列
+    - date_range: (start, end)，文件名 MMDD 落在范围外的文件不打开、视同不存在（已加载的会被移出，
+      因此“最近 N 天”窗口随日期自然滑动）；范围内文件只保留范围内的行，早于起点的已加载行随之丢弃（store.trim），
+      起点提前（如调大 DASHBOARD_RAW_DAYS）时可能含新纳入日期的已加载文件重新解析
+
+    返回：
+        (store, failures, quarantined)
+        - failures: [(文件名, 错误信息)] 仍留在目录中的坏文件
+        - quarantined: [文件名] 本次被移入隔离目录的文件
+    """
+    excel_files = sorted([f for f in os.listdir(directory) if f.endswith(".xlsx") and in_date_range(f, date_range)])
+    store = store if store is not None else get_store(directory)
+
+    failures = []       # 仍留在目录中的坏文件
+    quarantined = []    # 本次移入隔离目录的坏文件
+    pending = []        # 需要（重新）解析的文件：[(路径, 指纹)]
+    seen_keys = set()
+    start = date_range[0] if date_range is not None else None
+
+    with store.lock:
+        loaded = store.row_start()
+        widened = (start, loaded - pd.Timedelta(days=1)) if loaded is not None and (start is None or start < loaded) else None
+        # ✅ 已删除的文件：移出存储
+        for name in store.file_names() - set(excel_files):
+            store.remove(name)
+
+        for f in excel_files:
+            path = os.path.join(directory, f)
+            key = file_fingerprint(path, columns)
+            seen_keys.add(key)
+
+            # ✅ 已加载且未变化（含游戏名映射未涉及该文件），且不含新纳入的日期：跳过
+            if stamp_current(store.fingerprint(f), key) and not (widened and in_date_range(f, widened)):
+                continue
+
+            # ✅ 负缓存命中：文件未变化，直接跳过，不再重复解析
+            with _FAILED_FILES_LOCK:
+                cached_error = _FAILED_FILES.get(key)
+            if cached_error is not None:
+                failures.append((f, cached_error))
+                continue
+
+            pending.append((path, key))
+
+    # ✅ 先校验表头（不通过则不做完整解析），再做向量化数据校验；多个文件时并行解析（不持锁）
+    parsed = parse_attachments([path for path, _ in pending], columns=columns, date_range=date_range)
+
+    with store.lock:
+        for (path, key), result in zip(pending, parsed):
+            # 解析期间已被其他线程（如上传导入）写入同一版本：跳过
+            if not widened and stamp_current(store.fingerprint(os.path.basename(path)), key):
+                continue
+            apply_parsed(store, path, key, result, quarantine, failures, quarantined)
+        store.trim(start)
+
+    # ✅ 清理已删除 / 已变化文件的失败记录，防止缓存无限增长
+    with _FAILED_FILES_LOCK:
+        for key in [k for k in _FAILED_FILES if os.path.dirname(k[0]) == directory and k not in seen_keys]:
+            del _FAILED_FILES[key]
+
+    return store, failures, quarantined
+
+
+def build_snapshot(directory, quarantine=ENABLE_QUARANTINE, store=None, materialize=True,
+                   columns=None, recent_days=0, raw_days=0):
+    """
+    同步目录并生成一份数据快照（不涉及任何 Streamlit 渲染，可在后台线程中调用）。
 
+    参数说明：
+    - materialize: 是否在快照中附带合并后的 DataFrame（内存后端需要，SQLite 后端直接查库）；
+      为 False 时不读出整表，索引由存储自身构建（SQLiteStore.build_indexes），不支持的存储不构建索引
+    - columns / recent_days: 读取范围下推（列投影 / 只加载最近 N 天），日期范围每次同步时按当天重新计算
+    - raw_days: 分层保留（见 config.cold_tier）：存储中只保留最近 N 天的明细，更早的文件汇总为 cold 层后丢弃明细；
+      0 表示全部保留明细
+
+    返回：
+        dict 快照：
+        - frame: 合并后的 DataFrame（materialize=False 或无数据时为 None）
+        - has_files: 目录中是否存在 Excel 文件
+        - failures / quarantined / warnings: 校验与读取结果（见 render_failure_report）
+        - files / rows / duplicates: 已加载文件数（两层合计，同一文件只计一次）、明细层去重后行数、重复导出去重行数
+        - out_of_range: 因日期范围未打开的文件数
+        - cold: 汇总层（ColdTier，未分层时为 None）；cold_names / cold_files / cold_rows: 含汇总层行的文件名、文件数与去重后行数
+        - rollup / merchant_index / inventory / anomalies / retention: 查询索引（见 data_backend.build_indexes，
+          无数据或未构建时为 None），随快照一起发布，会话之间共享
+    """
+    date_range, raw_range, hot_range = tier_ranges(recent_days, raw_days)
+    all_files = [f for f in os.listdir(directory) if f.endswith(".xlsx")]
+    store, failures, quarantined = sync_store(directory, quarantine, store=store,
+                                              columns=columns, date_range=hot_range)
+    cold, cold_names, cold_rows = None, [], 0
+    if raw_range is not None:
+        cold, cold_names, cold_rows, cold_failures = sync_cold_tier(directory, raw_range, date_range, columns)
+        failures = failures + [f for f in cold_failures if f not in failures]
+
+    rows = len(store)
+    if materialize:
+        frame = store.to_frame() if rows else (empty_frame() if cold is not None else None)
+        indexes = build_indexes(frame, cold=cold)
+    elif hasattr(store, "build_indexes"):
+        frame, indexes = None, store.build_indexes(cold=cold)      # ✅ 磁盘存储：由数据库聚合，不读出整表
+    else:
+        frame, indexes = None, dict.fromkeys(INDEX_KEYS)
+    return {
+        "frame": frame,
+        **indexes,
+        "cold": cold,
+        "cold_names": cold_names,
+        "cold_files": len(cold_names),
+        "cold_rows": cold_rows,
+        "has_files": bool(all_files),
+        "failures": failures,
+        "quarantined": quarantined,
+        "warnings": store.warnings(),
+        "files": len(store.file_names() | set(cold_names)),
+        "rows": rows,
+        "duplicates": store.total_source_rows() - rows,
+        "out_of_range": sum(not in_date_range(f, date_range) for f in all_files),
+    }
+
+
+def render_sync_report(snapshot):
+    """
+    在侧边栏汇总展示一份快照的导入结果，返回是否有可用数据。
+    """
+    if not snapshot["has_files"] and not snapshot["rows"]:
+        st.sidebar.warning("📂 未找到任何 Excel 文件")
+        return False
+
+    render_failure_report(snapshot["failures"], snapshot["quarantined"], snapshot["warnings"])
+    out_of_range = snapshot.get("out_of_range", 0)
+
+    if snapshot["rows"] == 0 and not snapshot.get("cold_rows"):
+        if out_of_range and not snapshot["failures"] and not snapshot["quarantined"]:
+            st.sidebar.warning(f"📅 最近 {RECENT_DAYS} 天内没有数据（{out_of_range} 个文件不在加载范围内）")
+        else:
+            st.sidebar.error("❌ 所有 Excel 文件均读取失败")
+        return False
+
+    # ✅ 重复导出（同一天同一商户同一游戏）已按最新文件去重
+    suffix = f"（重复导出去重 {snapshot['duplicates']} 行）" if snapshot["duplicates"] else ""
+    st.sidebar.success(f"📚 成功读取 {snapshot['files']} 个文件{suffix}")
+    if out_of_range:
+        st.sidebar.caption(f"📅 仅加载最近 {RECENT_DAYS} 天，{out_of_range} 个较早的文件未读取")
+    if snapshot.get("cold_rows"):
+        st.sidebar.caption(f"🧊 明细保留最近 {RAW_DAYS} 天，更早的 {snapshot['cold_files']} 个文件"
+                           f"（{snapshot['cold_rows']} 行）已按日汇总")
+    return True
+
+
+def sync_and_report(directory, quarantine=ENABLE_QUARANTINE, store=None):
+    """
+    同步目录并在侧边栏汇总展示结果，返回同步后的存储（无可用数据时返回 None）。
+    store 为空时使用目录对应的内存 KeyedStore，也可传入 SQLiteStore 等同接口存储。
+    """
+    store = store if store is not None else get_store(directory)
+    snapshot = build_snapshot(directory, quarantine, store=store, materialize=False)
+    return store if render_sync_report(snapshot) else None
+
+
+def load_all_excel_files_from_dir(directory, quarantine=ENABLE_QUARANTINE):
+    """
+    读取目录下所有 Excel 文件并合并为一个 DataFrame（按唯一键去重，最新文件优先）。
+    已知读取失败且未变化的文件直接跳过（负缓存），quarantine=True 时移入隔离目录。
+    """
+    store = sync_and_report(directory, quarantine)
+    return store.to_frame() if store is not None else None
+
+
+def handle_upload(uploaded_file, attachments_dir):
+    """
+    处理侧边栏上传：首次上传后保存文件，使用 session_state 防止重复保存。
+    返回 False 表示上传保存失败（调用方应中止加载）。
+    """
     # ✅ 初始化 session_state 防重复
     if "uploaded_saved" not in st.session_state:
         st.session_state["uploaded_saved"] = False
@@ -82,10 +432,338 @@ def load_data(uploaded_file, base_dir):
     # ✅ 首次上传后保存文件
     if uploaded_file and not st.session_state["uploaded_saved"]:
         saved_path = save_uploaded_file(uploaded_file, attachments_dir)
-        if saved_path is not None:
-            st.session_state["uploaded_saved"] = True
-        else:
-            return None
+        if saved_path is None:
+            return False
+        st.session_state["uploaded_saved"] = True
+    return True
+
+
+def load_data(uploaded_file, base_dir, attachments_dir=None):
+    """
+    主入口：处理上传文件 & 加载 attachments/ 中所有 Excel 文件。
+    使用 session_state 防止重复保存。
+    attachments_dir 为空时默认使用 base_dir/attachments。
+    """
+    attachments_dir = attachments_dir or os.path.join(base_dir, "attachments")
+    ensure_dir_exists(attachments_dir)
+
+    if not handle_upload(uploaded_file, attachments_dir):
+        return None
 
     # ✅ 加载目录中全部 Excel 文件
-    return load_all_excel_files_from_dir(attachments_dir)
\ No newline at end of file
+    return load_all_excel_files_from_dir(attachments_dir)
+
+
+def get_sqlite_store(db_path):
+    """获取数据库文件对应的进程级 SQLiteStore 写入端（不存在则新建）"""
+    from config.sqlite_store import SQLiteStore
+
+    with _STORES_LOCK:
+        if db_path not in _STORES:
+            ensure_dir_exists(os.path.dirname(db_path))
+            _STORES[db_path] = SQLiteStore(db_path)
+        return _STORES[db_path]
+
+
+def start_watcher(attachments_dir, store, materialize, warm_path=None,
+                  columns=READ_COLUMNS, recent_days=RECENT_DAYS, raw_days=RAW_DAYS):
+    """
+    获取（必要时启动）附件目录对应的后台导入线程。
+
+    参数说明：
+    - warm_path: 启动预热缓存文件（见 config/warm_start.py）：每次发布后写入；线程首次启动时缓存有效则直接恢复，
+      不重新解析任何文件。None 时不使用缓存
+    - 其余同 load_snapshot
+    """
+    def refresh():
+        signature = directory_signature(attachments_dir) if warm_path else None
+        snapshot = build_snapshot(attachments_dir, store=store, materialize=materialize,
+                                  columns=columns, recent_days=recent_days, raw_days=raw_days)
+        if warm_path:
+            key = warm_key(attachments_dir, tier_ranges(recent_days, raw_days), columns, signature)
+            save_warm_start(warm_path, key, attachments_dir, store, snapshot)
+        return snapshot
+
+    def restore():
+        key = warm_key(attachments_dir, tier_ranges(recent_days, raw_days), columns)
+        return restore_warm_start(warm_path, key, attachments_dir, store, materialize)
+
+    return get_watcher(attachments_dir, refresh, key=(attachments_dir, id(store)),
+                       initial=restore if warm_path else None)
+
+
+def load_snapshot(attachments_dir, store, materialize, watch=WATCH_ATTACHMENTS, refresh_now=False,
+                  columns=READ_COLUMNS, recent_days=RECENT_DAYS, raw_days=RAW_DAYS, warm_path=None):
+    """
+    获取附件目录的最新数据快照。
+
+    - watch=True：由后台线程负责同步，直接返回已发布的快照（仅进程首次启动时等待首个快照）
+    - watch=False：在当前 rerun 中同步（旧行为）
+
+    参数说明：
+    - refresh_now: 是否立即唤醒后台线程发布新快照（如本次 rerun 刚导入了上传文件）；
+      发布在后台完成，本次 rerun 继续使用当前快照，不等待索引重建
+    - columns / recent_days / raw_days: 读取范围下推与分层保留，见 build_snapshot
+    - warm_path: 启动预热缓存文件（仅 watch=True 时使用，见 start_watcher）
+    """
+    if not watch:
+        return build_snapshot(attachments_dir, store=store, materialize=materialize,
+                              columns=columns, recent_days=recent_days, raw_days=raw_days)
+
+    watcher = start_watcher(attachments_dir, store, materialize, warm_path,
+                            columns=columns, recent_days=recent_days, raw_days=raw_days)
+    if refresh_now:
+        watcher.trigger()
+
+    if not watcher.ready.is_set():
+        with st.spinner("⏳ 首次加载数据中（后台导入）……"):
+            watcher.ready.wait(timeout=INITIAL_LOAD_TIMEOUT)
+    return watcher.snapshot
+
+
+def upload_id(uploaded_file):
+    """上传文件的唯一标识（Streamlit 的 file_id，旧版本退化为 文件名 + 大小）"""
+    return getattr(uploaded_file, "file_id", None) or (uploaded_file.name, getattr(uploaded_file, "size", None))
+
+
+def process_uploads(uploaded_files, attachments_dir, background=True):
+    """
+    处理侧边栏上传（支持多文件 / zip 批量）：
+    1. 分块流式落盘并计算内容哈希，内容已存在的文件（不论文件名）直接跳过；同名但内容不同的文件另存为新版本
+    2. 只保存，不在当前 rerun 中解析：由后台导入线程（background=True）或随后在本次 rerun 中的目录同步
+       （DASHBOARD_WATCH=0）导入
+    每个上传文件在同一会话中只处理一次（按 file_id 记录在 session_state）。
+
+    返回：
+        bool：是否有新文件保存
+    """
+    if not uploaded_files:
+        return False
+    if not isinstance(uploaded_files, (list, tuple)):
+        uploaded_files = [uploaded_files]
+
+    processed = st.session_state.setdefault("processed_uploads", set())
+    pending = [f for f in uploaded_files if upload_id(f) not in processed]
+    if not pending:
+        return False
+
+    result = save_uploads(pending, attachments_dir)
+    processed.update(upload_id(f) for f in pending)
+
+    saved = list(dict.fromkeys(result["saved"]))
+    if saved:
+        in_range = [n for n in saved if in_date_range(n, recent_date_range())]
+        status = "后台导入中，完成后刷新页面即可看到" if background else "已导入"
+        st.sidebar.success(f"✅ 已保存 {len(saved)} 个上传文件，{status}")
+        if len(in_range) < len(saved):
+            st.sidebar.info(f"📅 {len(saved) - len(in_range)} 个上传文件早于最近 {RECENT_DAYS} 天，已保存但未加载")
+    if result["renamed"]:
+        st.sidebar.warning(f"⚠️ {len(result['renamed'])} 个上传文件与已有文件同名但内容不同，已另存为新版本（旧文件保留，冲突行以新版本为准）")
+        st.sidebar.caption("、".join(f"{name} → {target}" for name, target in result["renamed"]))
+    if result["duplicates"]:
+        st.sidebar.info(f"♻️ {len(result['duplicates'])} 个文件内容已存在，已跳过")
+        st.sidebar.caption("、".join(f"{name}（同 {existing}）" for name, existing in result["duplicates"]))
+    for name, error in result["errors"]:
+        st.sidebar.error(f"❌ 文件保存失败：{name} - {error}")
+
+    return bool(saved)
+
+
+def backend_store(base_dir, attachments_dir, backend=BACKEND_MEMORY):
+    """
+    内存 / SQLite 后端使用的进程级存储与启动预热缓存文件。
+
+    返回：
+        (KeyedStore / SQLiteStore, SQLite 数据库路径（内存后端为 None）, 缓存文件路径（未启用时为 None）)
+    """
+    cache_dir = os.path.join(base_dir, CACHE_DIR_NAME)
+    db_path = None
+    if backend == BACKEND_SQLITE:
+        db_path = os.path.join(cache_dir, SQLITE_FILE_NAME)
+        store = get_sqlite_store(db_path)
+    else:
+        store = get_store(attachments_dir)
+    warm_path = None
+    if ENABLE_WARM_START and WATCH_ATTACHMENTS:
+        ensure_dir_exists(cache_dir)
+        warm_path = warm_cache_path(cache_dir, backend, attachments_dir)
+    return store, db_path, warm_path
+
+
+def snapshot_backend(snapshot, db_path=None):
+    """由已发布的快照构造查询后端（db_path 不为空时为 SQLiteBackend）"""
+    if db_path is not None:
+        from config.sqlite_store import SQLiteBackend
+        return SQLiteBackend(db_path, **backend_indexes(snapshot))
+    return MemoryBackend(snapshot["frame"], **backend_indexes(snapshot))
+
+
+def load_backend(uploaded_files, base_dir, attachments_dir=None, backend=BACKEND_MEMORY):
+    """
+    主入口（查询后端版）：处理上传 & 同步附件目录，返回统一查询接口的后端对象。
+    默认由后台线程监听附件目录并导入（见 config/attachments_watcher.py），会话只读取已发布的数据快照；
+    进程重启后优先由启动预热缓存恢复首个快照（见 config/warm_start.py）。
+
+    参数说明：
+    - uploaded_files: 侧边栏上传的文件列表（支持 .xlsx 与 .zip，可为空）
+    - backend: "memory"（默认，整表驻留内存）、"sqlite"（写入 .dashboard_cache/dashboard.sqlite，查询下推为 SQL）
+      或 "arrow"（多进程共享的内存映射数据集，见 load_arrow_backend）
+
+    返回：
+        MemoryBackend / SQLiteBackend，无可用数据时返回 None
+    """
+    attachments_dir = attachments_dir or os.path.join(base_dir, "attachments")
+    ensure_dir_exists(attachments_dir)
+
+    if backend == BACKEND_ARROW:
+        return load_arrow_backend(uploaded_files, base_dir, attachments_dir)
+
+    store, db_path, warm_path = backend_store(base_dir, attachments_dir, backend)
+    imported = process_uploads(uploaded_files, attachments_dir, background=WATCH_ATTACHMENTS)
+    snapshot = load_snapshot(attachments_dir, store, materialize=(db_path is None),
+                             refresh_now=imported, warm_path=warm_path)
+    if snapshot is None:
+        st.sidebar.error("❌ 数据导入超时，请稍后刷新页面")
+        return None
+    if not render_sync_report(snapshot):
+        return None
+    return snapshot_backend(snapshot, db_path)
+
+
+def start_arrow_ingest(attachments_dir, cache_dir, store):
+    """
+    Arrow 导入进程的后台导入线程：每次同步后写出汇总层、查询索引与数据集；启用启动预热缓存时，
+    重启后缓存有效且数据集仍对应同一附件目录则直接恢复，不重新解析、不重写数据集。
+    """
+    from config.arrow_dataset import DATASET_FILE_NAME, load_dataset, write_dataset
+    from config.cold_tier import COLD_FILE_NAME
+
+    dataset_path = os.path.join(cache_dir, DATASET_FILE_NAME)
+    warm_path = warm_cache_path(cache_dir, BACKEND_ARROW, attachments_dir) if ENABLE_WARM_START else None
+
+    def refresh():
+        signature = directory_signature(attachments_dir) if warm_path else None
+        snapshot = build_snapshot(attachments_dir, store=store, materialize=True,
+                                  columns=READ_COLUMNS, recent_days=RECENT_DAYS, raw_days=RAW_DAYS)
+        snapshot["directory"] = attachments_dir
+        # ✅ 汇总层写在数据集旁（先于数据集替换），只读进程打开新版本数据集时一并读取
+        if snapshot["cold"] is not None:
+            snapshot["cold"].save(os.path.join(cache_dir, COLD_FILE_NAME))
+        metadata = {k: v for k, v in snapshot.items() if k not in ("frame", "cold") and k not in INDEX_KEYS}
+        # ✅ 索引在此构建一次并写在数据集旁，各进程内存映射读取；本线程不再持有这份索引
+        write_dataset(snapshot.pop("frame"), dataset_path, metadata, indexes={k: snapshot.pop(k) for k in INDEX_KEYS})
+        if warm_path:
+            key = warm_key(attachments_dir, tier_ranges(), READ_COLUMNS, signature)
+            save_warm_start(warm_path, key, attachments_dir, store, snapshot)
+        return snapshot
+
+    def restore():
+        key = warm_key(attachments_dir, tier_ranges(), READ_COLUMNS)
+        restored = restore_warm_start(warm_path, key, attachments_dir, store, materialize=False)
+        # ✅ 数据集须仍对应同一附件目录，否则由随后的同步重新写出（存储已恢复，只解析有变化的文件）
+        if restored is None or not os.path.exists(dataset_path) \
+                or load_dataset(dataset_path)[1].get("directory") != attachments_dir:
+            return None
+        return restored
+
+    return get_watcher(attachments_dir, refresh, key=(attachments_dir, dataset_path),
+                       initial=restore if warm_path else None)
+
+
+def current_dataset(dataset_path, attachments_dir):
+    """打开共享数据集的最新版本；数据集来自其他附件目录（如修改了 DASHBOARD_ATTACHMENTS_DIR）时视为不存在"""
+    from config.arrow_dataset import load_dataset
+
+    frame, snapshot = load_dataset(dataset_path)
+    if snapshot is not None and snapshot.get("directory") != attachments_dir:
+        return None, None
+    return frame, snapshot
+
+
+def wait_for_dataset(dataset_path, attachments_dir, timeout=INITIAL_LOAD_TIMEOUT):
+    """轮询等待导入进程写出数据集，超时返回 (None, None)"""
+    deadline = time.monotonic() + timeout
+    frame, snapshot = current_dataset(dataset_path, attachments_dir)
+    while frame is None and time.monotonic() < deadline:
+        time.sleep(0.2)
+        frame, snapshot = current_dataset(dataset_path, attachments_dir)
+    return frame, snapshot
+
+
+def load_arrow_backend(uploaded_files, base_dir, attachments_dir):
+    """
+    Arrow 共享数据集后端（同一主机运行多个 Streamlit 服务进程时使用）：
+
+    - 导入进程（flock 选举，同一时刻仅一个）：后台线程同步附件目录，每次变化后写出
+      .dashboard_cache/dataset.arrow（名称列字典编码，原子替换）；DASHBOARD_ARROW_INGEST=0 时不参与选举，
+      数据集改由定时任务 management_tools/maintain.py compact 写出
+    - 所有进程：以内存映射零拷贝打开该文件，物理内存中只有页缓存里的一份数据；
+      文件已存在时新进程无需解析任何 Excel，启动即可查询
+
+    返回：
+        MemoryBackend（列由内存映射的 Arrow 缓冲区直接支撑），无可用数据时返回 None
+    """
+    from config.arrow_dataset import DATASET_FILE_NAME, acquire_ingest_role
+
+    cache_dir = os.path.join(base_dir, CACHE_DIR_NAME)
+    ensure_dir_exists(cache_dir)
+    dataset_path = os.path.join(cache_dir, DATASET_FILE_NAME)
+
+    store = get_store(attachments_dir) if ARROW_INGEST and acquire_ingest_role(cache_dir) else None
+    imported = process_uploads(uploaded_files, attachments_dir)
+
+    if store is not None:
+        watcher = start_arrow_ingest(attachments_dir, cache_dir, store)
+        if imported:
+            watcher.trigger()           # ✅ 后台写出新版本数据集，本次 rerun 继续使用当前版本
+
+    frame, snapshot = current_dataset(dataset_path, attachments_dir)
+    if frame is None:
+        with st.spinner("⏳ 首次加载数据中（等待导入进程写出数据集）……"):
+            frame, snapshot = wait_for_dataset(dataset_path, attachments_dir)
+    if frame is None:
+        st.sidebar.error("❌ 数据导入超时，请稍后刷新页面")
+        return None
+    if not render_sync_report(snapshot):
+        return None
+    return MemoryBackend(frame, **backend_indexes(snapshot))
+
+
+def open_backend(base_dir, attachments_dir=None, backend=BACKEND_MEMORY, timeout=INITIAL_LOAD_TIMEOUT):
+    """
+    无界面版 load_backend（启动预热使用，见 management_tools/serve.py）：启动后台导入线程并等待首个快照，
+    与之后的会话共用同一份存储、导入线程与快照。
+
+    返回：
+        (查询后端, 数据来源)：数据来源为 "磁盘缓存"（由启动预热缓存恢复）/ "导入附件" / "共享数据集"（Arrow 只读打开）；
+        无可用数据时查询后端为 None
+    """
+    from config.arrow_dataset import DATASET_FILE_NAME, acquire_ingest_role
+
+    attachments_dir = attachments_dir or os.path.join(base_dir, "attachments")
+    ensure_dir_exists(attachments_dir)
+
+    if backend == BACKEND_ARROW:
+        cache_dir = os.path.join(base_dir, CACHE_DIR_NAME)
+        ensure_dir_exists(cache_dir)
+        source = "共享数据集"
+        if ARROW_INGEST and acquire_ingest_role(cache_dir):
+            watcher = start_arrow_ingest(attachments_dir, cache_dir, get_store(attachments_dir))
+            watcher.ready.wait(timeout=timeout)
+            source = "磁盘缓存" if watcher.restored else "导入附件"
+        frame, snapshot = wait_for_dataset(os.path.join(cache_dir, DATASET_FILE_NAME), attachments_dir, timeout)
+        if frame is None or (not snapshot["rows"] and not snapshot.get("cold_rows")):
+            return None, source
+        return MemoryBackend(frame, **backend_indexes(snapshot)), source
+
+    store, db_path, warm_path = backend_store(base_dir, attachments_dir, backend)
+    if WATCH_ATTACHMENTS:
+        watcher = start_watcher(attachments_dir, store, materialize=(db_path is None), warm_path=warm_path)
+        watcher.ready.wait(timeout=timeout)
+        snapshot = watcher.snapshot
+        source = "磁盘缓存" if watcher.restored else "导入附件"
+    else:
+        snapshot, source = load_snapshot(attachments_dir, store, materialize=(db_path is None), watch=False), "导入附件"
+    if snapshot is None or (not snapshot["rows"] and not snapshot.get("cold_rows")):
+        return None, source
+    return snapshot_backend(snapshot, db_path), source
@@ -0,0 +1,171 @@
+# 附件目录后台监听：新文件在后台线程导入，完成后原子替换数据版本（会话始终读取上一版本，不阻塞）
+
+# config/attachments_watcher.py
+
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ✅ 轮询间隔（秒）：有 inotify（watchdog）时仅作兜底，无 watchdog 时作为主要检测手段
+POLL_INTERVAL_WITH_EVENTS = 60
+POLL_INTERVAL_FALLBACK = 5
+
+# ✅ 去抖时间（秒）：收到文件事件后稍等片刻，避免导出任务尚未写完就开始解析
+DEBOUNCE_SECONDS = 1.0
+
+
+def directory_signature(directory):
+    """
+    目录签名：所有 .xlsx 的 (文件名, 大小, 修改时间ns)。只做 stat，不读文件内容，开销极小。
+    """
+    signature = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(".xlsx"):
+            stat = entry.stat()
+            signature.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(signature))
+
+
+class AttachmentsWatcher(threading.Thread):
+    """
+    👀 附件目录后台导入线程（stale-while-revalidate）
+
+    - 监听：优先使用 watchdog（Linux 下为 inotify）接收文件事件，不可用时退化为定时轮询
+    - 导入：目录签名变化时调用 refresh() 在后台完成解析 / 去重，不占用任何会话的 rerun
+    - 发布：refresh() 返回新的数据快照后整体替换 self.snapshot（单次赋值，原子可见）
+      会话在新快照就绪前继续使用旧快照，任何交互都不会等待导入
+
+    参数说明：
+    - directory: 监听的附件目录
+    - refresh: 无参函数，执行一次同步并返回新的快照（dict）
+    - initial: 可选的无参函数，返回 (快照, 目录签名) 或 None：线程启动时先尝试以它发布首个快照
+      （如启动预热的磁盘缓存，见 config/warm_start.py），目录签名未变化时不再执行 refresh()
+    """
+
+    def __init__(self, directory, refresh, initial=None):
+        super().__init__(daemon=True, name=f"attachments-watcher:{os.path.basename(directory)}")
+        self.directory = directory
+        self.refresh = refresh
+        self.initial = initial
+        self.snapshot = None                 # 当前已发布的数据快照
+        self.version = 0                     # 快照版本号（每次发布 +1）
+        self.ready = threading.Event()       # 首个快照是否已发布
+        self.restored = False                # 首个快照是否由 initial() 恢复（未重新导入）
+        self._wake = threading.Event()
+        self._publish_lock = threading.Lock()
+        self._last_signature = None
+        self._observer = None
+
+    def trigger(self):
+        """主动唤醒（例如侧边栏上传后），后台立即检查目录变化"""
+        self._wake.set()
+
+    def _start_observer(self):
+        """尝试启动 watchdog 文件事件监听，返回是否成功"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return False
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [getattr(event, "src_path", ""), getattr(event, "dest_path", "")]
+                if any(str(p).endswith(".xlsx") for p in paths):
+                    watcher.trigger()
+
+        try:
+            self._observer = Observer()
+            self._observer.schedule(_Handler(), self.directory, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+            return True
+        except Exception as e:
+            logger.warning("watchdog 监听启动失败，改用轮询：%s", e)
+            self._observer = None
+            return False
+
+    def publish(self):
+        """
+        执行一次同步并发布新快照；失败时保留旧快照（也可由会话在导入上传文件后直接调用）。
+
+        返回：
+            bool：是否已发布新快照
+        """
+        with self._publish_lock:
+            try:
+                snapshot = self.refresh()
+            except Exception:
+                logger.exception("后台导入失败，继续使用上一版本数据")
+                return False
+            self._set_snapshot(snapshot)
+            return True
+
+    def _set_snapshot(self, snapshot):
+        self.version += 1
+        snapshot["version"] = self.version
+        self.snapshot = snapshot                 # ✅ 原子替换：会话下次 rerun 即读到新版本
+        self.ready.set()
+
+    def _restore(self):
+        """以 initial() 发布首个快照，返回是否成功（失败时照常导入）"""
+        try:
+            result = self.initial()
+        except Exception:
+            logger.exception("恢复首个快照失败，改为重新导入")
+            return False
+        if result is None:
+            return False
+        snapshot, self._last_signature = result
+        self.restored = True                     # ✅ 先于发布设置：等待 ready 的调用方读到的来源与快照一致
+        with self._publish_lock:
+            self._set_snapshot(snapshot)
+        return True
+
+    def run(self):
+        if self.initial is not None:
+            self._restore()
+        interval = POLL_INTERVAL_WITH_EVENTS if self._start_observer() else POLL_INTERVAL_FALLBACK
+
+        while True:
+            try:
+                signature = directory_signature(self.directory)
+            except OSError:
+                signature = None
+
+            # ✅ 导入失败时不记录签名：下次轮询 / 唤醒时重试，而不是等到目录再次变化
+            if (signature != self._last_signature or not self.ready.is_set()) and self.publish():
+                self._last_signature = signature
+
+            # ✅ 等待文件事件 / 主动唤醒，超时则轮询一次
+            if self._wake.wait(timeout=interval):
+                self._wake.clear()
+                time.sleep(DEBOUNCE_SECONDS)
+
+
+_WATCHERS = {}
+_WATCHERS_LOCK = threading.Lock()
+
+
+def get_watcher(directory, refresh, key=None, initial=None):
+    """
+    获取（必要时启动）目录对应的进程级后台导入线程。
+
+    参数说明：
+    - directory: 附件目录
+    - refresh / initial: 同步函数与首个快照的恢复函数（仅在首次创建时使用，见 AttachmentsWatcher）
+    - key: 缓存键，默认为目录本身（同一目录不同后端应传入不同 key）
+    """
+    key = key or directory
+    with _WATCHERS_LOCK:
+        watcher = _WATCHERS.get(key)
+        if watcher is None or not watcher.is_alive():
+            watcher = AttachmentsWatcher(directory, refresh, initial)
+            watcher.start()
+            _WATCHERS[key] = watcher
+        return watcher
@@ -2,7 +2,7 @@
 
 import inspect
 
-def render_card(render_func, title, value, delta=None, unit=None, color="#1890ff", key=None, subtitle=None):
+def render_card(render_func, title, value, delta=None, unit=None, color="#1890ff", key=None, subtitle=None, delta_label=None):
     """
     ✅ 通用卡片渲染器封装（适配 render_info_card v1/v2，统一样式与健壮性）
 
@@ -14,6 +14,7 @@ def render_card(render_func, title, value, delta=None, unit=None, color="#1890ff
     - unit: 单位（如“家”、“%”等，None 表示不拼接单位）
     - color: 主色调（影响字体和边框颜色）
     - key: ECharts 版本专用渲染 key（v1 版本未定义该参数）
+    - delta_label: 对比对象名称（如“上期”），仅传给支持该参数的渲染函数
     """
 
     # ✅ 安全兜底处理
@@ -37,6 +38,8 @@ def render_card(render_func, title, value, delta=None, unit=None, color="#1890ff
         kwargs["key"] = key
     if "subtitle" in supported:
         kwargs["subtitle"] = subtitle
+    if "delta_label" in supported and delta_label:
+        kwargs["delta_label"] = delta_label
 
     # ✅ 渲染卡片
     render_func(**kwargs)
\ No newline at end of file
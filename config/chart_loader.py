@@ -13,8 +13,11 @@ def load_chart_modules(version: str = "v1") -> dict:
     返回:
         dict: 图表函数字典，包含以下内容：
             - draw_line_chart: 折线图函数
+            - draw_dual_axis_chart: 双轴图函数（订单量 vs 比率，v1 / v2 均为 Plotly 图对象）
             - draw_pie_chart: 饼图函数
             - draw_bar_chart: 柱状图函数
+            - draw_cohort_heatmap: 同期群留存热力图函数（v1 / v2 均为 Plotly 图对象）
+            - draw_heatmap: 游戏 × 日期热力图函数（v1 返回 Plotly 图对象；v2 为 ECharts，直接渲染、返回 None）
             - render_info_card: 卡片组件函数（支持 v1/markdown 和 v2/ECharts）
             - apply_chinese_font: 应用中文字体样式的函数
             - is_echarts: 布尔值，标记当前是否使用 ECharts 渲染（True=使用 v2）
@@ -42,18 +45,33 @@ def load_chart_modules(version: str = "v1") -> dict:
             is_echarts = False
 
         # ✅ 尝试导入 v2 的柱状图（ECharts）
+        # ⚠️ is_echarts 仅决定饼图的渲染方式（见 config/pie_chart_renderer.py），柱状图回落到 v1 不影响它；
+        #    否则 v2 饼图会被当作 Plotly 调用而缺少 key，多个空饼图时触发 DuplicateElementId
         try:
             from utils_v2.charts import draw_bar_chart
         except ImportError:
             from utils_v1.charts import draw_bar_chart
-            is_echarts = False
 
-        # ✅ 尝试导入 v2 的字体样式模块
+        # ✅ 尝试导入 v2 的双轴图（订单量 vs 比率），同样为 Plotly 图对象，不影响 is_echarts
         try:
-            from utils_v2.theme import apply_chinese_font
+            from utils_v2.line_charts_echarts import draw_dual_axis_chart
         except ImportError:
-            from utils_v1.theme import apply_chinese_font
-            is_echarts = False
+            from utils_v1.line_charts_plotly import draw_dual_axis_chart
+
+        # ✅ 尝试导入 v2 的同期群热力图，同样为 Plotly 图对象，不影响 is_echarts
+        try:
+            from utils_v2.charts import draw_cohort_heatmap
+        except ImportError:
+            from utils_v1.charts import draw_cohort_heatmap
+
+        # ✅ 尝试导入 v2 的 游戏 × 日期 热力图（ECharts）；回落到 v1 时返回 Plotly 图对象，由调用方按返回值渲染
+        try:
+            from utils_v2.heatmap_echarts import draw_heatmap
+        except ImportError:
+            from utils_v1.charts import draw_heatmap
+
+        # ✅ 字体样式 v1 / v2 共用（config/chart_theme.py）
+        from config.chart_theme import apply_chinese_font
 
         # ✅ 尝试导入 v2 的卡片组件（使用 ECharts 风格或 Div 渲染）
         try:
@@ -64,17 +82,20 @@ def load_chart_modules(version: str = "v1") -> dict:
 
     # ========== 📦 否则使用 v1 快速版封装（默认使用 Plotly / Markdown） ==========
     else:
-        from utils_v1.line_charts_plotly import draw_line_chart
+        from utils_v1.line_charts_plotly import draw_line_chart, draw_dual_axis_chart
         from utils_v1.pie_charts_plotly import draw_pie_chart
-        from utils_v1.charts import draw_bar_chart
+        from utils_v1.charts import draw_bar_chart, draw_cohort_heatmap, draw_heatmap
         from utils_v1.theme import apply_chinese_font
         from utils_v1.card_charts_markdown import render_info_card
         is_echarts = False
 
     # ========== ✅ 封装所有模块函数，返回统一入口 ==========
     modules["draw_line_chart"] = draw_line_chart             # 折线图函数
+    modules["draw_dual_axis_chart"] = draw_dual_axis_chart   # 双轴图函数（订单量 vs 比率）
     modules["draw_pie_chart"] = draw_pie_chart               # 饼图函数
     modules["draw_bar_chart"] = draw_bar_chart               # 柱状图函数
+    modules["draw_cohort_heatmap"] = draw_cohort_heatmap     # 同期群留存热力图函数
+    modules["draw_heatmap"] = draw_heatmap                   # 游戏 × 日期热力图函数
     modules["render_info_card"] = render_info_card           # 卡片组件函数
     modules["apply_chinese_font"] = apply_chinese_font       # 字体应用函数
     modules["is_echarts"] = is_echarts                       # 当前是否使用 ECharts
@@ -133,11 +154,7 @@ def load_chart_modules(version: str = "v1") -> dict:
             from utils_v1.charts import draw_bar_chart
             is_echarts = False
 
-        try:
-            from utils_v2.theme import apply_chinese_font
-        except ImportError:
-            from utils_v1.theme import apply_chinese_font
-            is_echarts = False
+        from config.chart_theme import apply_chinese_font
 
     # ========== 📦 否则使用 v1 快速版封装 ==========
     else:
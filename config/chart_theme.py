@@ -0,0 +1,87 @@
+# 统一图表主题：Plotly 命名模板 + ECharts 主题对象（v1 / v2 共用同一套字体与配色）
+
+# config/chart_theme.py
+
+import threading
+
+DEFAULT_FONT = "Microsoft YaHei"
+FONT_SIZE = 14
+TEMPLATE_NAME = "game_dashboard"
+
+# ✅ 与 Plotly 默认配色一致，v2（ECharts）使用同一组颜色，保证两版视觉统一
+COLORWAY = [
+    "#636EFA", "#EF553B", "#00CC96", "#AB63FA", "#FFA15A",
+    "#19D3F3", "#FF6692", "#B6E880", "#FF97FF", "#FECB52",
+]
+GRID_COLOR = "#eeeeee"
+
+# ✅ ECharts 主题对象（st_echarts(theme=ECHARTS_THEME)），替代在每个 option 中重复写字体 / 配色
+ECHARTS_THEME = {
+    "color": COLORWAY,
+    "backgroundColor": "#ffffff",
+    "textStyle": {"fontFamily": DEFAULT_FONT, "fontSize": FONT_SIZE},
+    "categoryAxis": {"splitLine": {"show": False}},
+    "valueAxis": {"splitLine": {"show": True, "lineStyle": {"color": [GRID_COLOR]}}},
+}
+
+_REGISTER_LOCK = threading.Lock()
+
+
+def build_plotly_template():
+    """
+    构建项目统一的 Plotly 模板（等价于原 apply_chinese_font + apply_plot_style 的效果）。
+
+    模板只包含项目自定义的少量布局项，不继承 Plotly 内置的完整默认模板，
+    因此每个图表序列化时携带的模板体积很小。
+    """
+    import plotly.graph_objects as go
+
+    return go.layout.Template(layout={
+        "font": {"family": DEFAULT_FONT, "size": FONT_SIZE},
+        "colorway": COLORWAY,
+        "plot_bgcolor": "white",                       # 图表区域背景白色
+        "paper_bgcolor": "white",                      # 图表外围背景白色
+        "margin": {"l": 40, "r": 40, "t": 40, "b": 40},
+        "xaxis": {"showgrid": False},                  # 去除 X 轴网格线
+        "yaxis": {"showgrid": True, "gridcolor": GRID_COLOR},   # Y 轴保留浅灰网格
+    })
+
+
+def register_plotly_template():
+    """
+    在 plotly.io.templates 中注册命名模板（每个进程只注册一次），返回模板名。
+    图表函数在创建时直接指定 template=TEMPLATE_NAME，无需事后逐个 update_layout。
+    """
+    import plotly.io as pio
+
+    with _REGISTER_LOCK:
+        if TEMPLATE_NAME not in pio.templates:
+            pio.templates[TEMPLATE_NAME] = build_plotly_template()
+    return TEMPLATE_NAME
+
+
+register_plotly_template()
+
+
+# ========== 🔙 兼容旧调用：为已创建的图表套用模板 ==========
+def apply_chinese_font(fig, font_family=DEFAULT_FONT):
+    """为已创建的图表套用项目模板（模板已包含中文字体）；自定义字体时额外覆盖 font.family"""
+    fig.update_layout(template=TEMPLATE_NAME)
+    if font_family != DEFAULT_FONT:
+        fig.update_layout(font_family=font_family)
+    return fig
+
+
+def apply_plot_style(fig):
+    """
+    应用统一的图表视觉风格：去除背景网格，优化边框、字体大小等。
+    （等价于套用项目模板；新代码请在创建图表时直接传入 template=TEMPLATE_NAME）
+
+    参数：
+        fig（Plotly 图对象）：图表对象
+
+    返回：
+        fig：增强样式后的图表对象
+    """
+    fig.update_layout(template=TEMPLATE_NAME)
+    return fig
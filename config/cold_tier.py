@@ -0,0 +1,301 @@
+# 分层保留：明细行只保留最近 N 天，更早的日期汇总为 (dt, 游戏名称) 矩阵 + 商户去重草图（HyperLogLog），
+# 与明细层的每日汇总拼接为同一个 DailyRollup，跨层查询对调用方透明
+
+# config/cold_tier.py
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config.keyed_store import KeyedStore
+from config.mappings import canonicalize_games, failed_stamp, stamp_current
+from config.rollup import DailyRollup
+from config.template_validator import file_in_date_range, parse_filename_mmdd
+
+# ✅ DASHBOARD_RAW_DAYS：明细行保留的天数（含今天），更早的文件只以汇总形式保留；0 表示全部保留明细
+RAW_DAYS = int(os.environ.get("DASHBOARD_RAW_DAYS", "0"))
+
+HLL_PRECISION = 10                      # 2^10 个寄存器 / (天, 游戏)：标准误差约 3.3%，少量商户时（线性计数）接近精确
+HLL_REGISTERS = 1 << HLL_PRECISION
+COLD_FILE_NAME = "cold_tier.npz"        # Arrow 共享数据集旁的汇总层文件（只读进程据此拼接每日汇总）
+
+
+# ========== 🧮 HyperLogLog ==========
+def merchant_hashes(names):
+    """商户名称 → 64 位哈希（pandas 固定密钥的 SipHash，跨进程 / 跨重启稳定）"""
+    return pd.util.hash_array(np.asarray(names, dtype=object))
+
+
+def _bit_length(values):
+    """uint64 逐元素有效位数（拆成两个 32 位，float64 可精确表示，frexp 的指数即位数）"""
+    hi = (values >> np.uint64(32)).astype(np.float64)
+    lo = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+
+def hll_update(registers, cells, hashes):
+    """
+    将哈希值写入寄存器：registers 形状为 (格子数, HLL_REGISTERS)，cells[i] 为第 i 个哈希所属的格子。
+    前 HLL_PRECISION 位选寄存器，其余位的前导零个数 + 1 取最大值。
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    rest = hashes << np.uint64(HLL_PRECISION)
+    rank = np.minimum(64 - _bit_length(rest) + 1, 64 - HLL_PRECISION + 1).astype(np.uint8)
+    np.maximum.at(registers, (cells, index), rank)
+    return registers
+
+
+def hll_estimate(registers):
+    """由一组寄存器（已按位取最大值合并）估算去重个数；小基数时使用线性计数"""
+    m = registers.size
+    estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)
+    return int(round(estimate))
+
+
+# ========== 🧊 汇总层 ==========
+class ColdTier:
+    """
+    🧊 汇总层（只读）：较早日期的 (天, 游戏) 求和 / 行数矩阵与每格商户草图，不保留任何商户明细。
+
+    - totals / counts: 与 DailyRollup 相同形状与含义
+    - registers: (天数, 游戏数, HLL_REGISTERS) uint8，按位取最大值即得任意日期范围 + 游戏子集的去重草图
+    """
+
+    def __init__(self, start, games, totals, counts, registers):
+        self.start = start
+        self.games = games
+        self.totals = totals
+        self.counts = counts
+        self.registers = registers
+
+    @property
+    def days(self):
+        return self.counts.shape[0]
+
+    @classmethod
+    def from_frame(cls, df):
+        """由去重后的明细构建（借用 DailyRollup 的分组求和，商户-天对只用于写入草图），空表返回 None"""
+        rollup = DailyRollup.from_frame(df)
+        if rollup is None:
+            return None
+
+        n_days, n_games = rollup.counts.shape
+        registers = np.zeros((n_days * n_games, HLL_REGISTERS), dtype=np.uint8)
+        day = np.repeat(np.arange(n_days), np.diff(rollup.pair_offsets))
+        hashes = merchant_hashes(rollup.merchants)[rollup.pair_merchants]
+        hll_update(registers, day * n_games + rollup.pair_games, hashes)
+        return cls(rollup.start, list(rollup.games), rollup.totals, rollup.counts,
+                   registers.reshape(n_days, n_games, HLL_REGISTERS))
+
+    @classmethod
+    def combine(cls, parts):
+        """合并多个部分（按日期 / 游戏对齐；同一格出现在多个部分时求和，草图取最大值），无部分时返回 None"""
+        parts = [p for p in parts if p is not None]
+        if not parts:
+            return None
+
+        start = min(p.start for p in parts)
+        n_days = max((p.start - start).days + p.days for p in parts)
+        games = sorted(set().union(*(p.games for p in parts)))
+        columns = sorted(set().union(*(p.totals for p in parts)))
+
+        totals = {col: np.zeros((n_days, len(games)), dtype=np.int64) for col in columns}
+        counts = np.zeros((n_days, len(games)), dtype=np.int64)
+        registers = np.zeros((n_days, len(games), HLL_REGISTERS), dtype=np.uint8)
+        for part in parts:
+            rows = slice((part.start - start).days, (part.start - start).days + part.days)
+            cols = np.searchsorted(games, part.games)
+            counts[rows, cols] += part.counts
+            for col, values in part.totals.items():
+                totals[col][rows, cols] += values
+            registers[rows, cols] = np.maximum(registers[rows, cols], part.registers)
+        return cls(start, games, totals, counts, registers)
+
+    def attach(self, hot):
+        """
+        与明细层的每日汇总拼接为一个 DailyRollup：求和 / 行数矩阵按日期与游戏对齐，
+        商户-天对只来自明细层（汇总层的日期为空段），汇总层日期的去重计数改由草图回答。
+
+        参数说明：
+        - hot: 明细层 DailyRollup（明细为空时为 None）
+        """
+        parts = [self] if hot is None else [self, hot]
+        start = min(p.start for p in parts)
+        n_days = max((p.start - start).days + p.counts.shape[0] for p in parts)
+        games = sorted(set().union(*(p.games for p in parts)))
+        columns = sorted(set().union(*(p.totals for p in parts)))
+
+        totals = {col: np.zeros((n_days, len(games)), dtype=np.int64) for col in columns}
+        counts = np.zeros((n_days, len(games)), dtype=np.int64)
+        for part in parts:
+            offset = (part.start - start).days
+            rows = slice(offset, offset + part.counts.shape[0])
+            cols = np.searchsorted(games, part.games)
+            counts[rows, cols] += part.counts
+            for col, values in part.totals.items():
+                totals[col][rows, cols] += values
+
+        if hot is None:
+            merchants, pair_merchants, pair_games = [], np.zeros(0, np.int32), np.zeros(0, np.int32)
+            pair_offsets = np.zeros(n_days + 1, dtype=np.int64)
+            pair_values = {col: np.zeros(0, dtype=np.int64) for col in columns}
+            raw_start = start + pd.Timedelta(days=n_days)
+        else:
+            # ✅ 明细层之前的日期：商户-天对为空段（offsets 补 0），之后的日期补末尾值
+            offset = (hot.start - start).days
+            merchants = hot.merchants
+            pair_merchants = hot.pair_merchants
+            pair_games = np.searchsorted(games, np.asarray(hot.games))[hot.pair_games].astype(np.int32)
+            pair_offsets = np.concatenate([
+                np.zeros(offset, dtype=np.int64),
+                hot.pair_offsets,
+                np.full(n_days - offset - hot.counts.shape[0], hot.pair_offsets[-1]),
+            ])
+            pair_values = hot.pair_values
+            raw_start = hot.start
+
+        rollup = DailyRollup(start, games, totals, counts, merchants, pair_offsets, pair_merchants, pair_games, pair_values)
+        sketches = np.zeros((self.days, len(games), HLL_REGISTERS), dtype=np.uint8)
+        sketches[:, np.searchsorted(games, self.games)] = self.registers
+        rollup.sketches = sketches
+        rollup.raw_start = raw_start
+        return rollup
+
+    # ========== 💾 持久化（Arrow 共享数据集的只读进程使用） ==========
+    def save(self, path):
+        """原子写出为 .npz（先写临时文件再替换）"""
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            start=np.array(str(self.start.date())),
+            games=np.array(self.games, dtype=str),
+            counts=self.counts,
+            registers=self.registers,
+            **{f"total:{col}": values for col, values in self.totals.items()},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """读取 save() 写出的文件，不存在时返回 None"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            totals = {key[len("total:"):]: data[key] for key in data.files if key.startswith("total:")}
+            return cls(pd.Timestamp(str(data["start"])), data["games"].tolist(), totals,
+                       data["counts"], data["registers"])
+
+
+# ========== 🔄 同步（按文件日期分组，组内文件未变化时复用） ==========
+_PARTS = {}                             # {目录: {分组键: (文件指纹元组（含映射标记）, ColdTier 部分, 行数, 失败列表, 有汇总层行的文件, 行日期范围)}}
+_PARTS_LOCK = threading.Lock()
+
+
+def raw_date_range(raw_days=RAW_DAYS):
+    """明细层的日期范围 (start, end)；raw_days <= 0 时返回 None（不分层）"""
+    if raw_days <= 0:
+        return None
+    today = pd.Timestamp.today().normalize()
+    return today - pd.Timedelta(days=raw_days - 1), today
+
+
+def is_cold_file(filename, raw_range, date_range=None):
+    """
+    文件是否（可能）含汇总层日期（加载起点 ~ 明细层起点前一天）。
+    文件名只有 MMDD 没有年份，明细层内的 MMDD 在较早年份同样可能出现，这类文件两层都读取，行按 dt 拆分到各层。
+    """
+    start = date_range[0] if date_range is not None else None
+    return file_in_date_range(filename, start, raw_range[0] - pd.Timedelta(days=1))
+
+
+def _range_moved(names, old, new):
+    """行日期范围变化后，组内文件是否可能含新纳入 / 移出范围的日期（明细层起点每天前移，只有这部分分组需要重新汇总）"""
+    (old_start, old_end), (new_start, new_end) = old, new
+    day = pd.Timedelta(days=1)
+    spans = []
+    if old_start != new_start:
+        spans.append((min(old_start, new_start), max(old_start, new_start) - day))
+    if old_end != new_end:
+        spans.append((min(old_end, new_end) + day, max(old_end, new_end)))
+    return any(file_in_date_range(n, None if start == pd.Timestamp.min else start, end)
+               for start, end in spans for n in names)
+
+
+def sync_cold_tier(directory, raw_range, date_range=None, columns=None):
+    """
+    同步汇总层：只解析文件有变化的日期分组（同一 MMDD 的文件一组，组内按唯一键去重、最新文件优先），
+    每组汇总后丢弃明细，结果在进程内缓存。游戏名映射变化时，只有含受影响游戏名的分组重新汇总；
+    行日期范围变化（跨天后明细层起点前移）时，只有可能含变化部分日期的分组重新汇总。
+
+    参数说明：
+    - raw_range: 明细层日期范围（见 raw_date_range），早于其起点的行进入汇总层
+    - date_range / columns: 同 sync_store 的读取范围下推（DASHBOARD_RECENT_DAYS / DASHBOARD_COLUMNS）
+
+    返回：
+        (ColdTier 或 None, 含汇总层行的文件名列表, 行数, failures)，failures 为 [(文件名, 错误信息)]
+    """
+    from config.attachments_loader import file_fingerprint, parse_attachments
+
+    names = sorted(f for f in os.listdir(directory) if f.endswith(".xlsx") and is_cold_file(f, raw_range, date_range))
+    groups = {}
+    for name in names:
+        groups.setdefault(parse_filename_mmdd(name) or name, []).append(name)
+
+    with _PARTS_LOCK:
+        cached = dict(_PARTS.get(directory, {}))
+
+    fingerprints = {key: tuple(file_fingerprint(os.path.join(directory, n), columns) for n in group)
+                    for key, group in groups.items()}
+    # ✅ 汇总层的行日期范围：不晚于明细层起点前一天（与明细层互不重叠）
+    row_range = (date_range[0] if date_range is not None else pd.Timestamp.min,
+                 raw_range[0] - pd.Timedelta(days=1))
+    changed = [
+        key for key in groups
+        if key not in cached or len(cached[key][0]) != len(fingerprints[key])
+        or not all(stamp_current(stored, fp) for stored, fp in zip(cached[key][0], fingerprints[key]))
+        or _range_moved(groups[key], cached[key][5], row_range)
+    ]
+    paths = [os.path.join(directory, n) for key in changed for n in groups[key]]
+    parsed = dict(zip(paths, parse_attachments(paths, columns=columns, date_range=row_range)))
+
+    for key in changed:
+        store, failures, stamped, contributed = KeyedStore(), [], [], []
+        for name, fingerprint in zip(groups[key], fingerprints[key]):
+            df, _, error = parsed[os.path.join(directory, name)]
+            if df is None:
+                failures.append((name, error))
+                stamped.append(fingerprint + failed_stamp())
+                continue
+            df, stamp = canonicalize_games(df)
+            stamped.append(fingerprint + stamp)
+            if not df.empty:
+                store.upsert(name, df.assign(来源文件=name), version=(fingerprint[2], name))
+                contributed.append(name)
+        cached[key] = (tuple(stamped), ColdTier.from_frame(store.to_frame()), len(store), failures, contributed,
+                       row_range)
+
+    parts = {key: cached[key] for key in groups}
+    with _PARTS_LOCK:
+        _PARTS[directory] = parts
+
+    failures = [f for entry in parts.values() for f in entry[3]]
+    rows = sum(entry[2] for entry in parts.values())
+    contributed = sorted(n for entry in parts.values() for n in entry[4])
+    return ColdTier.combine([entry[1] for entry in parts.values()]), contributed, rows, failures
+
+
+def cold_parts(directory):
+    """目录当前的汇总层分组缓存（启动预热的磁盘缓存随数据一起保存，重启后分组无需重新汇总）"""
+    with _PARTS_LOCK:
+        return dict(_PARTS.get(directory, {}))
+
+
+def restore_cold_parts(directory, parts):
+    with _PARTS_LOCK:
+        _PARTS[directory] = dict(parts)
@@ -0,0 +1,301 @@
+# 数据查询后端封装（内存 DataFrame / SQLite 二选一，主程序只通过统一接口取数）
+
+# config/data_backend.py
+
+import os
+import numpy as np
+import pandas as pd
+
+from config.template_validator import REQUIRED_COLUMNS, STOCK_COLUMNS
+from config.inventory import inventory_from_sums
+from config.retention import COHORT_DAYS, retention_cohorts, retention_summary
+
+# ✅ 可选后端：memory（默认，整表驻留内存）/ sqlite（数据落盘，筛选与分组下推为 SQL）
+#    / arrow（导入进程写出 Arrow 文件，多个服务进程内存映射共享同一份数据）
+BACKEND_MEMORY = "memory"
+BACKEND_SQLITE = "sqlite"
+BACKEND_ARROW = "arrow"
+BACKENDS = (BACKEND_MEMORY, BACKEND_SQLITE, BACKEND_ARROW)
+
+# ✅ 允许查询的列（SQL 后端拼接列名前据此校验，防止注入）
+QUERYABLE_COLUMNS = set(REQUIRED_COLUMNS) | {"来源文件"}
+
+# ✅ 商户维度查询（单商户明细 / 商户排行）返回的数值列
+MERCHANT_SERIES_COLUMNS = ["在售商品数量", "支付单量", "完结单量"]
+ROW_CHUNK_SIZE = 50_000         # iter_rows 每块的行数（明细导出按块读取）
+
+
+# ✅ 写时复制（copy-on-write）：筛选 / 切片得到的子表与原表共享内存，只在写入时才复制；
+#    图表函数一律把入参视为只读（用 assign 生成新表），派生子表因此无需防御性拷贝。
+#    pandas 3 起为默认且唯一行为；pandas 1.5 / 2.x 在此开启（DASHBOARD_COPY_ON_WRITE=0 可关闭，便于压测对比）
+COPY_ON_WRITE = os.environ.get("DASHBOARD_COPY_ON_WRITE", "1") == "1"
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", COPY_ON_WRITE)
+
+
+def copy_on_write_enabled():
+    """当前进程是否启用了写时复制"""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return bool(pd.get_option("mode.copy_on_write"))
+
+
+# ✅ Arrow 字符串存储：中文名称列使用 string[pyarrow]（连续缓冲区，过滤 / 分组不再逐个处理 Python 对象，
+#    切片共享底层缓冲区）；未安装 pyarrow 或 DASHBOARD_ARROW_STRINGS=0 时保持 object 列
+NAME_COLUMNS = ["商户昵称", "游戏名称", "来源文件"]
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]" if os.environ.get("DASHBOARD_ARROW_STRINGS", "1") == "1" else None
+except ImportError:
+    STRING_DTYPE = None
+
+
+def check_column(col):
+    if col not in QUERYABLE_COLUMNS:
+        raise ValueError(f"不支持的查询列：{col}")
+    return col
+
+
+# ✅ 快照附带的内存索引（构建一次、所有会话共享、只读），以同名关键字参数传给查询后端
+INDEX_KEYS = ("rollup", "merchant_index", "inventory", "anomalies", "retention")
+
+
+def build_indexes(df, cold=None):
+    """
+    由去重后的明细数据构建全部内存索引：每日汇总（config.rollup）、商户索引（config.merchant_index）
+    以及由每日汇总派生的库存指标、异常检测结果与商户活跃位图（见 rollup_indexes）。
+    传入 cold（config.cold_tier.ColdTier）时，每日汇总向前拼接汇总层的日期（分层保留）。
+
+    返回：
+        dict：{索引名: 索引对象}，无数据时各值为 None
+    """
+    from config.rollup import DailyRollup
+    from config.merchant_index import MerchantIndex
+
+    return {**rollup_indexes(DailyRollup.from_frame(df), cold), "merchant_index": MerchantIndex.from_frame(df)}
+
+
+def rollup_indexes(rollup, cold=None):
+    """
+    由明细层的每日汇总派生：拼接汇总层后的每日汇总、库存指标（config.inventory）、
+    异常检测结果（config.anomaly）与商户活跃位图（config.retention）；商户索引为 None。
+
+    参数说明：
+    - rollup: 明细层 DailyRollup（须含商户-天对，见 DailyRollup.attach_pairs），无明细时为 None
+    - cold: 汇总层（ColdTier），未分层时为 None
+    """
+    from config.inventory import InventoryStats
+    from config.anomaly import AnomalyReport
+    from config.retention import ActivityBits
+
+    if cold is not None:
+        rollup = cold.attach(rollup)
+    return {
+        "rollup": rollup,
+        "merchant_index": None,
+        "inventory": InventoryStats.from_rollup(rollup),
+        "anomalies": AnomalyReport.from_rollup(rollup),
+        "retention": ActivityBits.from_rollup(rollup),
+    }
+
+
+def empty_frame():
+    """无明细行时使用的空表（模版列 + 来源文件）"""
+    return pd.DataFrame({c: pd.Series(dtype="object") for c in REQUIRED_COLUMNS + ["来源文件"]})
+
+
+def backend_indexes(snapshot):
+    """从快照中取出查询后端需要的索引（关键字参数）"""
+    return {key: snapshot.get(key) for key in INDEX_KEYS}
+
+
+def top_anomalies(report, start=None, end=None, games=None, level=None, limit=20):
+    """各后端共用：有异常检测结果时按条件取前 limit 条，否则返回空表"""
+    from config.anomaly import ANOMALY_COLUMNS
+
+    if report is None:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+    return report.top(start, end, games, level, limit)
+
+
+def use_arrow_strings(df):
+    """
+    将名称列（商户昵称 / 游戏名称 / 来源文件）转换为 Arrow 字符串列。
+    已是该类型或已由 Arrow 直接支撑（ArrowDtype，如内存映射数据集）的列不做转换；未启用 Arrow 字符串时原样返回。
+    """
+    if STRING_DTYPE is None:
+        return df
+    converted = {
+        c: df[c].astype(STRING_DTYPE)
+        for c in NAME_COLUMNS
+        if c in df.columns and df[c].dtype != STRING_DTYPE and not isinstance(df[c].dtype, pd.ArrowDtype)
+    }
+    return df.assign(**converted) if converted else df
+
+
+class MemoryBackend:
+    """
+    🧠 内存后端：所有查询直接在合并后的 DataFrame 上完成。
+
+    统一查询接口（SQLiteBackend 保持一致）：
+    - min_date() / max_date(): 数据中的最早 / 最新日期
+    - detail_start(): 商户明细的起始日期（分层保留时更早的日期只有按日汇总，见 config.cold_tier）
+    - game_list(): 排序后的游戏名称列表
+    - has_metric(col): 数值列是否已加载（DASHBOARD_COLUMNS 列投影未读取的列不可查询，比率 / 排序指标据此隐藏）
+    - metric_sum(col, start, end, games): 指定范围内某数值列之和
+    - distinct_count(col, start, end, games): 指定范围内某列去重计数
+    - sum_by(by, col, start, end, games): 按 by 分组求和，返回 DataFrame[by, col]
+    - daily_matrix(col, start, end, games): (日期, 游戏) 宽表，无数据的格子为 NaN
+    - search_merchants(query, limit): 按昵称关键字检索商户（前缀优先）
+    - merchant_series(name, start, end, games): 单个商户的逐日明细 DataFrame[dt, 游戏名称, 数值列...]
+    - merchant_totals(start, end, games): 按商户汇总 DataFrame[商户昵称, 数值列...]（仅含有数据的商户，在售商品数量取期末值）
+    - inventory_by_game(start, end, games): 各游戏库存占比 / 库存变化 / 售罄率（见 config.inventory）
+    - top_anomalies(start, end, games, level, limit): 区间内最显著的异常序列（见 config.anomaly）
+    - merchant_retention(start, end, games): 商户活跃 / 新增 / 回流 / 留存 / 流失（见 config.retention）
+    - retention_cohorts(start, end, games, days): 同期群第 N 天留存率
+    - iter_rows(start, end, games, chunk_rows): 按块迭代范围内的去重后明细行（至少产出一块，可为空表）
+    - row_count(start, end, games): iter_rows 将产出的行数（导出前据此判断是否超出上限）
+
+    范围参数说明：
+    - start / end: 日期闭区间（Timestamp，None 表示不限）
+    - games: 游戏名称列表（None 表示不筛选，空列表表示结果为空）
+
+    rollup（config.rollup.DailyRollup，可选）：传入时，按 dt / 游戏名称 的求和与活跃商户去重
+    直接由每日汇总回答，代价与明细行数无关；其余查询仍在明细上完成。
+    merchant_index（config.merchant_index.MerchantIndex，可选）：传入时，商户检索与单商户明细由索引回答，不扫描整表。
+    inventory（config.inventory.InventoryStats，可选）：传入时，库存指标直接读取快照生成时算好的结果。
+    anomalies（config.anomaly.AnomalyReport，可选）：快照生成时的异常检测结果；未传入时异常列表为空。
+    retention（config.retention.ActivityBits，可选）：商户活跃位图；未传入时留存指标为空。
+    """
+
+    name = BACKEND_MEMORY
+
+    def __init__(self, df, rollup=None, merchant_index=None, inventory=None, anomalies=None, retention=None):
+        df = use_arrow_strings(df)
+        if not pd.api.types.is_datetime64_any_dtype(df["dt"]):
+            df = df.assign(dt=pd.to_datetime(df["dt"]))      # ✅ 不修改调用方传入的表
+        self.df = df
+        self.rollup = rollup
+        self.merchant_index = merchant_index
+        self.inventory = inventory
+        self.anomalies = anomalies
+        self.retention = retention
+
+    def _slice(self, start=None, end=None, games=None):
+        """按日期范围与游戏筛选，返回子表（无筛选条件时直接返回原表）"""
+        df = self.df
+        if start is not None:
+            df = df[df["dt"] >= start]
+        if end is not None:
+            df = df[df["dt"] <= end]
+        if games is not None:
+            df = df[df["游戏名称"].isin(games)]
+        return df
+
+    def min_date(self):
+        return self.rollup.min_date() if self.rollup is not None else self.df["dt"].min()
+
+    def max_date(self):
+        return self.rollup.max_date() if self.rollup is not None else self.df["dt"].max()
+
+    def detail_start(self):
+        return self.rollup.raw_start if self.rollup is not None else self.min_date()
+
+    def _mask(self, start=None, end=None, games=None):
+        """按日期范围与游戏筛选的行布尔掩码"""
+        df = self.df
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= (df["dt"] >= start).to_numpy()
+        if end is not None:
+            mask &= (df["dt"] <= end).to_numpy()
+        if games is not None:
+            mask &= df["游戏名称"].isin(games).to_numpy()
+        return mask
+
+    def iter_rows(self, start=None, end=None, games=None, chunk_rows=ROW_CHUNK_SIZE):
+        # ✅ 只计算一次命中行的位置，每块按位置取行，不复制整个子表
+        df = self.df
+        positions = np.flatnonzero(self._mask(start, end, games))
+        yield df.iloc[positions[:chunk_rows]]
+        for i in range(chunk_rows, len(positions), chunk_rows):
+            yield df.iloc[positions[i:i + chunk_rows]]
+
+    def row_count(self, start=None, end=None, games=None):
+        if self.rollup is not None:
+            return self.rollup.row_count(start, end, games)
+        return int(self._mask(start, end, games).sum())
+
+    def game_list(self):
+        return self.rollup.game_list() if self.rollup is not None else sorted(self.df["游戏名称"].unique())
+
+    def has_metric(self, col):
+        return self.rollup.can_sum(col) if self.rollup is not None else col in self.df.columns
+
+    def _series_columns(self):
+        return [c for c in MERCHANT_SERIES_COLUMNS if self.has_metric(c)]
+
+    def metric_sum(self, col, start=None, end=None, games=None):
+        if self.rollup is not None and self.rollup.can_sum(col):
+            return self.rollup.metric_sum(col, start, end, games)
+        return self._slice(start, end, games)[check_column(col)].sum()
+
+    def distinct_count(self, col, start=None, end=None, games=None):
+        if self.rollup is not None and col == "商户昵称":
+            return self.rollup.distinct_merchants(start, end, games)
+        return self._slice(start, end, games)[check_column(col)].nunique()
+
+    def sum_by(self, by, col, start=None, end=None, games=None):
+        if self.rollup is not None and self.rollup.can_sum(col, by):
+            return self.rollup.sum_by(by, col, start, end, games)
+        sliced = self._slice(start, end, games)
+        return sliced.groupby(check_column(by))[check_column(col)].sum().reset_index()
+
+    def daily_matrix(self, col, start=None, end=None, games=None):
+        if self.rollup is not None and self.rollup.can_sum(col):
+            return self.rollup.daily_matrix(col, start, end, games)
+        sliced = self._slice(start, end, games)
+        return sliced.groupby(["dt", "游戏名称"], observed=True)[check_column(col)].sum().unstack("游戏名称")
+
+    def search_merchants(self, query, limit=20):
+        if self.merchant_index is not None:
+            return self.merchant_index.search(query, limit)
+        query = str(query).strip()
+        if not query:
+            return []
+        names = pd.Series(self.df["商户昵称"].unique()).astype(str)
+        names = names[names.str.contains(query, case=False, regex=False)]
+        prefix = names.str.casefold().str.startswith(query.casefold())
+        return sorted(names[prefix])[:limit] + sorted(names[~prefix])[:max(limit - int(prefix.sum()), 0)]
+
+    def merchant_series(self, name, start=None, end=None, games=None):
+        if self.merchant_index is not None:
+            return self.merchant_index.merchant_rows(name, start, end, games)
+        sliced = self._slice(start, end, games)
+        sliced = sliced[sliced["商户昵称"] == name]
+        return sliced[["dt", "游戏名称", *self._series_columns()]].sort_values(["dt", "游戏名称"], ignore_index=True)
+
+    def merchant_totals(self, start=None, end=None, games=None):
+        if self.rollup is not None:
+            return self.rollup.merchant_totals(start, end, games, MERCHANT_SERIES_COLUMNS)
+        columns = self._series_columns()
+        sliced = self._slice(start, end, games)
+        totals = sliced.groupby("商户昵称", observed=True)[columns].sum()
+        stock = [c for c in columns if c in STOCK_COLUMNS]
+        latest = sliced[sliced["dt"] == sliced["dt"].max()].groupby("商户昵称", observed=True)[stock].sum()
+        totals[stock] = latest.reindex(totals.index, fill_value=0)          # ✅ 时点值取期末
+        return totals.reset_index()
+
+    def inventory_by_game(self, start=None, end=None, games=None):
+        if self.inventory is not None:
+            return self.inventory.by_game(start, end, games)
+        return inventory_from_sums(self, start, end, games)
+
+    def top_anomalies(self, start=None, end=None, games=None, level=None, limit=20):
+        return top_anomalies(self.anomalies, start, end, games, level, limit)
+
+    def merchant_retention(self, start=None, end=None, games=None):
+        return retention_summary(self.retention, start, end, games)
+
+    def retention_cohorts(self, start=None, end=None, games=None, days=COHORT_DAYS):
+        return retention_cohorts(self.retention, start, end, games, days)
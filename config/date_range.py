@@ -0,0 +1,91 @@
+# 日期范围选择：预设区间 / 自定义区间 + 上一等长周期（环比）计算
+
+# config/date_range.py
+
+from datetime import timedelta
+
+import pandas as pd
+import streamlit as st
+
+# ✅ 预设区间（均以数据中的最新日期为“今天”，与原先“昨日 / 近7日”的口径一致）
+PRESET_LAST_DAY = "最近一天"
+PRESET_LAST_7_DAYS = "最近7天"
+PRESET_THIS_WEEK = "本周"
+PRESET_LAST_30_DAYS = "最近30天"
+PRESET_ALL = "全部"
+PRESET_CUSTOM = "自定义"
+PRESETS = [PRESET_LAST_DAY, PRESET_LAST_7_DAYS, PRESET_THIS_WEEK, PRESET_LAST_30_DAYS, PRESET_ALL, PRESET_CUSTOM]
+DEFAULT_PRESET = PRESET_LAST_7_DAYS
+
+
+def preset_range(preset, min_date, max_date):
+    """
+    预设名称 → (开始日期, 结束日期)，闭区间，结果不早于数据中的最早日期。
+    “本周”为最新日期所在周的周一至最新日期。
+    """
+    max_date = pd.Timestamp(max_date).normalize()
+    min_date = pd.Timestamp(min_date).normalize()
+
+    if preset == PRESET_LAST_DAY:
+        start = max_date
+    elif preset == PRESET_LAST_7_DAYS:
+        start = max_date - timedelta(days=6)
+    elif preset == PRESET_THIS_WEEK:
+        start = max_date - timedelta(days=max_date.weekday())
+    elif preset == PRESET_LAST_30_DAYS:
+        start = max_date - timedelta(days=29)
+    else:
+        start = min_date
+    return max(start, min_date), max_date
+
+
+def previous_period(start, end):
+    """紧邻 [start, end] 之前、等长的上一周期（闭区间）"""
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    length = (end - start).days + 1
+    return start - timedelta(days=length), start - timedelta(days=1)
+
+
+def format_range(start, end):
+    """区间显示文本：单日为 “06/18”，多日为 “06/12–06/18”"""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if start == end:
+        return start.strftime("%m/%d")
+    return f"{start.strftime('%m/%d')}–{end.strftime('%m/%d')}"
+
+
+def render_date_range_picker(min_date, max_date, container=None):
+    """
+    📅 渲染日期范围选择器（默认放在侧边栏），返回本期与上期区间。
+
+    参数说明：
+    - min_date / max_date: 数据中的最早 / 最新日期（backend.min_date() / backend.max_date()）
+    - container: Streamlit 容器，默认 st.sidebar
+
+    返回：
+        (start, end, prev_start, prev_end)：均为按天归一的 pd.Timestamp，闭区间
+    """
+    container = container or st.sidebar
+    min_date, max_date = pd.Timestamp(min_date).normalize(), pd.Timestamp(max_date).normalize()
+
+    container.header("📅 日期范围")
+    preset = container.selectbox("统计区间", PRESETS, index=PRESETS.index(DEFAULT_PRESET))
+
+    if preset == PRESET_CUSTOM:
+        default_start, _ = preset_range(DEFAULT_PRESET, min_date, max_date)
+        picked = container.date_input(
+            "选择起止日期",
+            value=(default_start.date(), max_date.date()),
+            min_value=min_date.date(),
+            max_value=max_date.date(),
+        )
+        # ✅ 只选了开始日期时（选择过程中的中间状态）按单日处理
+        picked = tuple(picked) if isinstance(picked, (list, tuple)) else (picked,)
+        start = pd.Timestamp(picked[0]) if picked else default_start
+        end = pd.Timestamp(picked[1]) if len(picked) > 1 else start
+    else:
+        start, end = preset_range(preset, min_date, max_date)
+
+    prev_start, prev_end = previous_period(start, end)
+    container.caption(f"本期 {format_range(start, end)}，对比上期 {format_range(prev_start, prev_end)}")
+    return start, end, prev_start, prev_end
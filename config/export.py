@@ -0,0 +1,157 @@
+# 数据导出：卡片 / 图表背后的汇总表，以及当前日期范围 + 游戏筛选下的明细行，导出为 CSV / XLSX。
+# 文件在点击下载时才生成（Streamlit 延迟下载，在独立线程执行，不随 rerun 计算、不阻塞页面脚本），
+# 明细按块从后端读取并逐块写入磁盘临时文件，不在内存中拼出整张表或整段文本；
+# 下载接口最终需要完整的 bytes，因此明细行数超出 DASHBOARD_EXPORT_MAX_ROWS 时不提供明细导出
+
+# config/export.py
+
+import os
+import tempfile
+import threading
+from functools import partial
+
+import streamlit as st
+
+# ✅ DASHBOARD_EXPORT_WORKERS：同时生成的明细导出个数（进程内），其余点击排队等待，避免多个大导出同时占用内存
+EXPORT_WORKERS = max(1, int(os.environ.get("DASHBOARD_EXPORT_WORKERS", "2")))
+# ✅ DASHBOARD_EXPORT_MAX_ROWS：单次明细导出的行数上限（0 表示不限），超出时不提供明细下载，提示缩小日期范围 / 游戏筛选；
+#    生成的文件会整体读入内存交给下载接口，上限即限制了每个导出的峰值内存（约每万行 1 MB）
+EXPORT_MAX_ROWS = max(0, int(os.environ.get("DASHBOARD_EXPORT_MAX_ROWS", "500000")))
+XLSX_MAX_ROWS = 1_048_575               # Excel 单个工作表的数据行上限（不含表头），超出时续写到下一个工作表
+
+CSV_MIME = "text/csv"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_EXPORT_SLOTS = threading.BoundedSemaphore(EXPORT_WORKERS)
+
+
+def range_suffix(start=None, end=None):
+    """文件名中的日期范围后缀，如 "20250601-20250618"；不限范围时为空"""
+    if start is None or end is None:
+        return ""
+    return f"{start:%Y%m%d}-{end:%Y%m%d}"
+
+
+# ========== 📝 按块写出 ==========
+def _excel_values(frame):
+    """转为 openpyxl 可写入的值：缺失值为 None（NaN 会写出 Excel 无法打开的单元格）"""
+    values = frame.astype(object)
+    return values.where(frame.notna(), None)
+
+
+def write_csv(chunks, out):
+    """
+    将 DataFrame 块依次写为 CSV（UTF-8 BOM，Excel 直接打开中文不乱码），表头只写一次。
+
+    参数说明：
+    - chunks: DataFrame 的可迭代对象（列相同），至少包含一个块（可为空表）
+    - out: 二进制文件对象
+    """
+    out.write("\ufeff".encode("utf-8"))
+    for i, chunk in enumerate(chunks):
+        out.write(chunk.to_csv(index=False, header=i == 0, date_format="%Y-%m-%d").encode("utf-8"))
+
+
+def write_xlsx(chunks, out, sheet_name="数据"):
+    """
+    将 DataFrame 块依次写为 XLSX：openpyxl 只写模式逐行追加（工作表内容随写随落盘），超出单表行数上限时换表。
+
+    参数说明：同 write_csv；sheet_name 为工作表名（续表依次加序号）
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet, written = None, XLSX_MAX_ROWS
+    for chunk in chunks:
+        if sheet is None:
+            sheet, written = workbook.create_sheet(sheet_name), 0
+            sheet.append(list(chunk.columns))
+        for row in _excel_values(chunk).itertuples(index=False, name=None):
+            if written >= XLSX_MAX_ROWS:
+                sheet, written = workbook.create_sheet(f"{sheet_name}{len(workbook.worksheets) + 1}"), 0
+                sheet.append(list(chunk.columns))
+            sheet.append(row)
+            written += 1
+    workbook.save(out)
+
+
+def export_bytes(chunks, fmt, sheet_name="数据"):
+    """
+    生成导出文件内容：先逐块写入磁盘临时文件，最后一次性读出（Streamlit 下载接口需要完整的 bytes），
+    峰值内存约为文件大小 + 一个块；明细的文件大小由 EXPORT_MAX_ROWS 限制（见 render_export）。
+
+    参数说明：
+    - chunks: DataFrame 的可迭代对象（见 write_csv）
+    - fmt: "csv" / "xlsx"
+    """
+    with tempfile.TemporaryFile() as out:
+        if fmt == "xlsx":
+            write_xlsx(chunks, out, sheet_name)
+        else:
+            write_csv(chunks, out)
+        out.seek(0)
+        return out.read()
+
+
+def _table_export(data, fmt):
+    """汇总表导出（延迟下载的回调，不接受参数）"""
+    return lambda: export_bytes([data() if callable(data) else data], fmt)
+
+
+def _rows_export(rows, fmt):
+    """明细导出（延迟下载的回调）：占用一个导出名额后按块读取后端"""
+    def build():
+        with _EXPORT_SLOTS:
+            return export_bytes(rows(), fmt, sheet_name="明细")
+    return build
+
+
+def detail_rows(backend, start=None, end=None, games=None):
+    """
+    明细导出参数：按块读取后端的无参函数 + 将导出的行数（由每日汇总或 SQL COUNT 得到，不读取明细）。
+
+    返回：
+        (rows, row_count)，传给 render_export 的 rows 参数
+    """
+    return partial(backend.iter_rows, start, end, games), backend.row_count(start, end, games)
+
+
+def exceeds_row_cap(row_count):
+    """明细行数是否超出导出上限 EXPORT_MAX_ROWS（0 表示不限）"""
+    return EXPORT_MAX_ROWS > 0 and row_count > EXPORT_MAX_ROWS
+
+
+# ========== ⬇️ 下载按钮 ==========
+def render_export(name, data, key, suffix="", rows=None, container=None):
+    """
+    ⬇️ 渲染导出按钮（收在一个弹出框内）：汇总表 CSV / XLSX，可选当前筛选下的明细 CSV / XLSX。
+
+    参数说明：
+    - name: 导出内容名称（用于按钮提示与文件名），如 "每日支付单量"
+    - data: 图表 / 卡片使用的汇总 DataFrame，或返回它的无参函数（点击时才计算，如全量排行）
+    - key: 按钮 key 前缀（页面内唯一）
+    - suffix: 文件名后缀（如日期范围 "20250601-20250618"）
+    - rows: detail_rows(backend, start, end, games) 的结果 (明细块迭代器的无参函数, 行数)，None 时不提供明细导出；
+      行数超出 EXPORT_MAX_ROWS 时只显示提示，不提供明细下载
+    - container: Streamlit 容器，默认为当前位置
+    """
+    container = container or st
+    stem = f"{name}_{suffix}" if suffix else name
+    with container.popover("⬇️ 导出", help=f"下载「{name}」的数据"):
+        col1, col2 = st.columns(2)
+        col1.download_button("汇总 CSV", _table_export(data, "csv"), file_name=f"{stem}.csv",
+                             mime=CSV_MIME, key=f"{key}_csv", on_click="ignore")
+        col2.download_button("汇总 XLSX", _table_export(data, "xlsx"), file_name=f"{stem}.xlsx",
+                             mime=XLSX_MIME, key=f"{key}_xlsx", on_click="ignore")
+        if rows is None:
+            return
+        rows, row_count = rows
+        if exceeds_row_cap(row_count):
+            st.caption(f"明细共 {row_count:,} 行，超过单次导出上限 {EXPORT_MAX_ROWS:,} 行（DASHBOARD_EXPORT_MAX_ROWS），"
+                       f"请缩小日期范围或游戏筛选后再导出明细")
+        else:
+            col1.download_button("明细 CSV", _rows_export(rows, "csv"), file_name=f"{stem}_明细.csv",
+                                 mime=CSV_MIME, key=f"{key}_rows_csv", on_click="ignore")
+            col2.download_button("明细 XLSX", _rows_export(rows, "xlsx"), file_name=f"{stem}_明细.xlsx",
+                                 mime=XLSX_MIME, key=f"{key}_rows_xlsx", on_click="ignore")
+            st.caption("明细为当前日期范围与游戏筛选下的去重后数据行，点击后按块生成")
@@ -0,0 +1,116 @@
+# 库存分析：由每日汇总派生各游戏的库存占比 / 日环比库存变化 / 售罄率（快照生成时计算一次）
+
+# config/inventory.py
+
+import numpy as np
+import pandas as pd
+
+INVENTORY_COLUMNS = ["游戏名称", "在售商品数量", "库存占比", "库存变化", "售罄率"]
+
+
+def safe_ratio(numerator, denominator):
+    """逐元素相除，分母为 0 时结果为 0（不产生 inf / nan）"""
+    numerator = np.asarray(numerator, dtype="float64")
+    denominator = np.asarray(denominator, dtype="float64")
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+class InventoryStats:
+    """
+    📦 库存指标（形状均为 (天数, 游戏数)，与 DailyRollup 的行列一致，只读）：
+
+    - on_sale: 在售商品数量
+    - share: 库存占比 = 当日该游戏在售 / 当日全部游戏在售
+    - change: 日环比库存变化，取商户上报的“商品数量与昨日差值”之和；未加载该列时按相邻两天的在售差值推算
+    - sell_through: 售罄率 = 支付单量 / 在售商品数量
+
+    区间查询时，在售与占比取区间内最后一个有数据的日期（库存是时点值），
+    变化量按区间累加，售罄率由区间内的分子、分母之和重新计算（不对每日比率取平均）。
+    """
+
+    def __init__(self, rollup, on_sale, share, change, paid, sell_through):
+        self.rollup = rollup
+        self.on_sale = on_sale
+        self.share = share
+        self.change = change
+        self.paid = paid
+        self.sell_through = sell_through
+
+    @classmethod
+    def from_rollup(cls, rollup):
+        """由每日汇总构建；汇总为空或未加载在售商品数量时返回 None"""
+        if rollup is None or "在售商品数量" not in rollup.totals:
+            return None
+
+        on_sale = rollup.totals["在售商品数量"]
+        paid = rollup.totals.get("支付单量", np.zeros_like(on_sale))
+        share = safe_ratio(on_sale, on_sale.sum(axis=1, keepdims=True))
+        if "商品数量与昨日差值" in rollup.totals:
+            change = rollup.totals["商品数量与昨日差值"]
+        else:
+            change = np.diff(on_sale, axis=0, prepend=on_sale[:1])
+        return cls(rollup, on_sale, share, change, paid, safe_ratio(paid, on_sale))
+
+    def by_game(self, start=None, end=None, games=None):
+        """
+        区间内各游戏的库存指标。
+
+        参数说明：
+        - start / end: 日期闭区间（None 表示不限）
+        - games: 游戏筛选（None 表示全部）；筛选后库存占比在所选游戏之间重新归一
+
+        返回：
+            DataFrame[游戏名称, 在售商品数量, 库存占比, 库存变化, 售罄率]，按库存占比降序；区间内无数据时为空表
+        """
+        i0, i1 = self.rollup.row_range(start, end)
+        mask = self.rollup.game_mask(games)
+        present = np.flatnonzero(self.rollup.counts[i0:i1, mask].sum(axis=1) > 0)
+        if not present.size:
+            return pd.DataFrame(columns=INVENTORY_COLUMNS)
+
+        last = i0 + present[-1]
+        on_sale = self.on_sale[last, mask]
+        share = self.share[last, mask]
+        share = safe_ratio(share, share.sum()) if games is not None else share
+        result = pd.DataFrame({
+            "游戏名称": np.asarray(self.rollup.games, dtype=object)[mask],
+            "在售商品数量": on_sale,
+            "库存占比": share,
+            "库存变化": self.change[i0:i1, mask].sum(axis=0),
+            "售罄率": safe_ratio(self.paid[i0:i1, mask].sum(axis=0), self.on_sale[i0:i1, mask].sum(axis=0)),
+        })
+        result = result[self.rollup.counts[i0:i1, mask].sum(axis=0) > 0]
+        return result.sort_values("库存占比", ascending=False, kind="stable", ignore_index=True)
+
+
+def stock_total(backend, start=None, end=None, games=None):
+    """区间期末的在售商品数量合计（库存是时点值：取区间内最后一个有数据的日期，与 by_game 口径一致，不按天累加）"""
+    return int(backend.inventory_by_game(start, end, games)["在售商品数量"].sum())
+
+
+def inventory_from_sums(backend, start=None, end=None, games=None):
+    """
+    无预计算库存指标时的兜底：用后端的 sum_by 查询得到同口径结果（SQLite 后端下推为 SQL）。
+    """
+    daily = backend.sum_by("dt", "在售商品数量", start, end, games)
+    if daily.empty:
+        return pd.DataFrame(columns=INVENTORY_COLUMNS)
+
+    last = daily["dt"].max()
+    snapshot = backend.sum_by("游戏名称", "在售商品数量", last, last, games).set_index("游戏名称")["在售商品数量"]
+    sums = backend.sum_by("游戏名称", "在售商品数量", start, end, games).set_index("游戏名称")
+    for col in ["商品数量与昨日差值", "支付单量"]:
+        sums[col] = backend.sum_by("游戏名称", col, start, end, games).set_index("游戏名称")[col]
+    sums = sums.fillna(0)
+
+    on_sale = snapshot.reindex(sums.index, fill_value=0)
+    result = pd.DataFrame({
+        "游戏名称": sums.index,
+        "在售商品数量": on_sale.to_numpy(),
+        "库存占比": safe_ratio(on_sale.to_numpy(), on_sale.sum()),
+        "库存变化": sums["商品数量与昨日差值"].to_numpy(),
+        "售罄率": safe_ratio(sums["支付单量"].to_numpy(), sums["在售商品数量"].to_numpy()),
+    })
+    return result.sort_values("库存占比", ascending=False, kind="stable", ignore_index=True)
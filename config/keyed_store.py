@@ -0,0 +1,174 @@
+# 按唯一键 (dt, 商户昵称, 游戏名称) 去重的增量数据存储（upsert 语义）
+
+# config/keyed_store.py
+
+import threading
+import pandas as pd
+
+from config.template_validator import KEY_COLUMNS
+
+
+class KeyedStore:
+    """
+    🗂️ 以 (dt, 商户昵称, 游戏名称) 为唯一键的合并数据集。
+
+    - 每个来源文件带一个版本号（通常为 (修改时间ns, 文件名)），同一键以版本最新的文件为准
+    - 合并数据以唯一键建立哈希索引（MultiIndex），重新导出 / 重新上传时只替换受影响的行
+    - 保留每个文件的解析结果，文件被删除或替换时可恢复被其覆盖的旧行
+
+    使用示例：
+        store = KeyedStore()
+        store.upsert("xxx 0618.xlsx", df_0618, version=(mtime_ns, "xxx 0618.xlsx"))
+        store.upsert("xxx 0618 v2.xlsx", df_0618_v2, version=(mtime_ns2, "xxx 0618 v2.xlsx"))
+        df = store.to_frame()   # 0618 的重复行只保留 v2 版本
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()   # 多会话并发同步目录时加锁
+        self._files = {}                # {文件名: {"version", "fingerprint", "df", "warnings"}}
+        self._data = None               # 合并结果（索引为唯一键）
+        self._frame = None              # to_frame() 的缓存结果，数据变化时失效
+        self._row_start = None          # 行日期起点（见 trim），None 表示不限
+
+    # ========== 📋 文件信息 ==========
+    def file_names(self):
+        return set(self._files)
+
+    def fingerprint(self, name):
+        """返回已加载文件的指纹，未加载时返回 None"""
+        entry = self._files.get(name)
+        return entry["fingerprint"] if entry else None
+
+    def warnings(self):
+        """汇总所有已加载文件的模版校验提示：[(文件名, 提示信息)]"""
+        return [(name, w) for name in sorted(self._files) for w in self._files[name]["warnings"]]
+
+    def total_source_rows(self):
+        """所有来源文件的行数之和（去重前）"""
+        return sum(len(entry["df"]) for entry in self._files.values())
+
+    def __len__(self):
+        return 0 if self._data is None else len(self._data)
+
+    def row_start(self):
+        """最近一次 trim 的行日期起点（None 表示不限）"""
+        return self._row_start
+
+    # ========== ✏️ 写入 ==========
+    def upsert(self, name, df, version, fingerprint=None, warnings=None):
+        """
+        写入（或替换）一个来源文件的数据。
+
+        参数说明：
+        - name: 来源文件名（同名文件再次写入视为替换）
+        - df: 该文件解析后的 DataFrame，须包含唯一键三列
+        - version: 可比较的版本号，版本大者在键冲突时胜出
+        - fingerprint: 文件指纹，用于判断文件是否变化
+        - warnings: 该文件的模版校验提示列表
+        """
+        with self.lock:
+            if name in self._files:
+                self.remove(name)
+
+            # ✅ 统一 dt 为日期类型，避免字符串 / Excel 日期混用导致同一天被视为不同键
+            df = df.assign(dt=pd.to_datetime(df["dt"]))
+            indexed = df.set_index(KEY_COLUMNS, drop=False)
+            indexed = indexed[~indexed.index.duplicated(keep="last")]   # 文件内部重复键：保留最后一行
+
+            self._files[name] = {
+                "version": version,
+                "fingerprint": fingerprint,
+                "df": indexed,
+                "warnings": list(warnings or []),
+            }
+            self._merge(indexed, version)
+
+    def remove(self, name):
+        """
+        移除一个来源文件：删除其拥有的行，并从其余文件中恢复这些键的次新版本。
+        """
+        with self.lock:
+            entry = self._files.pop(name, None)
+            if entry is None or self._data is None:
+                return
+
+            owned = (self._data["来源文件"] == name).to_numpy()
+            affected = self._data.index[owned]
+            self._data = self._data[~owned]
+            self._frame = None
+
+            if affected.empty:
+                return
+
+            # ✅ 按版本从旧到新依次回填，最终保留版本最新的行
+            for other in sorted(self._files.values(), key=lambda e: e["version"]):
+                rows = other["df"][other["df"].index.isin(affected)]
+                if not rows.empty:
+                    self._merge(rows, other["version"])
+
+    def trim(self, start):
+        """
+        丢弃 dt 早于 start 的行（含各文件的解析结果，移除文件时不会再恢复），并记录行日期起点。
+        分层保留时明细层起点每天前移，过期的行由汇总层接管；start 为 None 时只记录。
+        """
+        with self.lock:
+            self._row_start = start
+            if start is None or self._data is None:
+                return
+            for name, entry in list(self._files.items()):
+                df = entry["df"]
+                if len(df) and df["dt"].min() < start:
+                    self._files[name] = {**entry, "df": df[(df["dt"] >= start).to_numpy()]}
+            expired = (self._data["dt"] < start).to_numpy()
+            if expired.any():
+                self._data = self._data[~expired]
+                self._frame = None
+
+    def _merge(self, indexed, version):
+        """将已建索引的行按版本合并进 _data（仅处理与已有键冲突的行）"""
+        self._frame = None
+
+        if self._data is None or self._data.empty:
+            self._data = indexed
+            return
+
+        hit = self._data.index.isin(indexed.index)      # 哈希查找冲突键
+        if not hit.any():
+            self._data = pd.concat([self._data, indexed])
+            return
+
+        # ✅ 冲突行中，已有版本更新的保留，其余由新数据替换
+        existing = self._data[hit]
+        versions = {n: e["version"] for n, e in self._files.items()}
+        keep_old = [versions.get(n, version) > version for n in existing["来源文件"]]
+        kept = existing[keep_old]
+        incoming = indexed[~indexed.index.isin(kept.index)]
+
+        self._data = pd.concat([self._data[~hit], kept, incoming])
+
+    # ========== 💾 持久化 ==========
+    def state(self):
+        """可持久化的存储内容（各文件解析结果 + 合并结果），用于启动预热的磁盘缓存（见 config/warm_start.py）"""
+        with self.lock:
+            return {"files": dict(self._files), "data": self._data, "row_start": self._row_start}
+
+    def restore(self, state):
+        """以 state() 的结果整体替换存储内容"""
+        with self.lock:
+            self._files = dict(state["files"])
+            self._data = state["data"]
+            self._row_start = state.get("row_start")
+            self._frame = None
+
+    # ========== 📤 读取 ==========
+    def to_frame(self):
+        """
+        返回去重后的合并 DataFrame（普通 RangeIndex）。
+        结果在数据变化前会被复用；返回浅拷贝，调用方新增 / 替换列不会影响存储本身。
+        """
+        with self.lock:
+            if self._data is None:
+                return None
+            if self._frame is None:
+                self._frame = self._data.reset_index(drop=True)
+            return self._frame.copy(deep=False)
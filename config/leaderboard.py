@@ -0,0 +1,136 @@
+# 商户排行榜：区间内按商户汇总（进程级缓存）+ 部分选择取 Top-K + 服务端分页，只把当前页发给浏览器
+
+# config/leaderboard.py
+
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from config.data_backend import MERCHANT_SERIES_COLUMNS
+from config.export import range_suffix, render_export
+from config.mappings import merchant_brands
+
+PAGE_SIZES = [10, 20, 50]
+GRAINS = ["商户", "品牌"]         # 排行粒度：单个商户 / 商户品牌（昵称去掉编号后缀，见 config.mappings）
+TOTALS_CACHE_SIZE = 16          # 缓存的（数据版本, 日期范围, 游戏筛选）汇总个数
+
+# ✅ 进程级缓存：{(数据源 id, 开始, 结束, 游戏): (数据源, 按商户汇总 DataFrame)}
+#    排序列 / 翻页变化时直接复用同一份汇总；数据源（每日汇总或后端）被替换后自然失效
+_TOTALS = OrderedDict()
+_TOTALS_LOCK = threading.Lock()
+
+
+def cached_merchant_totals(backend, start=None, end=None, games=None):
+    """
+    获取区间内按商户的汇总（backend.merchant_totals），同一数据版本 + 范围 + 筛选只计算一次。
+
+    返回：
+        DataFrame[商户昵称, 已加载的 MERCHANT_SERIES_COLUMNS...]（视为只读）
+    """
+    source = getattr(backend, "rollup", None) or backend
+    key = (id(source), start, end, None if games is None else tuple(sorted(games)))
+
+    with _TOTALS_LOCK:
+        cached = _TOTALS.get(key)
+        if cached is not None and cached[0] is source:
+            _TOTALS.move_to_end(key)
+            return cached[1]
+
+    totals = backend.merchant_totals(start, end, games)
+    with _TOTALS_LOCK:
+        _TOTALS[key] = (source, totals)
+        _TOTALS.move_to_end(key)
+        while len(_TOTALS) > TOTALS_CACHE_SIZE:
+            _TOTALS.popitem(last=False)
+    return totals
+
+
+def series_columns(totals):
+    """汇总表中已加载的数值列（列投影未读取 完结单量 时不含该列）"""
+    return [c for c in MERCHANT_SERIES_COLUMNS if c in totals.columns]
+
+
+def brand_totals(totals):
+    """
+    按商户品牌合并商户汇总（品牌由商户昵称按类别改写得到，只对去重昵称做一次映射）。
+
+    返回：
+        DataFrame[商户品牌, 商户数, 各数值列]
+    """
+    brands = pd.Series(merchant_brands(totals["商户昵称"]), index=totals.index, name="商户品牌")
+    grouped = totals.groupby(brands, sort=False)
+    result = grouped[series_columns(totals)].sum()
+    result.insert(0, "商户数", grouped.size())
+    return result.reset_index()
+
+
+def top_k_page(totals, sort_col, page=0, page_size=20, name_col="商户昵称"):
+    """
+    取排序后的第 page 页（从 0 开始）：只对前 (page+1)*page_size 名做部分选择（argpartition）再排序，
+    不对全部商户排序。同分按名称列（name_col）升序。
+
+    返回：
+        DataFrame[排名, 名称列, 各数值列]（仅当前页）
+    """
+    n = len(totals)
+    k = min(n, (page + 1) * page_size)
+    if k == 0:
+        return totals.iloc[0:0].assign(排名=[])
+
+    values = totals[sort_col].to_numpy()
+    names = totals[name_col].to_numpy(dtype=object)
+    if k < n:
+        # ✅ 第 k 名的分数为门槛：高于门槛的全部入选，与门槛同分者按昵称再做一次部分选择补足 k 个
+        threshold = values[np.argpartition(-values, k - 1)[k - 1]]
+        above = np.flatnonzero(values > threshold)
+        ties = np.flatnonzero(values == threshold)
+        need = k - len(above)
+        if need < len(ties):
+            tie_names = names[ties].astype(str)
+            ties = ties[np.argpartition(tie_names, need - 1)[:need]]
+        top = np.concatenate([above, ties])
+    else:
+        top = np.arange(n)
+    top = top[np.lexsort((names[top].astype(str), -values[top]))][page * page_size:k]
+
+    page_df = totals.iloc[top].reset_index(drop=True)
+    page_df.insert(0, "排名", np.arange(page * page_size + 1, page * page_size + len(page_df) + 1))
+    return page_df
+
+
+def render_leaderboard(backend, start=None, end=None, games=None):
+    """
+    🏆 渲染商户排行榜：排序指标 / 每页条数 / 页码控件 + 当前页表格。
+
+    参数说明：
+    - backend: 查询后端（需提供 merchant_totals）
+    - start / end: 日期闭区间（与页面日期范围一致）
+    - games: 游戏筛选（None 表示全部）
+    """
+    totals = cached_merchant_totals(backend, start, end, games)
+    if totals.empty:
+        st.info("所选范围内没有商户数据")
+        return
+
+    col0, col1, col2, col3 = st.columns([1, 3, 1, 1])
+    grain = col0.radio("粒度", GRAINS, horizontal=True, key="leaderboard_grain")
+    sort_col = col1.radio("排序指标", series_columns(totals), index=1, horizontal=True, key="leaderboard_sort")
+    page_size = col2.selectbox("每页", PAGE_SIZES, index=1, key="leaderboard_page_size")
+
+    name_col = "商户昵称"
+    if grain == "品牌":
+        totals, name_col = brand_totals(totals), "商户品牌"
+    pages = math.ceil(len(totals) / page_size)
+    page = col3.number_input(f"页码（共 {pages} 页）", min_value=1, max_value=pages, value=1, step=1,
+                             key="leaderboard_page")
+
+    page_df = top_k_page(totals, sort_col, page=min(int(page), pages) - 1, page_size=page_size, name_col=name_col)
+    st.dataframe(page_df, hide_index=True, use_container_width=True)
+    st.caption(f"共 {len(totals)} 个{'品牌' if grain == '品牌' else '商户'}，按「{sort_col}」降序；在售商品数量取区间内最后一天")
+    # ✅ 导出全部排名（点击下载时才排序，排名规则与分页一致）
+    render_export(f"{grain}排行_{sort_col}", lambda: top_k_page(totals, sort_col, page_size=len(totals), name_col=name_col),
+                  key="leaderboard_export", suffix=range_suffix(start, end))
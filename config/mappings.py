@@ -0,0 +1,186 @@
+# 名称映射：游戏别名 → 规范游戏名、商户昵称 → 商户品牌（去掉 “-400” 一类编号后缀）
+# 游戏名在导入时按类别整体改写（只对去重后的名称做映射，再按编码取回各行），多个别名改写为同一规范名时按唯一键合并求和；
+# 映射带版本戳：映射变化后只有包含受影响原始名称的文件 / 汇总分组会被重新导入，其余沿用
+
+# config/mappings.py
+
+import os
+import re
+import json
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config.template_validator import KEY_COLUMNS
+
+# ✅ 规范化规则版本：修改 normalize_names / canonical_games 的规则时递增，所有文件重新导入
+NORMALIZE_VERSION = 2
+
+# ✅ 游戏别名（键按 normalize_names 规范化后匹配，值为展示用的规范名）。
+#    只收录同一款游戏的不同写法；外服 / 国际服等独立运营的版本保持独立（如 “皇室战争外服”）
+GAME_ALIASES = {
+    "崩坏星穹铁道": "星穹铁道崩坏",
+    "崩坏：星穹铁道": "星穹铁道崩坏",
+    "星穹铁道": "星穹铁道崩坏",
+    "反恐精英2": "cs2",
+    "王者": "王者荣耀",
+    "lol": "英雄联盟",
+    "lol手游": "英雄联盟手游",
+}
+
+# ✅ 商户品牌别名（去掉编号后缀后再匹配），用于把同一品牌的不同叫法合并
+MERCHANT_BRAND_ALIASES = {}
+
+# ✅ DASHBOARD_MAPPINGS：可选 JSON 文件 {"games": {...}, "merchant_brands": {...}}，覆盖 / 补充上面的表；
+#    文件修改后下一次同步即生效（按修改时间重新读取），无需重启
+MAPPINGS_FILE = os.environ.get("DASHBOARD_MAPPINGS", "")
+
+BRAND_SUFFIX = re.compile(r"\s*[-－_—]\s*\d+$")      # 商户昵称末尾的编号，如 “极游电竞-400”
+
+_LOADED = {}                    # {文件路径: (修改时间, (游戏别名, 品牌别名))}
+_LOADED_LOCK = threading.Lock()
+
+
+# ========== 📖 映射表 ==========
+def normalize_names(names):
+    """名称规范化（只作用于去重后的名称）：全角转半角（NFKC）、去掉全部空白、英文转小写"""
+    values = pd.Series(np.asarray(names, dtype=object), dtype=object).astype(str)
+    return values.str.normalize("NFKC").str.replace(r"\s+", "", regex=True).str.casefold().to_numpy(dtype=object)
+
+
+def _normalized_table(table):
+    return dict(zip(normalize_names(list(table)), table.values()))
+
+
+def load_mappings(path=None):
+    """
+    当前生效的映射表：内置表 + DASHBOARD_MAPPINGS 文件（按修改时间缓存，文件不存在或格式错误时只用内置表）。
+
+    返回：
+        (游戏别名, 品牌别名)：键均已规范化
+    """
+    path = MAPPINGS_FILE if path is None else path
+    games, brands = dict(GAME_ALIASES), dict(MERCHANT_BRAND_ALIASES)
+    if path:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with _LOADED_LOCK:
+            cached = _LOADED.get(path)
+        if mtime is not None and (cached is None or cached[0] != mtime):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    extra = json.load(f)
+                cached = (mtime, (dict(extra.get("games", {})), dict(extra.get("merchant_brands", {}))))
+            except (OSError, ValueError, AttributeError):
+                cached = (mtime, ({}, {}))
+            with _LOADED_LOCK:
+                _LOADED[path] = cached
+        if mtime is not None:
+            games.update(cached[1][0])
+            brands.update(cached[1][1])
+    return _normalized_table(games), _normalized_table(brands)
+
+
+# ========== 🔁 类别改写 ==========
+def remap_categories(values, mapper):
+    """
+    按类别改写：values 先编码为（编码, 去重名称），mapper 只作用于去重名称，
+    再把改写后的名称重新编码并按行取回。缺失值保持缺失。
+
+    参数说明：
+    - values: 名称列（Series / 数组）
+    - mapper: 去重名称数组 → 等长的改写后名称数组
+
+    返回：
+        (object 数组, 原始去重名称, 改写后去重名称)
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    uniques = np.asarray(uniques, dtype=object)
+    mapped = np.asarray(mapper(uniques), dtype=object)
+    mapped_codes, mapped_uniques = pd.factorize(mapped)
+    result = np.asarray(mapped_uniques, dtype=object).take(mapped_codes)[codes]
+    result[codes < 0] = None
+    return result, uniques, mapped
+
+
+def canonical_games(names, aliases=None):
+    """去重游戏名 → 规范游戏名：规范化结果只用于查别名表，未收录的名称保持原始写法（如 “PUBG Mobile”）"""
+    aliases = load_mappings()[0] if aliases is None else aliases
+    names = np.asarray(names, dtype=object)
+    return np.array([aliases.get(n, raw) for n, raw in zip(normalize_names(names), names)], dtype=object)
+
+
+def merchant_brands(names, aliases=None):
+    """
+    商户昵称 → 商户品牌（逐行结果，按类别改写）：去掉末尾编号后规范化查品牌别名表，未收录时为去掉编号后的昵称。
+    """
+    aliases = load_mappings()[1] if aliases is None else aliases
+
+    def to_brand(uniques):
+        stripped = pd.Series(uniques, dtype=object).astype(str).str.replace(BRAND_SUFFIX, "", regex=True).str.strip()
+        stripped = stripped.mask(stripped == "", pd.Series(uniques, dtype=object).astype(str)).to_numpy(dtype=object)
+        return np.array([aliases.get(n, s) for n, s in zip(normalize_names(stripped), stripped)], dtype=object)
+
+    return remap_categories(names, to_brand)[0]
+
+
+# ========== 🏷️ 版本戳 ==========
+def mapping_stamp(raw_names, aliases=None):
+    """
+    一组原始游戏名在当前映射下的版本戳：只由这些名称的改写结果决定，
+    映射变化但不涉及这些名称时版本戳不变（对应的文件 / 汇总无需重新导入）。
+    """
+    raw_names = sorted(str(n) for n in raw_names)
+    pairs = [[r, c] for r, c in zip(raw_names, canonical_games(raw_names, aliases)) if r != c]
+    payload = json.dumps([NORMALIZE_VERSION, pairs], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def canonicalize_games(df):
+    """
+    导入时改写 df 的游戏名称列（按类别改写，不逐行映射）。
+    多个原始名称改写为同一规范名（如 “崩坏星穹铁道” 与 “星穹铁道” 同一天同一商户各有一行）时，
+    按唯一键合并、数值列求和（同一原始名称的重复行仍只保留最后一行，与 KeyedStore 一致），不让后写入的行覆盖前者。
+
+    返回：
+        (改写后的 DataFrame, 映射标记)：映射标记为 (版本戳, 原始游戏名元组)，追加在文件指纹之后，
+        供 stamp_current 判断映射变化后该文件是否需要重新导入
+    """
+    aliases = load_mappings()[0]
+    column, raw, mapped = remap_categories(df["游戏名称"], lambda u: canonical_games(u, aliases))
+    raw_names = tuple(sorted(str(n) for n in raw))
+    if np.array_equal(raw, mapped):
+        return df, (mapping_stamp(raw_names, aliases), raw_names)
+
+    original = df["游戏名称"]
+    df = df.assign(游戏名称=column)
+    if pd.Series(mapped, dtype=object).duplicated().any():
+        # ✅ 别名冲突：先按原始名称去重（保留最后一行），再按规范名合并求和
+        df = df.assign(dt=pd.to_datetime(df["dt"]))
+        df = df[~pd.concat([df[["dt", "商户昵称"]], original], axis=1).duplicated(keep="last")]
+        df = (df.groupby(KEY_COLUMNS, sort=False, as_index=False, dropna=False)
+              .sum(numeric_only=True).reindex(columns=df.columns))
+    return df, (mapping_stamp(raw_names, aliases), raw_names)
+
+
+def stamp_current(stored, key):
+    """
+    存储中的指纹是否仍然有效：文件指纹部分与 key 相同，且映射标记在当前映射下未变化。
+    （SQLite 存储以 JSON 保存指纹，嵌套元组读回为列表）
+    """
+    if stored is None:
+        return False
+    stored = tuple(stored)
+    n = len(key)
+    if stored[:n] != tuple(key) or len(stored) != n + 2:
+        return False
+    return stored[n] == mapping_stamp(stored[n + 1])
+
+
+def failed_stamp():
+    """读取失败的文件没有游戏名，映射标记恒定（映射变化不会触发重新解析）"""
+    return mapping_stamp(()), ()
@@ -0,0 +1,184 @@
+# 商户索引：商户昵称 n-gram 倒排索引（输入即搜）+ 按商户排序的列存与行偏移（单商户明细直接切片）
+
+# config/merchant_index.py
+
+import bisect
+
+import numpy as np
+import pandas as pd
+
+from config.rollup import to_datetime_index
+from config.data_backend import MERCHANT_SERIES_COLUMNS as SERIES_COLUMNS
+NGRAM_SIZES = (1, 2)                                        # 单字 + 双字切片，中文昵称按字检索
+
+
+def normalize_name(name):
+    """检索用的规范化：忽略大小写与首尾空白"""
+    return str(name).strip().casefold()
+
+
+def name_grams(text):
+    """文本的全部 1-gram / 2-gram（去重）"""
+    return {text[i:i + n] for n in NGRAM_SIZES for i in range(len(text) - n + 1)}
+
+
+class MerchantIndex:
+    """
+    🔍 商户索引（数据快照生成时构建一次，所有会话共享，只读）。
+
+    - 商户编码按规范化后的昵称排序分配：前缀匹配是一段连续编码区间（二分查找），
+      倒排表中的编码天然有序，取前 N 个即是按名称排序的结果，无需再排序
+    - postings[gram]: 包含该 1-gram / 2-gram 的商户编码（升序 int32 数组）
+    - 明细行按商户编码排序存成列数组，第 i 个商户的行位于 [offsets[i], offsets[i+1])
+      （from_names 构建的索引只含检索部分，不含明细行，has_rows 为 False）
+
+    搜索只做字典查找与小数组求交；单商户明细为一次切片，代价只与该商户的行数有关。
+    """
+
+    def __init__(self, names, keys, postings, offsets, start, day, games, game_codes, values):
+        self.names = names                  # 商户昵称（按编码）
+        self.keys = keys                    # 规范化后的昵称（升序，用于前缀二分）
+        self.postings = postings            # {gram: ndarray[int32]}
+        self.offsets = offsets              # ndarray[商户数 + 1]
+        self.start = start                  # day = 0 对应的日期
+        self.day = day                      # 以下均为按商户排序后的明细列
+        self.games = games
+        self.game_codes = game_codes
+        self.values = values                # {列名: ndarray}
+        self.codes = {name: i for i, name in enumerate(names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def has_rows(self):
+        """是否含单商户明细（from_names 构建的检索索引为 False）"""
+        return self.offsets is not None
+
+    @staticmethod
+    def _search_keys(unique_names):
+        """
+        商户检索部分：按规范化昵称排序并建立 gram 倒排表。
+
+        返回：
+            (names, keys, postings, order)：order 为 unique_names 的下标按名称排序后的顺序
+        """
+        unique_names = np.asarray(unique_names, dtype=object).astype(str).astype(object)
+        keys = np.array([normalize_name(n) for n in unique_names], dtype=object)
+        order = np.lexsort((unique_names.astype(str), keys.astype(str)))       # 规范化名相同时按原名排序
+        names, keys = list(unique_names[order]), list(keys[order])
+
+        # ✅ 倒排表：每个商户的 gram 集合展开后按 gram 分组，编码已按名称升序
+        postings = {}
+        for code, key in enumerate(keys):
+            for gram in name_grams(key):
+                postings.setdefault(gram, []).append(code)
+        postings = {gram: np.asarray(codes, dtype=np.int32) for gram, codes in postings.items()}
+        return names, keys, postings, order
+
+    @classmethod
+    def from_names(cls, names):
+        """只由商户昵称构建检索索引（不含明细行，单商户明细由调用方另行查询），names 为空时返回 None"""
+        if not len(names):
+            return None
+        names, keys, postings, _ = cls._search_keys(pd.unique(np.asarray(names, dtype=object)))
+        return cls(names, keys, postings, None, None, None, [], None, {})
+
+    @classmethod
+    def from_frame(cls, df):
+        """由去重后的明细数据构建，df 为空或 None 时返回 None"""
+        if df is None or df.empty:
+            return None
+
+        raw_codes, unique_names = pd.factorize(df["商户昵称"])
+        names, keys, postings, order = cls._search_keys(unique_names)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))                                     # factorize 编码 → 按名称排序后的编码
+
+        # ✅ 明细行按商户编码稳定排序，记录每个商户的起止偏移
+        codes = np.where(raw_codes >= 0, rank[raw_codes], len(names))            # 商户为空的行排在最后，不属于任何商户
+        row_order = np.argsort(codes, kind="stable")
+        offsets = np.searchsorted(codes[row_order], np.arange(len(names) + 1), side="left")
+
+        dt = to_datetime_index(df["dt"])
+        start = dt.min()
+        day = np.asarray((dt - start).days, dtype="float64")
+        day = np.where(np.isnan(day), -1, day).astype(np.int32)[row_order]
+        game_codes, games = pd.factorize(df["游戏名称"], sort=True)
+        values = {
+            col: pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=np.int64)[row_order]
+            for col in SERIES_COLUMNS if col in df.columns
+        }
+        return cls(names, keys, postings, offsets, start, day, list(games),
+                   game_codes.astype(np.int32)[row_order], values)
+
+    # ========== 🔎 检索 ==========
+    def search(self, query, limit=20):
+        """
+        按昵称检索商户：前缀匹配排在前面，其余包含该关键字的商户随后（各自按名称排序）。
+
+        参数说明：
+        - query: 输入的关键字（忽略大小写与首尾空白），为空时返回 []
+        - limit: 最多返回的商户数
+
+        返回：
+            list[str]：商户昵称
+        """
+        key = normalize_name(query)
+        if not key:
+            return []
+
+        # ✅ 前缀：排序后的连续区间
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_left(self.keys, key + "\uffff")
+        result = list(range(lo, min(hi, lo + limit)))
+        if len(result) >= limit:
+            return [self.names[i] for i in result]
+
+        # ✅ 包含：关键字的全部 2-gram（单字时为 1-gram）倒排表求交，短表优先；再逐个确认子串
+        grams = name_grams(key) if len(key) < 2 else {key[i:i + 2] for i in range(len(key) - 1)}
+        lists = sorted((self.postings.get(g) for g in grams), key=lambda a: -1 if a is None else len(a))
+        if lists[0] is None:
+            return [self.names[i] for i in result]
+        candidates = lists[0]
+        for other in lists[1:]:
+            candidates = np.intersect1d(candidates, other, assume_unique=True)
+            if not candidates.size:
+                break
+
+        for code in candidates:
+            if lo <= code < hi:
+                continue
+            if len(key) <= 2 or key in self.keys[code]:
+                result.append(int(code))
+                if len(result) >= limit:
+                    break
+        return [self.names[i] for i in result]
+
+    # ========== 📄 单商户明细 ==========
+    def merchant_rows(self, name, start=None, end=None, games=None):
+        """
+        单个商户的逐日明细（按商户偏移直接切片），返回 DataFrame[dt, 游戏名称, SERIES_COLUMNS...]，
+        按 dt、游戏名称排序；商户不存在时返回空表。
+        """
+        columns = ["dt", "游戏名称"] + list(self.values)
+        code = self.codes.get(name)
+        if code is None or not self.has_rows:
+            return pd.DataFrame(columns=columns)
+
+        lo, hi = self.offsets[code], self.offsets[code + 1]
+        day, game_codes = self.day[lo:hi], self.game_codes[lo:hi]
+        keep = (day >= 0) & (game_codes >= 0)
+        if start is not None:
+            keep &= day >= (pd.Timestamp(start).normalize() - self.start).days
+        if end is not None:
+            keep &= day <= (pd.Timestamp(end).normalize() - self.start).days
+        if games is not None:
+            keep &= np.isin(np.asarray(self.games, dtype=object)[game_codes], list(games))
+
+        result = pd.DataFrame({
+            "dt": self.start + pd.to_timedelta(day[keep], unit="D"),
+            "游戏名称": np.asarray(self.games, dtype=object)[game_codes[keep]],
+            **{col: values[lo:hi][keep] for col, values in self.values.items()},
+        })
+        return result.sort_values(["dt", "游戏名称"], ignore_index=True)
@@ -0,0 +1,74 @@
+# 商户明细视图：输入关键字检索商户，查看单个商户按游戏拆分的逐日走势
+
+# config/merchant_view.py
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from config.chart_theme import TEMPLATE_NAME
+from config.data_backend import MERCHANT_SERIES_COLUMNS
+from config.export import range_suffix, render_export
+
+SEARCH_LIMIT = 20       # 下拉候选最多显示的商户数
+
+
+def draw_merchant_chart(data, metric):
+    """
+    单商户逐日折线图：每个游戏一条线，缺失日期补 0。
+
+    参数说明：
+    - data: backend.merchant_series() 的结果，包含 dt / 游戏名称 / 数值列
+    - metric: 要展示的数值列（MERCHANT_SERIES_COLUMNS 之一）
+    """
+    wide = data.pivot_table(index="dt", columns="游戏名称", values=metric, aggfunc="sum")
+    full_dates = pd.date_range(wide.index.min(), wide.index.max(), freq="D")
+    wide = wide.reindex(full_dates, fill_value=0).fillna(0).astype(int)
+    long = wide.rename_axis("dt").reset_index().melt(id_vars="dt", var_name="游戏名称", value_name=metric)
+    long = long.assign(日期=long["dt"].dt.strftime("%m/%d"))
+
+    fig = px.line(long, x="日期", y=metric, color="游戏名称", markers=True, template=TEMPLATE_NAME)
+    fig.update_yaxes(title_text=metric, tickformat="d", rangemode="tozero", showline=True)
+    fig.update_xaxes(title_text=None, tickangle=-30, type="category", showline=True)
+    fig.update_traces(hovertemplate=f"%{{fullData.name}}: %{{y}}<extra></extra>")
+    fig.update_layout(hovermode="x unified", legend={"title_text": None})
+    return fig
+
+
+def render_merchant_drilldown(backend, start=None, end=None, games=None):
+    """
+    🔍 渲染商户明细区块：搜索框 → 候选商户 → 指标走势 + 按游戏汇总。
+
+    检索与明细均走后端统一接口（有商户索引时为倒排索引 + 行偏移切片，输入即搜无需扫描整表）。
+
+    参数说明：
+    - backend: 查询后端（MemoryBackend / SQLiteBackend）
+    - start / end: 日期闭区间（与页面日期范围一致）
+    - games: 游戏筛选（None 表示全部）
+    """
+    query = st.text_input("搜索商户昵称", placeholder="输入商户昵称或其中几个字，如 极游电竞", key="merchant_query")
+    if not query.strip():
+        st.caption("输入关键字后选择商户，查看该商户各游戏的逐日数据")
+        return
+
+    matches = backend.search_merchants(query, limit=SEARCH_LIMIT)
+    if not matches:
+        st.info(f"没有昵称包含「{query.strip()}」的商户")
+        return
+
+    merchant = st.selectbox(f"匹配的商户（最多显示 {SEARCH_LIMIT} 个）", matches, key="merchant_selected")
+    data = backend.merchant_series(merchant, start=start, end=end, games=games)
+    if data.empty:
+        st.info(f"{merchant} 在所选日期范围内没有数据")
+        return
+
+    metrics = [c for c in MERCHANT_SERIES_COLUMNS if c in data.columns]           # ✅ 列投影未读取的列不提供
+    metric = st.radio("指标", metrics, index=1, horizontal=True, key="merchant_metric")
+    st.plotly_chart(draw_merchant_chart(data, metric), use_container_width=True, theme=None, key="merchant_chart")
+    render_export(f"商户明细_{merchant}", data, key="merchant_export", suffix=range_suffix(start, end))
+
+    # ✅ 按游戏汇总（在售商品数量取区间内最后一天的值，订单量取区间合计）
+    last_day = data[data["dt"] == data["dt"].max()].groupby("游戏名称")["在售商品数量"].sum()
+    summary = data.groupby("游戏名称")[[c for c in ("支付单量", "完结单量") if c in data.columns]].sum()
+    summary.insert(0, "最新在售商品数量", last_day.reindex(summary.index, fill_value=0).astype(int))
+    st.dataframe(summary.reset_index(), hide_index=True, use_container_width=True)
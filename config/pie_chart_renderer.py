@@ -33,13 +33,13 @@ def render_pie_chart(title, data, chart_key, container=None, charts=None):
             container.subheader(title)
             fig = charts["draw_pie_chart"](data)  # v1 返回 Plotly 图对象
             if fig is not None:
-                container.plotly_chart(fig, use_container_width=True, key=chart_key)
+                container.plotly_chart(fig, use_container_width=True, theme=None, key=chart_key)
         else:
             # ▶ 如果没有传容器，就用主区域 st 渲染
             st.subheader(title)
             fig = charts["draw_pie_chart"](data)
             if fig is not None:
-                st.plotly_chart(fig, use_container_width=True, key=chart_key)
+                st.plotly_chart(fig, use_container_width=True, theme=None, key=chart_key)
 
     # ✅ === 分支处理：ECharts 渲染（v2 高定制） ===
     else:
@@ -0,0 +1,64 @@
+# 比率指标：完结率 / 在售转化率，一律由区间内分子、分母之和重新计算（不对每日或每个游戏的比率取平均）
+
+# config/ratios.py
+
+import numpy as np
+import pandas as pd
+
+from config.inventory import safe_ratio
+
+# ✅ 比率定义：{名称: (分子列, 分母列)}
+RATIOS = {
+    "完结率": ("完结单量", "支付单量"),               # 完结单量 / 支付单量
+    "在售转化率": ("支付单量", "在售商品数量"),        # 每件在售商品带来的支付单量
+}
+
+# ✅ 比率的展示精度（有效数字）：在售转化率通常只有万分之几，固定小数位的百分比会全部显示为 0%
+RATIO_DIGITS = {
+    "完结率": 3,
+    "在售转化率": 2,
+}
+
+
+def available_ratios(backend):
+    """分子、分母均已加载的比率名称（DASHBOARD_COLUMNS 未读取 完结单量 时不提供完结率）"""
+    return [name for name, columns in RATIOS.items() if all(backend.has_metric(c) for c in columns)]
+
+
+def ratio_tickformat(name):
+    """Plotly（d3-format）的刻度 / 悬停格式：按有效数字显示百分比，去掉末尾的 0（如 0.023%、41.4%）"""
+    return f".{RATIO_DIGITS.get(name, 3)}~p"
+
+
+def format_ratio(value, name):
+    """与 ratio_tickformat 一致的文本格式（用于图上直接标注的数值）"""
+    digits = RATIO_DIGITS.get(name, 3)
+    return np.format_float_positional(value * 100, precision=digits, unique=False, fractional=False, trim="-") + "%"
+
+
+def ratio_by(backend, by, name, start=None, end=None, games=None):
+    """
+    按 dt 或 游戏名称 分组计算比率（分子、分母各自经 backend.sum_by 求和，有每日汇总时不访问明细行）。
+
+    参数说明：
+    - backend: 查询后端
+    - by: "dt"（逐日，整体）或 "游戏名称"（区间内按游戏）
+    - name: RATIOS 中的比率名称
+    - start / end / games: 同后端查询接口
+
+    返回：
+        DataFrame[by, 分子列, 分母列, name]，按 by 排序
+    """
+    numerator, denominator = RATIOS[name]
+    num = backend.sum_by(by, numerator, start, end, games)
+    den = backend.sum_by(by, denominator, start, end, games)
+    df = pd.merge(num, den, on=by, how="outer").fillna(0).sort_values(by, ignore_index=True)
+    df[[numerator, denominator]] = df[[numerator, denominator]].astype("int64")
+    return df.assign(**{name: safe_ratio(df[numerator], df[denominator])})
+
+
+def ratio_total(backend, name, start=None, end=None, games=None):
+    """区间内的整体比率：Σ分子 / Σ分母（分母为 0 时为 0）"""
+    numerator, denominator = RATIOS[name]
+    return float(safe_ratio(backend.metric_sum(numerator, start, end, games),
+                            backend.metric_sum(denominator, start, end, games)))
@@ -0,0 +1,149 @@
+# 商户留存 / 流失：快照生成时为每个商户建立逐日活跃位图（每天 1 bit），留存、新增、回流、流失与同期群三角
+# 一律由按位与 / 或 + popcount 得到，不对明细行的商户集合反复求交并
+
+# config/retention.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# ✅ 是否额外按游戏建立位图（游戏筛选下的留存）；关闭时内存只占“天数 × 商户数 / 8”字节，游戏筛选被忽略
+RETENTION_BY_GAME = os.environ.get("DASHBOARD_RETENTION_BY_GAME", "1") == "1"
+COHORT_DAYS = 7                 # 同期群三角展示第 1 ~ 7 天留存
+
+SUMMARY_KEYS = ["活跃", "新增", "回流", "留存", "流失"]
+
+
+def popcount(bits, axis=None):
+    """位图中置 1 的位数（按字节 popcount 后求和）"""
+    return np.bitwise_count(bits).sum(axis=axis, dtype=np.int64)
+
+
+class ActivityBits:
+    """
+    👥 商户活跃位图（数据快照生成时构建，所有会话共享，只读）：
+
+    - day_bits: (天数, ⌈商户数/8⌉) uint8，第 d 行第 m 位表示商户 m 当天有数据（任一游戏）
+    - game_bits: (游戏数, 天数, ⌈商户数/8⌉) uint8，按游戏拆分的同一位图；未启用时为 None
+
+    一年 × 1 万商户的 day_bits 约 450 KB；区间查询只对若干行做按位或 / 与，再 popcount 计数。
+    """
+
+    def __init__(self, rollup, day_bits, game_bits=None):
+        self.rollup = rollup
+        self.day_bits = day_bits
+        self.game_bits = game_bits
+
+    @classmethod
+    def from_rollup(cls, rollup, by_game=None):
+        """由每日汇总中按天排序的 (商户, 游戏) 对直接置位构建；汇总为空时返回 None"""
+        if rollup is None:
+            return None
+
+        by_game = RETENTION_BY_GAME if by_game is None else by_game
+        n_days = len(rollup.pair_offsets) - 1
+        n_bytes = (len(rollup.merchants) + 7) // 8
+        day = np.repeat(np.arange(n_days), np.diff(rollup.pair_offsets))
+        byte = rollup.pair_merchants >> 3
+        bit = (0x80 >> (rollup.pair_merchants & 7)).astype(np.uint8)     # 与 np.packbits 的默认位序（高位在前）一致
+
+        day_bits = np.zeros((n_days, n_bytes), dtype=np.uint8)
+        np.bitwise_or.at(day_bits, (day, byte), bit)
+        game_bits = None
+        if by_game:
+            game_bits = np.zeros((len(rollup.games), n_days, n_bytes), dtype=np.uint8)
+            np.bitwise_or.at(game_bits, (rollup.pair_games, day, byte), bit)
+        return cls(rollup, day_bits, game_bits)
+
+    @property
+    def nbytes(self):
+        return self.day_bits.nbytes + (0 if self.game_bits is None else self.game_bits.nbytes)
+
+    def bits(self, games=None):
+        """游戏筛选下的逐日位图：未筛选（或未按游戏建位图）时为 day_bits，否则为所选游戏位图的按位或"""
+        if games is None or self.game_bits is None:
+            return self.day_bits
+        mask = self.rollup.game_mask(games)
+        if not mask.any():
+            return np.zeros_like(self.day_bits)
+        return np.bitwise_or.reduce(self.game_bits[mask], axis=0)
+
+    def summary(self, start=None, end=None, games=None):
+        """
+        区间内商户的活跃构成，以紧邻的上一等长区间为参照。
+
+        参数说明：
+        - start / end: 日期闭区间（None 表示不限）
+        - games: 游戏筛选（None 表示全部）
+
+        返回：
+            dict：
+            - 活跃：区间内有数据的商户
+            - 新增：区间内活跃、且此前从未出现
+            - 回流：区间内活跃、上一区间未活跃、但更早出现过
+            - 留存：区间内与上一区间均活跃
+            - 流失：上一区间活跃、区间内未活跃
+        """
+        bits = self.bits(games)
+        i0, i1 = self.rollup.row_range(start, end)
+        p0, p1 = 0, 0
+        if start is not None:
+            # ✅ 上一区间按所选天数（而非截断到数据范围后的天数）向前平移
+            length = pd.Timedelta(days=(i1 - i0) if end is None else (pd.Timestamp(end) - pd.Timestamp(start)).days + 1)
+            p0, p1 = self.rollup.row_range(pd.Timestamp(start) - length, pd.Timestamp(start) - pd.Timedelta(days=1))
+
+        current = np.bitwise_or.reduce(bits[i0:i1], axis=0)
+        previous = np.bitwise_or.reduce(bits[p0:p1], axis=0)
+        earlier = np.bitwise_or.reduce(bits[:p0], axis=0)
+        return {
+            "活跃": int(popcount(current)),
+            "新增": int(popcount(current & ~(previous | earlier))),
+            "回流": int(popcount(current & ~previous & earlier)),
+            "留存": int(popcount(current & previous)),
+            "流失": int(popcount(previous & ~current)),
+        }
+
+    def cohorts(self, start=None, end=None, games=None, days=COHORT_DAYS):
+        """
+        同期群三角：区间内每天首次出现的商户为一个同期群，第 N 天留存 = 同期群中第 N 天仍活跃的比例。
+
+        返回：
+            DataFrame[首次活跃日, 新增商户, 第1天 … 第{days}天]；超出数据末日的格子为 NaN
+        """
+        bits = self.bits(games)
+        i0, i1 = self.rollup.row_range(start, end)
+        n_days = bits.shape[0]
+
+        # ✅ seen[d]：第 d 天之前出现过的商户（前缀按位或）；同期群 = 当天活跃 & ~seen
+        seen = np.zeros_like(bits)
+        if n_days > 1:
+            seen[1:] = np.bitwise_or.accumulate(bits[:-1], axis=0)
+        cohort_bits = bits[i0:i1] & ~seen[i0:i1]
+        sizes = popcount(cohort_bits, axis=1)
+
+        result = pd.DataFrame({
+            "首次活跃日": self.rollup.start + pd.to_timedelta(np.arange(i0, i1), unit="D"),
+            "新增商户": sizes,
+        })
+        for n in range(1, days + 1):
+            rates = np.full(i1 - i0, np.nan)
+            valid = np.arange(i0, i1) + n < n_days
+            retained = popcount(cohort_bits[valid] & bits[i0 + n:i1 + n][:valid.sum()], axis=1)
+            rates[valid] = np.divide(retained, sizes[valid], out=np.zeros(valid.sum()), where=sizes[valid] > 0)
+            result[f"第{n}天"] = rates
+        return result
+
+
+def retention_summary(activity, start=None, end=None, games=None):
+    """各后端共用：有活跃位图时返回活跃构成，否则各项为 0"""
+    if activity is None:
+        return dict.fromkeys(SUMMARY_KEYS, 0)
+    return activity.summary(start, end, games)
+
+
+def retention_cohorts(activity, start=None, end=None, games=None, days=COHORT_DAYS):
+    """各后端共用：有活跃位图时返回同期群三角，否则返回空表"""
+    if activity is None:
+        return pd.DataFrame(columns=["首次活跃日", "新增商户"] + [f"第{n}天" for n in range(1, days + 1)])
+    return activity.cohorts(start, end, games, days)
@@ -0,0 +1,275 @@
+# 按日预聚合（日 × 游戏）：卡片 / 趋势 / 占比等查询按日期范围直接在小矩阵上求和，不再扫描明细行
+
+# config/rollup.py
+
+import numpy as np
+import pandas as pd
+
+from config.template_validator import COUNT_COLUMNS, DELTA_COLUMNS, STOCK_COLUMNS
+
+METRIC_COLUMNS = COUNT_COLUMNS + DELTA_COLUMNS
+GROUP_COLUMNS = ("dt", "游戏名称")
+
+
+def to_datetime_index(values):
+    """将 dt 列（datetime64 / ArrowDtype 时间戳 / 字符串）转换为按天归一的 DatetimeIndex"""
+    if isinstance(values.dtype, pd.ArrowDtype):
+        values = values.astype("datetime64[ns]")
+    return pd.DatetimeIndex(pd.to_datetime(values)).normalize()
+
+
+class DailyRollup:
+    """
+    📅 每日汇总（数据快照生成时构建一次，所有会话共享，只读）。
+
+    - totals[列]: 形状为 (天数, 游戏数) 的求和矩阵，覆盖 METRIC_COLUMNS 中已加载的列
+    - counts: 同形状的行数矩阵（用于区分“无数据”与“合计为 0”，与明细分组结果保持一致）
+    - 活跃商户：按天存放 (商户编码, 游戏编码) 对及其数值，区间去重 / 商户排行只涉及区间内的商户-天；
+      这是唯一与明细行数成正比的部分，SQLite 后端在派生留存 / 异常后丢弃（drop_pairs），商户级查询由数据库回答
+
+    任意日期范围 + 游戏筛选的查询代价为 O(天数 × 游戏数)（去重计数为 O(区间内商户-天)），与明细行数无关。
+    查询接口与 MemoryBackend 的同名方法一致，返回值语义相同。
+
+    分层保留时（见 config.cold_tier），raw_start 之前的日期只有汇总矩阵与商户草图（sketches）：
+    求和不受影响，去重计数涉及这些日期时为 HyperLogLog 估算值，商户级查询只覆盖 raw_start 起的日期。
+    """
+
+    def __init__(self, start, games, totals, counts, merchants, pair_offsets, pair_merchants, pair_games, pair_values):
+        self.start = start                      # 第 0 行对应的日期
+        self.games = games                      # 游戏名称（已排序，列顺序）
+        self.totals = totals                    # {列名: ndarray[天, 游戏]}
+        self.counts = counts                    # ndarray[天, 游戏]
+        self.merchants = merchants              # 商户名称（编码 → 名称）
+        self.pair_offsets = pair_offsets        # 第 d 天的商户-游戏对位于 [offsets[d], offsets[d+1])
+        self.pair_merchants = pair_merchants
+        self.pair_games = pair_games
+        self.pair_values = pair_values          # {列名: ndarray}，与 pair_merchants 一一对应
+        self.dates = pd.date_range(start, periods=counts.shape[0], freq="D") if counts.shape[0] else pd.DatetimeIndex([])
+        self.sketches = None                    # 汇总层各 (天, 游戏) 的商户草图，前 len(sketches) 天有效
+        self.raw_start = start                  # 商户明细（商户-天对）的起始日期
+        self._merchant_hashes = None
+
+    @property
+    def metrics(self):
+        return set(self.totals)
+
+    @property
+    def has_pairs(self):
+        """是否持有商户-天对（磁盘后端构建索引后丢弃，见 drop_pairs）"""
+        return self.pair_offsets is not None
+
+    @classmethod
+    def from_frame(cls, df):
+        """由去重后的明细数据构建（每个唯一键一行），df 为空或 None 时返回 None"""
+        rollup = cls.from_sums(df)
+        return rollup.attach_pairs(df) if rollup is not None else None
+
+    @classmethod
+    def from_sums(cls, df, count_col=None):
+        """
+        只构建汇总矩阵（不含商户-天对，见 attach_pairs），df 为空或 None 时返回 None。
+
+        参数说明：
+        - df: 逐行明细，或已按 (dt, 游戏名称) 分组的汇总行（如 SQL GROUP BY 的结果，数值列为组内之和）
+        - count_col: 分组汇总行中的行数列（如 COUNT(*)），None 表示 df 为逐行明细（每行计 1）
+        """
+        if df is None or df.empty:
+            return None
+
+        dt = to_datetime_index(df["dt"])
+        game_codes, games = pd.factorize(df["游戏名称"], sort=True)
+        valid = (game_codes >= 0) & ~dt.isna()
+        if not valid.any():
+            return None
+
+        start = dt[valid].min()
+        day = np.asarray((dt - start).days, dtype="float64")
+        day = np.where(valid, day, -1).astype(np.int64)
+        n_days, n_games = int(day.max()) + 1, len(games)
+
+        # ✅ (天, 游戏) 展平为一维下标，bincount 一次完成分组求和
+        flat = day[valid] * n_games + game_codes[valid]
+        size = n_days * n_games
+        if count_col is None:
+            counts = np.bincount(flat, minlength=size)
+        else:
+            weights = pd.to_numeric(df[count_col], errors="coerce").fillna(0).to_numpy(dtype="float64")[valid]
+            counts = np.rint(np.bincount(flat, weights=weights, minlength=size)).astype(np.int64)
+        totals = {}
+        for col in METRIC_COLUMNS:
+            if col in df.columns:
+                values = pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype="float64")[valid]
+                totals[col] = np.rint(np.bincount(flat, weights=values, minlength=size)).astype(np.int64).reshape(n_days, n_games)
+
+        return cls(start, list(games), totals, counts.reshape(n_days, n_games), [], None, None, None, None)
+
+    def attach_pairs(self, df):
+        """
+        由逐行明细构建商户-天对（日期 / 游戏编码与汇总矩阵一致），返回自身。
+        磁盘后端只在构建留存位图 / 商户异常期间持有，随后 drop_pairs 丢弃。
+        """
+        dt = to_datetime_index(df["dt"])
+        merchant_codes, merchants = pd.factorize(df["商户昵称"])
+        day = np.asarray((dt - self.start).days, dtype="float64")
+        return self.set_pairs(
+            merchants,
+            np.where(np.isnan(day), -1, day).astype(np.int64),
+            merchant_codes,
+            pd.Index(self.games).get_indexer(df["游戏名称"]),
+            {col: pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64") for col in self.totals},
+        )
+
+    def set_pairs(self, merchants, day, merchant_codes, game_codes, values):
+        """
+        由逐行的编码数组设置商户-天对，返回自身（磁盘后端按块读取数据库后直接调用，不经过 DataFrame）。
+
+        参数说明：
+        - merchants: 商户名称（编码 → 名称）
+        - day / merchant_codes / game_codes: 每行的天下标（相对 start）、商户编码与游戏编码（-1 或越界的行忽略）
+        - values: {列名: float64 数组}，缺失值（NaN）按 0 计
+        """
+        n_days = self.counts.shape[0]
+        valid = (game_codes >= 0) & (merchant_codes >= 0) & (day >= 0) & (day < n_days)
+        day = day[valid]
+
+        # ✅ 商户-游戏对按天排序，区间查询时取一段连续切片
+        order = np.argsort(day, kind="stable")
+        self.merchants = list(merchants)
+        self.pair_merchants = merchant_codes[valid][order].astype(np.int32)
+        self.pair_games = game_codes[valid][order].astype(np.int32)
+        self.pair_offsets = np.searchsorted(day[order], np.arange(n_days + 1), side="left")
+        self.pair_values = {
+            col: np.rint(np.nan_to_num(values[col][valid][order])).astype(np.int64) for col in self.totals
+        }
+        self._merchant_hashes = None
+        return self
+
+    def drop_pairs(self):
+        """
+        丢弃商户-天对（逐行数组），只保留汇总矩阵与商户名称（留存位图按商户编码）。
+        之后商户去重 / 商户排行不能再由汇总回答（has_pairs 为 False），由后端下推到数据库。
+        """
+        self.pair_offsets = self.pair_merchants = self.pair_games = self.pair_values = None
+        self._merchant_hashes = None
+
+    # ========== 🔧 区间 / 筛选换算（派生指标模块共用） ==========
+    def row_range(self, start=None, end=None):
+        """日期闭区间 → 行下标区间 [i0, i1)"""
+        n = self.counts.shape[0]
+        i0 = 0 if start is None else min(n, max(0, (pd.Timestamp(start).normalize() - self.start).days))
+        i1 = n if end is None else min(n, max(0, (pd.Timestamp(end).normalize() - self.start).days + 1))
+        return i0, max(i0, i1)
+
+    def game_mask(self, games=None):
+        """游戏筛选 → 列布尔掩码（None 表示全部）"""
+        if games is None:
+            return np.ones(len(self.games), dtype=bool)
+        return np.isin(np.asarray(self.games, dtype=object), list(games))
+
+    def can_sum(self, col, by=None):
+        """该查询能否由汇总矩阵回答（列已汇总且分组维度为 dt / 游戏名称）"""
+        return col in self.totals and (by is None or by in GROUP_COLUMNS)
+
+    # ========== 🔍 查询接口（同 MemoryBackend） ==========
+    def min_date(self):
+        return self.start
+
+    def max_date(self):
+        return self.dates[-1]
+
+    def game_list(self):
+        return list(self.games)
+
+    def metric_sum(self, col, start=None, end=None, games=None):
+        i0, i1 = self.row_range(start, end)
+        return int(self.totals[col][i0:i1, self.game_mask(games)].sum())
+
+    def row_count(self, start=None, end=None, games=None):
+        """范围内的明细行数（只统计 raw_start 起的日期，与后端 iter_rows 能读出的行一致）"""
+        start = self.raw_start if start is None else max(pd.Timestamp(start), self.raw_start)
+        i0, i1 = self.row_range(start, end)
+        return int(self.counts[i0:i1, self.game_mask(games)].sum())
+
+    def sum_by(self, by, col, start=None, end=None, games=None):
+        i0, i1 = self.row_range(start, end)
+        mask = self.game_mask(games)
+        values = self.totals[col][i0:i1, mask]
+        present = self.counts[i0:i1, mask]
+
+        if by == "dt":
+            keep = present.sum(axis=1) > 0
+            return pd.DataFrame({"dt": self.dates[i0:i1][keep], col: values.sum(axis=1)[keep]})
+
+        keep = present.sum(axis=0) > 0
+        names = np.asarray(self.games, dtype=object)[mask][keep]
+        return pd.DataFrame({"游戏名称": names, col: values.sum(axis=0)[keep]})
+
+    def daily_matrix(self, col, start=None, end=None, games=None):
+        """(日期, 游戏) 宽表：直接切片汇总矩阵（换指标 = 换矩阵，换游戏 = 取列），当天该游戏无数据时为 NaN"""
+        i0, i1 = self.row_range(start, end)
+        mask = self.game_mask(games)
+        values = self.totals[col][i0:i1, mask].astype("float64")
+        values[self.counts[i0:i1, mask] == 0] = np.nan
+        return pd.DataFrame(values, index=pd.Index(self.dates[i0:i1], name="dt"),
+                            columns=pd.Index(np.asarray(self.games, dtype=object)[mask], name="游戏名称"))
+
+    def distinct_merchants(self, start=None, end=None, games=None):
+        """日期范围（及游戏筛选）内的活跃商户数"""
+        i0, i1 = self.row_range(start, end)
+        lo, hi = self.pair_offsets[i0], self.pair_offsets[i1]
+        merchants = self.pair_merchants[lo:hi]
+        if games is not None:
+            merchants = merchants[self.game_mask(games)[self.pair_games[lo:hi]]]
+        if not self.uses_sketches(start):
+            return int(np.unique(merchants).size)
+
+        from config.cold_tier import merchant_hashes
+
+        if self._merchant_hashes is None:
+            self._merchant_hashes = merchant_hashes(self.merchants)
+        return self.sketch_distinct(start, end, games, self._merchant_hashes[np.unique(merchants)])
+
+    def uses_sketches(self, start=None):
+        """从 start 起的区间是否涉及汇总层日期（活跃商户数须由草图估算）"""
+        return self.sketches is not None and self.row_range(start)[0] < len(self.sketches)
+
+    def sketch_distinct(self, start, end, games, hashes):
+        """
+        区间涉及汇总层时的活跃商户估算：各格草图按位取最大值，再并入明细层商户的哈希。
+
+        参数说明：
+        - hashes: 区间内明细层（raw_start 起）商户的哈希（见 cold_tier.merchant_hashes），由调用方按自身存储取得
+        """
+        from config.cold_tier import HLL_REGISTERS, hll_estimate, hll_update
+
+        i0, i1 = self.row_range(start, end)
+        registers = self.sketches[i0:i1][:, self.game_mask(games)].reshape(-1, HLL_REGISTERS).max(axis=0, initial=0)
+        registers = hll_update(registers[None, :], np.zeros(len(hashes), dtype=np.int64), hashes)
+        return hll_estimate(registers)
+
+    def merchant_totals(self, start=None, end=None, games=None, columns=None):
+        """
+        日期范围（及游戏筛选）内按商户汇总，返回 DataFrame[商户昵称, 各数值列]（仅含区间内有数据的商户，顺序不保证）。
+        只处理区间内的商户-天，bincount 一次完成分组求和；时点值列（STOCK_COLUMNS，如在售商品数量）
+        只取区间内最后一个有数据的日期（与库存指标口径一致），当天没有数据的商户为 0。
+        """
+        columns = [c for c in (columns or self.pair_values) if c in self.pair_values]
+        i0, i1 = self.row_range(start, end)
+        lo, hi = self.pair_offsets[i0], self.pair_offsets[i1]
+        merchants = self.pair_merchants[lo:hi]
+        keep = slice(None) if games is None else self.game_mask(games)[self.pair_games[lo:hi]]
+        merchants = merchants[keep]
+
+        size = len(self.merchants)
+        present = np.bincount(merchants, minlength=size) > 0
+        result = {"商户昵称": np.asarray(self.merchants, dtype=object)[present]}
+        index = np.arange(lo, hi)[keep]         # 入选的商户-天对的下标（按天有序，最后一个即期末日期）
+        latest = index >= self.pair_offsets[np.searchsorted(self.pair_offsets, index[-1], side="right") - 1] \
+            if index.size else np.zeros(0, dtype=bool)
+        for col in columns:
+            values = self.pair_values[col][lo:hi][keep]
+            if col in STOCK_COLUMNS:
+                values = np.where(latest, values, 0)
+            sums = np.bincount(merchants, weights=values, minlength=size)
+            result[col] = np.rint(sums[present]).astype(np.int64)
+        return pd.DataFrame(result)
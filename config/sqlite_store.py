@@ -0,0 +1,501 @@
+# SQLite 本地分析存储（可选后端：数据落盘 + 索引，筛选与分组下推为 SQL）
+
+# config/sqlite_store.py
+
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from config.template_validator import KEY_COLUMNS, REQUIRED_COLUMNS, STOCK_COLUMNS
+from config.data_backend import BACKEND_SQLITE, MERCHANT_SERIES_COLUMNS, ROW_CHUNK_SIZE, check_column, top_anomalies
+from config.inventory import inventory_from_sums
+from config.retention import COHORT_DAYS, retention_cohorts, retention_summary
+
+
+def q(col):
+    """SQL 标识符加引号（列名为中文）"""
+    return f'"{col}"'
+
+
+DATA_COLUMNS = REQUIRED_COLUMNS + ["来源文件"]
+KEY_SQL = ", ".join(q(c) for c in KEY_COLUMNS)
+DATA_SQL = ", ".join(q(c) for c in DATA_COLUMNS)
+
+SCHEMA_SQL = f"""
+-- 所有来源文件的原始行（未去重），用于文件删除 / 替换时恢复被覆盖的旧行
+CREATE TABLE IF NOT EXISTS raw_rows (
+    "dt" TEXT, "商户昵称" TEXT, "游戏名称" TEXT,
+    "在售商品数量" INTEGER, "商品数量与昨日差值" INTEGER, "支付单量" INTEGER, "完结单量" INTEGER,
+    "来源文件" TEXT, "version_mtime" INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_raw_source ON raw_rows("来源文件");
+CREATE INDEX IF NOT EXISTS idx_raw_key ON raw_rows({KEY_SQL});
+
+-- 去重后的数据（每个唯一键只保留版本最新的一行），所有查询只读这张表
+CREATE TABLE IF NOT EXISTS records (
+    "dt" TEXT, "商户昵称" TEXT, "游戏名称" TEXT,
+    "在售商品数量" INTEGER, "商品数量与昨日差值" INTEGER, "支付单量" INTEGER, "完结单量" INTEGER,
+    "来源文件" TEXT,
+    PRIMARY KEY ({KEY_SQL})
+);
+CREATE INDEX IF NOT EXISTS idx_records_dt ON records("dt");
+CREATE INDEX IF NOT EXISTS idx_records_game ON records("游戏名称", "dt");
+CREATE INDEX IF NOT EXISTS idx_records_merchant ON records("商户昵称", "dt");
+
+-- 已导入文件清单（指纹用于增量同步）
+CREATE TABLE IF NOT EXISTS source_files (
+    name TEXT PRIMARY KEY, fingerprint TEXT, version_mtime INTEGER, warnings TEXT, row_count INTEGER
+);
+
+-- 存储级设置（如行日期起点 row_start，见 SQLiteStore.trim）
+CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+# ========== ✏️ 写入端：与 KeyedStore 接口一致，可直接交给 attachments_loader.sync_store 同步 ==========
+class SQLiteStore:
+    """
+    🗄️ SQLite 写入端（每个数据库文件一个实例，进程内共享一个写连接）。
+
+    接口与 config.keyed_store.KeyedStore 一致：
+    file_names / fingerprint / warnings / total_source_rows / row_start / upsert / remove / trim / lock / __len__；
+    另有 build_indexes：由数据库直接构建查询索引，不读出整表（见 attachments_loader.build_snapshot）
+
+    版本号约定：version 为 (修改时间ns, 文件名)，与加载器的版本号一致；
+    冲突时按 (version_mtime, 来源文件) 排序，最新者胜出。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")       # ✅ WAL：写入时只读连接仍可并发查询
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA_SQL)
+        self._conn.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS affected ({KEY_SQL}, PRIMARY KEY ({KEY_SQL}))"
+        )
+        self._conn.commit()
+
+    # ========== 📋 文件信息 ==========
+    def file_names(self):
+        with self.lock:
+            return {row[0] for row in self._conn.execute("SELECT name FROM source_files")}
+
+    def fingerprint(self, name):
+        with self.lock:
+            row = self._conn.execute("SELECT fingerprint FROM source_files WHERE name = ?", (name,)).fetchone()
+        return tuple(json.loads(row[0])) if row else None
+
+    def warnings(self):
+        with self.lock:
+            rows = self._conn.execute("SELECT name, warnings FROM source_files ORDER BY name").fetchall()
+        return [(name, w) for name, ws in rows for w in json.loads(ws or "[]")]
+
+    def total_source_rows(self):
+        with self.lock:
+            return self._conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM source_files").fetchone()[0]
+
+    def __len__(self):
+        with self.lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def row_start(self):
+        with self.lock:
+            row = self._conn.execute("SELECT value FROM store_meta WHERE key = 'row_start'").fetchone()
+        return pd.Timestamp(row[0]) if row and row[0] else None
+
+    # ========== ✏️ 写入 ==========
+    def upsert(self, name, df, version, fingerprint=None, warnings=None):
+        """写入（或替换）一个来源文件，只重算受影响唯一键的胜出行"""
+        rows = df.assign(dt=pd.to_datetime(df["dt"]).dt.strftime("%Y-%m-%d"), 来源文件=name)
+        rows = rows.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+        rows = rows.reindex(columns=DATA_COLUMNS)                # ✅ 列投影未读取的列写入 NULL（NaN 绑定为 NULL）
+        # ✅ Series.tolist() 返回 Python 原生类型，sqlite3 才能直接绑定
+        values = list(zip(*(rows[c].tolist() for c in DATA_COLUMNS), [version[0]] * len(rows)))
+
+        with self.lock, self._conn:
+            self._mark_affected(name)
+            self._conn.execute('DELETE FROM raw_rows WHERE "来源文件" = ?', (name,))
+            self._conn.executemany(
+                f"INSERT INTO raw_rows ({DATA_SQL}, version_mtime) VALUES ({', '.join('?' * (len(DATA_COLUMNS) + 1))})",
+                values,
+            )
+            self._conn.execute(
+                f'INSERT OR IGNORE INTO temp.affected SELECT {KEY_SQL} FROM raw_rows WHERE "来源文件" = ?', (name,)
+            )
+            self._resolve_affected()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO source_files VALUES (?, ?, ?, ?, ?)",
+                (name, json.dumps(list(fingerprint or [])), version[0],
+                 json.dumps(list(warnings or []), ensure_ascii=False), len(rows)),
+            )
+
+    def remove(self, name):
+        """移除一个来源文件，并从其余文件中恢复被其覆盖的旧行"""
+        with self.lock, self._conn:
+            self._mark_affected(name)
+            self._conn.execute('DELETE FROM raw_rows WHERE "来源文件" = ?', (name,))
+            self._resolve_affected()
+            self._conn.execute("DELETE FROM source_files WHERE name = ?", (name,))
+
+    def trim(self, start):
+        """丢弃 dt 早于 start 的行并记录行日期起点（同 KeyedStore.trim）"""
+        value = None if start is None else start.strftime("%Y-%m-%d")
+        with self.lock, self._conn:
+            if self.row_start() != start:
+                self._conn.execute("INSERT OR REPLACE INTO store_meta VALUES ('row_start', ?)", (value,))
+            if value is None:
+                return
+            if self._conn.execute('DELETE FROM raw_rows WHERE "dt" < ?', (value,)).rowcount:
+                self._conn.execute('DELETE FROM records WHERE "dt" < ?', (value,))
+                self._conn.execute(
+                    'UPDATE source_files SET row_count = (SELECT COUNT(*) FROM raw_rows WHERE "来源文件" = name)'
+                )
+
+    def _mark_affected(self, name):
+        self._conn.execute("DELETE FROM temp.affected")
+        self._conn.execute(
+            f'INSERT OR IGNORE INTO temp.affected SELECT {KEY_SQL} FROM raw_rows WHERE "来源文件" = ?', (name,)
+        )
+
+    def _resolve_affected(self):
+        """对受影响的唯一键重新选出胜出行（按版本升序 INSERT OR REPLACE，最后写入的即最新）"""
+        self._conn.execute(f"DELETE FROM records WHERE ({KEY_SQL}) IN (SELECT {KEY_SQL} FROM temp.affected)")
+        self._conn.execute(
+            f"""
+            INSERT OR REPLACE INTO records ({DATA_SQL})
+            SELECT {', '.join('r.' + q(c) for c in DATA_COLUMNS)}
+            FROM raw_rows r JOIN temp.affected a USING ({KEY_SQL})
+            ORDER BY r.version_mtime, r."来源文件"
+            """
+        )
+
+    def build_indexes(self, cold=None):
+        """
+        构建 SQLiteBackend 使用的索引（同 data_backend.build_indexes 的返回值，不读出整表）：
+
+        - 每日汇总由 SQL GROUP BY ("dt", "游戏名称") 聚合
+        - 留存位图与商户异常需要的商户-天对只在派生期间按块读取为整数数组（见 _attach_pairs），随后丢弃；
+          商户去重、商户排行与单商户明细由 SQLiteBackend 下推为 SQL
+        - 商户检索索引只由 SELECT DISTINCT 商户昵称 构建（MerchantIndex.from_names，不含明细行）
+
+        参数说明：
+        - cold: 汇总层（ColdTier），未分层时为 None
+        """
+        from config.data_backend import rollup_indexes
+        from config.merchant_index import MerchantIndex
+        from config.rollup import METRIC_COLUMNS, DailyRollup
+
+        sums = ", ".join(f"SUM({q(c)}) AS {q(c)}" for c in METRIC_COLUMNS)
+        with self.lock:
+            grouped = pd.read_sql_query(
+                f'SELECT "dt", "游戏名称", COUNT(*) AS "行数", {sums} FROM records GROUP BY 1, 2', self._conn
+            ).dropna(axis=1, how="all")         # ✅ 列投影未读取的列整列为 NULL：不建汇总矩阵（has_metric 为 False）
+            rollup = DailyRollup.from_sums(grouped, count_col="行数")
+            merchants = pd.Index([row[0] for row in self._conn.execute(
+                'SELECT DISTINCT "商户昵称" FROM records WHERE "商户昵称" IS NOT NULL ORDER BY 1'
+            )])
+            if rollup is not None:
+                self._attach_pairs(rollup, merchants)
+        indexes = rollup_indexes(rollup, cold)
+        if indexes["rollup"] is not None:
+            indexes["rollup"].drop_pairs()
+        indexes["merchant_index"] = MerchantIndex.from_names(merchants)
+        return indexes
+
+    def _attach_pairs(self, rollup, merchants, chunk_rows=ROW_CHUNK_SIZE):
+        """
+        按块（fetchmany）读取商户-天对并写入 rollup（见 DailyRollup.set_pairs）：
+        天下标由 SQL 计算，商户 / 游戏名称在每块内换算为编码后即丢弃，全程只累积整数数组，不持有整表的字符串。
+
+        参数说明：
+        - merchants: 全部商户昵称（pd.Index，编码 → 名称）
+        """
+        columns = list(rollup.totals)
+        games = pd.Index(rollup.games)
+        cursor = self._conn.execute(
+            f'SELECT CAST(julianday("dt") - julianday(?) AS INTEGER), "游戏名称", "商户昵称"'
+            f'{"".join(", " + q(c) for c in columns)} FROM records ORDER BY "dt"',
+            (rollup.start.strftime("%Y-%m-%d"),),
+        )
+        parts = []
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            day, game_names, merchant_names, *values = zip(*rows)
+            parts.append((
+                np.array(day, dtype=np.int64),
+                merchants.get_indexer(merchant_names).astype(np.int32),
+                games.get_indexer(game_names).astype(np.int32),
+                [np.array(v, dtype="float64") for v in values],     # ✅ NULL → NaN（set_pairs 按 0 计）
+            ))
+
+        def joined(i, dtype):
+            return np.concatenate([part[i] for part in parts]) if parts else np.zeros(0, dtype=dtype)
+
+        rollup.set_pairs(
+            merchants, joined(0, np.int64), joined(1, np.int32), joined(2, np.int32),
+            {col: np.concatenate([part[3][j] for part in parts]) if parts else np.zeros(0)
+             for j, col in enumerate(columns)},
+        )
+
+    def to_frame(self):
+        """读出全部去重数据（仅用于调试 / 导出，仪表盘查询请使用 SQLiteBackend）"""
+        with self.lock:
+            df = pd.read_sql_query(f"SELECT {DATA_SQL} FROM records", self._conn)
+        return df.assign(dt=pd.to_datetime(df["dt"]))
+
+
+# ========== 🔌 只读连接池 ==========
+class ConnectionPool:
+    """
+    只读 SQLite 连接池（进程内共享）：会话查询时借出连接，用完归还，避免每次 rerun 重新建连。
+    连接以 mode=ro 打开并开启 query_only，会话侧无法写入数据库。
+    """
+
+    def __init__(self, db_path, size=8):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{quote(self.db_path)}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(db_path):
+    with _POOLS_LOCK:
+        if db_path not in _POOLS:
+            _POOLS[db_path] = ConnectionPool(db_path)
+        return _POOLS[db_path]
+
+
+# ========== 🔍 查询端：接口与 MemoryBackend 一致 ==========
+class SQLiteBackend:
+    """
+    🔍 SQLite 查询后端：筛选（日期范围 / 游戏）与分组聚合全部下推为 SQL，
+    每次 rerun 只读取命中索引的行，不在内存中持有整表。
+    传入 rollup（每日汇总）时，按 dt / 游戏名称 的求和直接由汇总回答，不再访问数据库；
+    汇总不含商户-天对时（SQLiteStore.build_indexes 构建的索引），活跃商户去重与商户排行仍下推为 SQL，
+    区间涉及汇总层日期时由汇总层草图与 SQL 取得的明细层商户合并估算。
+    传入 merchant_index（商户索引）/ inventory（库存指标）/ anomalies（异常检测结果）/ retention（商户活跃位图）时，
+    商户检索、单商户明细、库存指标、异常列表与留存指标同样由内存索引回答；
+    商户索引不含明细行时（SQLiteStore.build_indexes 只建检索部分），单商户明细仍下推为 SQL。
+    """
+
+    name = BACKEND_SQLITE
+
+    def __init__(self, db_path, rollup=None, merchant_index=None, inventory=None, anomalies=None, retention=None):
+        self.pool = get_pool(db_path)
+        self.rollup = rollup
+        self.merchant_index = merchant_index
+        self.inventory = inventory
+        self.anomalies = anomalies
+        self.retention = retention
+
+    def _query(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _where(start=None, end=None, games=None):
+        """构造 WHERE 子句与参数；games 为空列表时返回 None（结果必为空）"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('"dt" >= ?')
+            params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+        if end is not None:
+            clauses.append('"dt" <= ?')
+            params.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+        if games is not None:
+            games = list(games)
+            if not games:
+                return None, params
+            clauses.append(f'"游戏名称" IN ({", ".join("?" * len(games))})')
+            params.extend(games)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def min_date(self):
+        if self.rollup is not None:
+            return self.rollup.min_date()
+        value = self._query('SELECT MIN("dt") FROM records')[0][0]
+        return pd.Timestamp(value) if value else pd.NaT
+
+    def max_date(self):
+        if self.rollup is not None:
+            return self.rollup.max_date()
+        value = self._query('SELECT MAX("dt") FROM records')[0][0]
+        return pd.Timestamp(value) if value else pd.NaT
+
+    def detail_start(self):
+        return self.rollup.raw_start if self.rollup is not None else self.min_date()
+
+    def iter_rows(self, start=None, end=None, games=None, chunk_rows=ROW_CHUNK_SIZE):
+        # ✅ 游标 fetchmany 逐块读取，整个迭代期间占用连接池中的一个连接
+        where, params = self._where(start, end, games)
+        if where is None:
+            yield pd.DataFrame(columns=DATA_COLUMNS)
+            return
+        with self.pool.connection() as conn:
+            cursor = conn.execute(f'SELECT {DATA_SQL} FROM records{where} ORDER BY "dt"', params)
+            rows = cursor.fetchmany(chunk_rows)
+            while True:
+                yield pd.DataFrame(rows, columns=DATA_COLUMNS)
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+
+    def row_count(self, start=None, end=None, games=None):
+        if self.rollup is not None:
+            return self.rollup.row_count(start, end, games)
+        where, params = self._where(start, end, games)
+        if where is None:
+            return 0
+        return self._query(f"SELECT COUNT(*) FROM records{where}", params)[0][0]
+
+    def has_metric(self, col):
+        return self.rollup is not None and self.rollup.can_sum(col)
+
+    def _series_columns(self):
+        return [c for c in MERCHANT_SERIES_COLUMNS if self.has_metric(c)]
+
+    def game_list(self):
+        if self.rollup is not None:
+            return self.rollup.game_list()
+        return [row[0] for row in self._query('SELECT DISTINCT "游戏名称" FROM records ORDER BY 1')]
+
+    def metric_sum(self, col, start=None, end=None, games=None):
+        if self.rollup is not None and self.rollup.can_sum(col):
+            return self.rollup.metric_sum(col, start, end, games)
+        where, params = self._where(start, end, games)
+        if where is None:
+            return 0
+        return self._query(f"SELECT COALESCE(SUM({q(check_column(col))}), 0) FROM records{where}", params)[0][0]
+
+    def distinct_count(self, col, start=None, end=None, games=None):
+        if self.rollup is not None and col == "商户昵称" and self.rollup.has_pairs:
+            return self.rollup.distinct_merchants(start, end, games)
+        where, params = self._where(start, end, games)
+        if self.rollup is not None and col == "商户昵称" and self.rollup.uses_sketches(start):
+            # ✅ 汇总层日期只有草图：并入明细层（records）中区间内商户的哈希后估算
+            from config.cold_tier import merchant_hashes
+
+            names = [] if where is None else [
+                row[0] for row in self._query(f'SELECT DISTINCT "商户昵称" FROM records{where}', params)
+            ]
+            return self.rollup.sketch_distinct(start, end, games, merchant_hashes(names))
+        if where is None:
+            return 0
+        return self._query(f"SELECT COUNT(DISTINCT {q(check_column(col))}) FROM records{where}", params)[0][0]
+
+    def sum_by(self, by, col, start=None, end=None, games=None):
+        if self.rollup is not None and self.rollup.can_sum(col, by):
+            return self.rollup.sum_by(by, col, start, end, games)
+        by, col = check_column(by), check_column(col)
+        where, params = self._where(start, end, games)
+        rows = [] if where is None else self._query(
+            f"SELECT {q(by)}, COALESCE(SUM({q(col)}), 0) FROM records{where} GROUP BY 1 ORDER BY 1", params
+        )
+        df = pd.DataFrame(rows, columns=[by, col])
+        if by == "dt":
+            df["dt"] = pd.to_datetime(df["dt"])
+        return df
+
+    def daily_matrix(self, col, start=None, end=None, games=None):
+        if self.rollup is not None and self.rollup.can_sum(col):
+            return self.rollup.daily_matrix(col, start, end, games)
+        col = check_column(col)
+        where, params = self._where(start, end, games)
+        rows = [] if where is None else self._query(
+            f'SELECT "dt", "游戏名称", COALESCE(SUM({q(col)}), 0) FROM records{where} GROUP BY 1, 2', params
+        )
+        df = pd.DataFrame(rows, columns=["dt", "游戏名称", col]).assign(dt=lambda d: pd.to_datetime(d["dt"]))
+        return df.pivot(index="dt", columns="游戏名称", values=col)
+
+    def search_merchants(self, query, limit=20):
+        if self.merchant_index is not None:
+            return self.merchant_index.search(query, limit)
+        query = str(query).strip()
+        if not query:
+            return []
+        pattern = query.replace("!", "!!").replace("%", "!%").replace("_", "!_")     # LIKE 通配符转义
+        col = q("商户昵称")
+        rows = self._query(
+            f"SELECT DISTINCT {col} FROM records WHERE {col} LIKE ? ESCAPE '!' "
+            f"ORDER BY {col} LIKE ? ESCAPE '!' DESC, 1 LIMIT ?",
+            (f"%{pattern}%", f"{pattern}%", limit),
+        )
+        return [row[0] for row in rows]
+
+    def merchant_series(self, name, start=None, end=None, games=None):
+        if self.merchant_index is not None and self.merchant_index.has_rows:
+            return self.merchant_index.merchant_rows(name, start, end, games)
+        columns = ["dt", "游戏名称", *self._series_columns()]
+        where, params = self._where(start, end, games)
+        rows = [] if where is None else self._query(
+            f'SELECT {", ".join(q(c) for c in columns)} FROM records'
+            f'{where + " AND" if where else " WHERE"} "商户昵称" = ? ORDER BY 1, 2',
+            [*params, name],
+        )
+        df = pd.DataFrame(rows, columns=columns)
+        df["dt"] = pd.to_datetime(df["dt"])
+        return df
+
+    def merchant_totals(self, start=None, end=None, games=None):
+        if self.rollup is not None and self.rollup.has_pairs:
+            return self.rollup.merchant_totals(start, end, games, MERCHANT_SERIES_COLUMNS)
+        series = self._series_columns()
+        columns = ["商户昵称", *series]
+        where, params = self._where(start, end, games)
+        if where is None:
+            return pd.DataFrame([], columns=columns)
+        # ✅ 时点值列只取区间内最后一个有数据的日期
+        latest = f'(SELECT MAX("dt") FROM records{where})'
+        sums = ", ".join(
+            f'COALESCE(SUM(CASE WHEN "dt" = {latest} THEN {q(c)} ELSE 0 END), 0)' if c in STOCK_COLUMNS
+            else f"COALESCE(SUM({q(c)}), 0)"
+            for c in series
+        )
+        stock = sum(c in STOCK_COLUMNS for c in series)
+        rows = self._query(f'SELECT {q("商户昵称")}, {sums} FROM records{where} GROUP BY 1', params * (stock + 1))
+        return pd.DataFrame(rows, columns=columns)
+
+    def inventory_by_game(self, start=None, end=None, games=None):
+        if self.inventory is not None:
+            return self.inventory.by_game(start, end, games)
+        return inventory_from_sums(self, start, end, games)
+
+    def top_anomalies(self, start=None, end=None, games=None, level=None, limit=20):
+        return top_anomalies(self.anomalies, start, end, games, level, limit)
+
+    def merchant_retention(self, start=None, end=None, games=None):
+        return retention_summary(self.retention, start, end, games)
+
+    def retention_cohorts(self, start=None, end=None, games=None, days=COHORT_DAYS):
+        return retention_cohorts(self.retention, start, end, games, days)
@@ -0,0 +1,207 @@
+# Excel 文件模版校验工具（表头快速校验 + 向量化数据校验）
+
+# config/template_validator.py
+
+import os
+import re
+import pandas as pd
+
+
+# ========== 📐 模版定义 ==========
+KEY_COLUMNS = ["dt", "商户昵称", "游戏名称"]                                  # 唯一键：同一天同一商户同一游戏只应有一行
+COUNT_COLUMNS = ["在售商品数量", "支付单量", "完结单量"]                          # 计数列：必须为非负整数
+DELTA_COLUMNS = ["商品数量与昨日差值"]                                          # 差值列：整数，可为负
+STOCK_COLUMNS = ["在售商品数量"]                                               # 时点值列：区间汇总取期末值，不按天累加
+REQUIRED_COLUMNS = ["dt", "商户昵称", "游戏名称", "在售商品数量", "商品数量与昨日差值", "支付单量", "完结单量"]
+
+# ✅ 文件名中的 MMDD 日期戳，例如 “...在售及订单情况 0618.xlsx”、“... 0618 v2.xlsx”
+FILENAME_DATE_PATTERN = re.compile(r"(?<!\d)(\d{2})(\d{2})(?!\d)")
+
+
+def new_report(filename):
+    """
+    创建一份空的校验报告（字典结构，便于序列化 / 汇总展示）。
+
+    字段说明：
+    - file: 文件名
+    - ok: 是否通过（存在 errors 即不通过）
+    - errors: 致命问题列表，文件将被拒绝
+    - warnings: 数据质量提示，文件仍会被加载
+    - rows: 数据行数（不含表头，未知时为 None）
+    """
+    return {"file": filename, "ok": True, "errors": [], "warnings": [], "rows": None}
+
+
+def add_error(report, message):
+    report["errors"].append(message)
+    report["ok"] = False
+
+
+def parse_filename_mmdd(filename):
+    """从文件名中提取 (月, 日)，找不到合法 MMDD 时返回 None"""
+    for month, day in FILENAME_DATE_PATTERN.findall(os.path.basename(filename)):
+        if 1 <= int(month) <= 12 and 1 <= int(day) <= 31:
+            return int(month), int(day)
+    return None
+
+
+def file_in_date_range(filename, start=None, end=None):
+    """
+    仅根据文件名中的 MMDD 判断文件是否可能落在 [start, end] 日期范围内（无需打开文件）。
+
+    - 文件名不含 MMDD、或未给出 start：无法排除，返回 True
+    - 文件名不含年份：范围内任一年份的该月日落在范围内即视为命中
+    """
+    mmdd = parse_filename_mmdd(filename)
+    if mmdd is None or start is None:
+        return True
+
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.today().normalize()
+    for year in range(start.year, end.year + 1):
+        try:
+            day = pd.Timestamp(year=year, month=mmdd[0], day=mmdd[1])
+        except ValueError:          # 如 0229 遇到非闰年
+            continue
+        if start <= day <= end:
+            return True
+    return False
+
+
+def projected_columns(columns=None):
+    """
+    列投影：在调用方指定的列之外始终保留唯一键三列；columns 为空表示读取全部模版列。
+    返回值保持模版中的列顺序。
+    """
+    if columns is None:
+        return list(REQUIRED_COLUMNS)
+    wanted = set(columns) | set(KEY_COLUMNS)
+    return [c for c in REQUIRED_COLUMNS if c in wanted]
+
+
+# ========== ⚡ 第一步：只读表头，解析前快速拒绝 ==========
+def validate_header(path, report=None):
+    """
+    仅读取表头行与表格维度（openpyxl 只读模式，不解析数据区），在完整解析前接受 / 拒绝文件。
+
+    参数说明：
+    - path: Excel 文件路径
+    - report: 可选，已有的校验报告（为空时新建）
+
+    返回：
+        dict：校验报告（ok=False 时无需再调用 pd.read_excel）
+    """
+    from openpyxl import load_workbook
+
+    report = report or new_report(os.path.basename(path))
+
+    try:
+        wb = load_workbook(path, read_only=True)
+    except Exception as e:
+        add_error(report, f"无法作为 xlsx 打开：{e}")
+        return report
+
+    try:
+        ws = wb.worksheets[0]
+
+        # ✅ 维度信息来自 sheet 元数据，无需遍历数据行
+        # ⚠️ 部分导出工具写入的维度是错的（如固定写 A1:A1），只读模式会据此截断读取范围，
+        #    因此先记下声明的维度，再重置维度读取表头
+        declared_rows, declared_cols = ws.max_row, ws.max_column
+        ws.reset_dimensions()
+
+        header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), None)
+        header = [str(c).strip() for c in header if c is not None] if header else []
+
+        missing = [c for c in REQUIRED_COLUMNS if c not in header]
+        if missing:
+            add_error(report, f"缺少必需列：{'、'.join(missing)}")
+
+        # ✅ 仅当声明的列数与真实表头一致时，才信任声明的行数
+        if declared_rows is not None and declared_cols == len(header):
+            report["rows"] = max(declared_rows - 1, 0)
+            if report["rows"] == 0:
+                add_error(report, "文件不含任何数据行")
+    finally:
+        wb.close()
+
+    return report
+
+
+# ========== 🧮 第二步：对解析后的 DataFrame 做向量化校验 ==========
+def validate_frame(df, filename, report=None, columns=None):
+    """
+    对已解析的数据做整列向量化校验：类型、计数非负、dt 与文件名 MMDD 一致、唯一键重复。
+
+    参数说明：
+    - df: pd.read_excel 的结果
+    - filename: 文件名（用于比对 MMDD）
+    - report: 可选，已有的校验报告（通常为 validate_header 的结果）
+    - columns: 列投影（见 projected_columns），只校验实际读取的列
+
+    返回：
+        dict：校验报告
+    """
+    report = report or new_report(filename)
+    report["rows"] = len(df)
+    expected = projected_columns(columns)
+
+    missing = [c for c in expected if c not in df.columns]
+    if missing:
+        add_error(report, f"缺少必需列：{'、'.join(missing)}")
+        return report
+
+    # ✅ 类型：数值列必须全部可转为数字（空值视为 0，与图表侧 fillna(0) 的处理一致）
+    for col in [c for c in COUNT_COLUMNS + DELTA_COLUMNS if c in expected]:
+        values = pd.to_numeric(df[col], errors="coerce")
+        bad = values.isna() & df[col].notna()
+        if bad.any():
+            add_error(report, f"列「{col}」有 {int(bad.sum())} 行不是数字")
+        elif (values.dropna() % 1 != 0).any():
+            report["warnings"].append(f"列「{col}」包含小数")
+
+    # ✅ 计数列非负
+    counts = df[[c for c in COUNT_COLUMNS if c in expected]].apply(pd.to_numeric, errors="coerce")
+    negative = (counts < 0).sum()
+    for col, n in negative[negative > 0].items():
+        report["warnings"].append(f"列「{col}」有 {int(n)} 行为负数")
+
+    # ✅ dt：必须可解析为日期，且与文件名中的 MMDD 一致
+    dt = pd.to_datetime(df["dt"], errors="coerce")
+    if dt.isna().any():
+        add_error(report, f"列「dt」有 {int(dt.isna().sum())} 行无法解析为日期")
+    else:
+        mmdd = parse_filename_mmdd(filename)
+        if mmdd is not None:
+            mismatch = (dt.dt.month != mmdd[0]) | (dt.dt.day != mmdd[1])
+            if mismatch.any():
+                report["warnings"].append(
+                    f"有 {int(mismatch.sum())} 行 dt 与文件名日期 {mmdd[0]:02d}{mmdd[1]:02d} 不一致"
+                )
+
+    # ✅ 唯一键 (dt, 商户昵称, 游戏名称) 重复
+    duplicated = df.duplicated(subset=KEY_COLUMNS, keep=False)
+    if duplicated.any():
+        report["warnings"].append(f"有 {int(duplicated.sum())} 行 (dt, 商户昵称, 游戏名称) 重复")
+
+    return report
+
+
+def validate_file(path, columns=None):
+    """
+    完整校验：先校验表头，通过后再完整解析并做数据校验。
+
+    参数说明：
+    - columns: 列投影，只解码所需的列（唯一键三列始终保留）；为空时读取全部模版列
+
+    返回：
+        (DataFrame 或 None, dict 校验报告)
+    """
+    report = validate_header(path)
+    if not report["ok"]:
+        return None, report
+
+    usecols = projected_columns(columns)
+    df = pd.read_excel(path, usecols=usecols)
+    report = validate_frame(df, os.path.basename(path), report, columns=usecols)
+    return (df if report["ok"] else None), report
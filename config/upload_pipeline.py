@@ -0,0 +1,186 @@
+# 上传文件处理管道：分块流式落盘 + 内容哈希去重 + 支持多文件 / zip 批量上传（zip 成员数与解压大小有上限）
+
+# config/upload_pipeline.py
+
+import os
+import hashlib
+import zipfile
+import tempfile
+import threading
+
+# ✅ 分块大小：上传内容按 1MB 分块边写盘边计算哈希，不在内存中持有整个文件
+CHUNK_SIZE = 1024 * 1024
+
+# ✅ DASHBOARD_UPLOAD_MAX_MB：单个 Excel（含 zip 成员解压后）的大小上限；DASHBOARD_UPLOAD_MAX_FILES：单个 zip 内的 .xlsx 个数上限
+#    防止压缩炸弹 / 超大批量占满磁盘，超出时整个文件（zip）报错，不落盘
+MAX_FILE_BYTES = int(os.environ.get("DASHBOARD_UPLOAD_MAX_MB", "200")) * 1024 * 1024
+MAX_ZIP_MEMBERS = int(os.environ.get("DASHBOARD_UPLOAD_MAX_FILES", "500"))
+
+# ✅ 进程级内容哈希索引：{目录: {文件指纹(名称, 大小, 修改时间ns): sha256}}
+#    已有文件只在指纹变化时重新计算哈希
+_HASH_INDEX = {}
+_HASH_INDEX_LOCK = threading.Lock()
+_SAVE_LOCK = threading.Lock()          # 同名检查与落盘之间不被其他会话的上传插入
+
+
+def hash_file(path):
+    """分块计算文件 sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def directory_hashes(directory):
+    """
+    返回目录中现有 .xlsx 的内容哈希：{sha256: 文件名}。
+    结果按文件指纹缓存，目录不变时只做 stat。
+    """
+    with _HASH_INDEX_LOCK:
+        cache = _HASH_INDEX.setdefault(directory, {})
+        result, alive = {}, set()
+        for entry in os.scandir(directory):
+            if not (entry.is_file() and entry.name.endswith(".xlsx")):
+                continue
+            stat = entry.stat()
+            key = (entry.name, stat.st_size, stat.st_mtime_ns)
+            alive.add(key)
+            if key not in cache:
+                cache[key] = hash_file(entry.path)
+            result[cache[key]] = entry.name
+        for key in set(cache) - alive:
+            del cache[key]
+        return result
+
+
+def stream_to_temp(src, directory, limit=None):
+    """
+    将文件对象 src 分块写入目录下的临时文件（.part 后缀，不会被加载器扫描），同时计算 sha256。
+    写入量超过 limit 字节（默认 MAX_FILE_BYTES）时删除临时文件并抛出 ValueError（zip 成员声明的大小不可信，按实际解压量判断）。
+
+    返回：
+        (临时文件路径, sha256)
+    """
+    limit = MAX_FILE_BYTES if limit is None else limit
+    fd, tmp_path = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=directory)
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                written += len(chunk)
+                if written > limit:
+                    raise ValueError(f"超过单个文件大小上限 {limit // (1024 * 1024)}MB")
+                digest.update(chunk)
+                out.write(chunk)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest()
+
+
+def decode_member_name(info):
+    """
+    还原 zip 成员的原始文件名：未设置 UTF-8 标志位时 zipfile 按 cp437 解码，
+    中文文件名（macOS 打包为 UTF-8、Windows 中文系统打包为 GBK）需要重新解码。
+    """
+    if info.flag_bits & 0x800:
+        return info.filename
+    raw = info.filename.encode("cp437")
+    for encoding in ("utf-8", "gbk"):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return info.filename
+
+
+def iter_upload_members(uploaded_file):
+    """
+    展开一个上传文件：.xlsx 直接返回自身；.zip 逐个返回其中的 .xlsx 成员（流式读取，不整体解压）。
+
+    返回：
+        生成器，产出 (文件名, 可 read(n) 的文件对象)
+    """
+    name = os.path.basename(uploaded_file.name)
+    uploaded_file.seek(0)
+
+    if not name.lower().endswith(".zip"):
+        yield name, uploaded_file
+        return
+
+    with zipfile.ZipFile(uploaded_file) as archive:
+        members = []
+        for info in archive.infolist():
+            member = os.path.basename(decode_member_name(info))     # ✅ 只取文件名，防止 zip 路径穿越
+            if info.is_dir() or info.filename.startswith("__MACOSX/") or member.startswith("."):
+                continue
+            if member.endswith(".xlsx"):
+                members.append((member, info))
+
+        # ✅ 先按目录信息检查个数与声明的解压大小，超限时整个 zip 不落盘
+        if len(members) > MAX_ZIP_MEMBERS:
+            raise ValueError(f"zip 内 .xlsx 文件数 {len(members)} 超过上限 {MAX_ZIP_MEMBERS}")
+        oversized = [member for member, info in members if info.file_size > MAX_FILE_BYTES]
+        if oversized:
+            raise ValueError(f"zip 成员超过单个文件大小上限 {MAX_FILE_BYTES // (1024 * 1024)}MB：{'、'.join(oversized)}")
+
+        for member, info in members:
+            with archive.open(info) as src:
+                yield member, src
+
+
+def versioned_name(name, directory):
+    """同名文件已存在时的新版本文件名：“xxx 0618.xlsx” → “xxx 0618 v2.xlsx”（取第一个未被占用的版本号）"""
+    stem, ext = os.path.splitext(name)
+    version = 2
+    while os.path.exists(os.path.join(directory, f"{stem} v{version}{ext}")):
+        version += 1
+    return f"{stem} v{version}{ext}"
+
+
+def save_uploads(uploaded_files, directory):
+    """
+    保存一批上传文件（支持多文件与 zip），按内容哈希去重。
+
+    - 内容与目录中已有文件相同（不论文件名）：跳过
+    - 同名但内容不同：不覆盖旧文件，另存为新版本（如 “xxx 0618 v2.xlsx”），加载器按最新版本覆盖冲突的行，
+      旧文件仍可核对 / 由 maintain.py vacuum 清理
+
+    参数说明：
+    - uploaded_files: Streamlit UploadedFile 列表（或任意带 name / read / seek 的文件对象）
+    - directory: 附件目录
+
+    返回：
+        dict：
+        - saved: [文件名] 新保存的文件
+        - renamed: [(上传文件名, 另存的文件名)] 与已有文件同名但内容不同
+        - duplicates: [(上传文件名, 已存在的同内容文件名)]
+        - errors: [(文件名, 错误信息)]
+    """
+    result = {"saved": [], "renamed": [], "duplicates": [], "errors": []}
+    known = directory_hashes(directory)
+
+    for uploaded_file in uploaded_files:
+        try:
+            for name, src in iter_upload_members(uploaded_file):
+                tmp_path, sha = stream_to_temp(src, directory)
+
+                if sha in known:
+                    os.remove(tmp_path)
+                    result["duplicates"].append((name, known[sha]))
+                    continue
+
+                with _SAVE_LOCK:
+                    target = name
+                    if os.path.exists(os.path.join(directory, name)):
+                        target = versioned_name(name, directory)
+                        result["renamed"].append((name, target))
+                    os.replace(tmp_path, os.path.join(directory, target))   # ✅ 原子落盘，加载器不会读到半个文件
+                known[sha] = target
+                result["saved"].append(target)
+        except (zipfile.BadZipFile, OSError, ValueError) as e:
+            result["errors"].append((uploaded_file.name, str(e)))
+
+    return result
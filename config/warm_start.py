@@ -0,0 +1,214 @@
+# 启动预热：每次发布的导入结果（去重后的数据、每日汇总 / 索引、汇总层分组）写入 .dashboard_cache，
+# 服务重启后按附件目录签名与运行配置校验，一致时直接恢复，不重新解析任何 Excel（目录有变化时只解析变化的文件）；
+# management_tools/serve.py 在服务接受首个会话前完成恢复，并按默认页面（全部游戏，v1 / v2）预先计算一遍
+
+# config/warm_start.py
+
+import os
+import sys
+import glob
+import pickle
+import hashlib
+import logging
+
+import pandas as pd
+
+from config.attachments_watcher import directory_signature
+from config.cold_tier import cold_parts, restore_cold_parts
+from config.data_backend import STRING_DTYPE, empty_frame
+from config.keyed_store import KeyedStore
+from config.mappings import NORMALIZE_VERSION, load_mappings
+from config.retention import RETENTION_BY_GAME
+
+logger = logging.getLogger(__name__)
+
+# ✅ DASHBOARD_WARM_START：设为 0 时不读写磁盘缓存（每次重启都完整导入）
+ENABLE_WARM_START = os.environ.get("DASHBOARD_WARM_START", "1") == "1"
+WARM_FORMAT = 1                         # 缓存内容结构版本：修改 save_warm_start 的内容时递增
+WARM_FILE_PREFIX = "warm_start"
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WARM_REPORT = {}                        # 本进程的启动预热结果 {"seconds", "source", "phases"}（由 management_tools/serve.py 填写）
+
+
+# ========== 🔑 缓存校验 ==========
+def warm_cache_path(cache_dir, backend, directory):
+    """缓存文件路径：按后端与附件目录区分，如 .dashboard_cache/warm_start_memory_1a2b3c4d.pkl"""
+    digest = hashlib.blake2b(os.path.abspath(directory).encode("utf-8"), digest_size=4).hexdigest()
+    return os.path.join(cache_dir, f"{WARM_FILE_PREFIX}_{backend}_{digest}.pkl")
+
+
+def _code_signature():
+    """config/ 下源码的 (文件名, 大小, 修改时间ns)：部署新代码后缓存中的索引对象结构可能已变化，一律失效"""
+    signature = []
+    for path in sorted(glob.glob(os.path.join(CODE_DIR, "*.py"))):
+        stat = os.stat(path)
+        signature.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def warm_key(directory, ranges, columns=None, signature=None):
+    """
+    缓存校验键：影响导入结果的运行配置与名称映射（变化时缓存整体失效）+ 附件目录签名（变化时只有快照失效，见 restore_warm_start）。
+
+    参数说明：
+    - directory: 附件目录
+    - ranges: 当天的读取 / 分层日期范围（attachments_loader.tier_ranges() 的结果），跨天后范围变化即失效
+    - columns: 读取的列（DASHBOARD_COLUMNS）
+    - signature: 目录签名（见 directory_signature），默认现取；保存时应传入同步开始前取得的签名，
+      同步期间目录发生变化时快照只会失效，不会把未导入的文件误记为已导入
+
+    返回：
+        可比较的元组，最后一项为目录签名
+    """
+    games, brands = load_mappings()
+    return (
+        WARM_FORMAT, sys.version_info[:2], pd.__version__, _code_signature(), NORMALIZE_VERSION,
+        tuple(columns or ()), ranges, STRING_DTYPE, RETENTION_BY_GAME, os.path.abspath(directory),
+        tuple(sorted(games.items())), tuple(sorted(brands.items())),
+        directory_signature(directory) if signature is None else signature,
+    )
+
+
+# ========== 💾 读写 ==========
+def save_warm_start(path, key, directory, store, snapshot):
+    """
+    将一次发布的快照写入缓存（先写临时文件再原子替换），失败只记日志，不影响发布。
+
+    缓存内容：
+    - 内存存储（KeyedStore）的全部内容；SQLite 存储本身已持久化，只记录各文件指纹，恢复时据此核对
+    - 汇总层分组（重启后无需重新汇总较早的文件）
+    - 快照中除合并 DataFrame 外的全部内容（每日汇总 / 商户索引 / 库存 / 异常 / 留存等），DataFrame 恢复时由存储重新得到
+    """
+    payload = {
+        "store": store.state() if isinstance(store, KeyedStore) else None,
+        "fingerprints": {name: store.fingerprint(name) for name in store.file_names()},
+        "cold_parts": cold_parts(directory),
+        "snapshot": {k: v for k, v in snapshot.items() if k not in ("frame", "version")},
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)       # ✅ 校验键单独写在前面，不一致时不读数据部分
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception:
+        logger.exception("启动预热缓存写入失败：%s", path)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def restore_warm_start(path, key, directory, store, materialize=True):
+    """
+    读取缓存，校验通过时恢复存储内容与汇总层分组。
+    只有目录签名不同（停机期间新增 / 替换了文件）时仍恢复存储与汇总层分组，但不返回快照：
+    随后的同步按文件指纹只解析有变化的文件。
+
+    参数说明：
+    - key: 当前的校验键（见 warm_key）
+    - store: 目录对应的 KeyedStore（整体替换为缓存内容）或 SQLiteStore（只核对文件指纹）
+    - materialize: 是否在快照中附带合并后的 DataFrame（同 build_snapshot）
+
+    返回：
+        (快照, 目录签名)；缓存不存在、校验键不一致、读取失败或 SQLite 数据库已被改动时返回 None
+    """
+    try:
+        with open(path, "rb") as f:
+            stored = pickle.load(f)
+            if stored[:-1] != key[:-1]:
+                return None
+            payload = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.exception("启动预热缓存读取失败，改为重新导入：%s", path)
+        return None
+
+    if payload["store"] is not None:
+        store.restore(payload["store"])
+    restore_cold_parts(directory, payload["cold_parts"])
+    if stored[-1] != key[-1]:
+        return None
+    if payload["store"] is None and {n: store.fingerprint(n) for n in store.file_names()} != payload["fingerprints"]:
+        return None                 # SQLite 数据库已被其他途径改动（如删除重建），以数据库为准重新同步
+
+    snapshot = dict(payload["snapshot"])
+    if materialize:
+        cold = snapshot.get("cold")
+        snapshot["frame"] = store.to_frame() if len(store) else (empty_frame() if cold is not None else None)
+    return snapshot, key[-1]
+
+
+# ========== ♨️ 默认页面预计算 ==========
+def prebuild_payloads(backend):
+    """
+    按默认页面（默认日期预设、全部游戏）预先执行一遍查询并生成 Plotly 图表，
+    使首次调用才发生的开销（Plotly 校验器的延迟导入、项目模板注册、JSON 序列化）与商户排行的区间汇总缓存
+    在服务接受会话前完成。v2 的 ECharts 组件只能在服务运行后注册，不在此渲染，其数据查询与 v1 相同。
+
+    参数说明：
+    - backend: load_backend / open_backend 返回的查询后端（与会话共用同一份每日汇总，排行缓存可直接命中）
+
+    返回：
+        生成的图表个数
+    """
+    from config.chart_loader import load_chart_modules
+    from config.date_range import DEFAULT_PRESET, preset_range, previous_period
+    from config.inventory import stock_total
+    from config.leaderboard import cached_merchant_totals
+    from config.ratios import available_ratios, ratio_by, ratio_total
+    from utils_v2.line_charts_echarts import draw_dual_axis_chart, draw_line_chart
+
+    start, end = preset_range(DEFAULT_PRESET, backend.min_date(), backend.max_date())
+    prev_start, prev_end = previous_period(start, end)
+    games = backend.game_list()
+    ratio_name = next(iter(available_ratios(backend)), None)
+
+    # ✅ 卡片 / 表格 / 排行（与页面相同的参数）
+    for period_start, period_end in ((start, end), (prev_start, prev_end)):
+        backend.distinct_count("商户昵称", start=period_start, end=period_end)
+        stock_total(backend, period_start, period_end)
+        backend.metric_sum("支付单量", start=period_start, end=period_end)
+        if ratio_name is not None:
+            ratio_total(backend, ratio_name, period_start, period_end, games)
+        backend.merchant_retention(start=period_start, end=period_end, games=games)
+    if ratio_name is not None:
+        ratio_by(backend, "游戏名称", ratio_name, start, end, games)
+    backend.top_anomalies(start=start, end=end, games=games, level=None, limit=20)
+    cached_merchant_totals(backend, start, end, games)
+
+    # ✅ 图表：v1 全部 Plotly 图表，v2 中同为 Plotly 的折线图 / 双轴图
+    line_data = backend.sum_by("dt", "支付单量", start=start, end=end, games=games)
+    compare_raw = backend.sum_by("dt", "支付单量", start=prev_start, end=prev_end, games=games)
+    compare_data = compare_raw.assign(dt=compare_raw["dt"] + pd.Timedelta(days=(end - start).days + 1))
+    ratio_daily = ratio_by(backend, "dt", ratio_name, start, end, games) if ratio_name is not None else pd.DataFrame()
+    pies = [
+        backend.sum_by("游戏名称", "支付单量", start=start, end=end, games=games),
+        backend.sum_by("游戏名称", "支付单量", start=prev_start, end=prev_end, games=games),
+        backend.sum_by("游戏名称", "支付单量", games=games),
+    ]
+    heatmap_data = backend.daily_matrix("支付单量", start=start, end=end, games=games)
+    inventory_data = backend.inventory_by_game(start=start, end=end, games=games)
+    cohorts = backend.retention_cohorts(start=start, end=end, games=games)
+
+    charts = load_chart_modules(version="v1")
+    figures = []
+    if not line_data.empty:
+        figures.append(charts["draw_line_chart"](line_data, max_days=None, compare_df=compare_data))
+        figures.append(draw_line_chart(line_data, compare_df=compare_data))
+    if not ratio_daily.empty:
+        figures.append(charts["draw_dual_axis_chart"](ratio_daily, bar_col="支付单量", rate_col=ratio_name))
+        figures.append(draw_dual_axis_chart(ratio_daily, bar_col="支付单量", rate_col=ratio_name))
+    figures.extend(charts["draw_pie_chart"](data) for data in pies)
+    if not heatmap_data.empty:
+        figures.append(charts["draw_heatmap"](heatmap_data, "支付单量"))
+    if not inventory_data.empty:
+        figures.append(charts["draw_bar_chart"](inventory_data))
+    if not cohorts.empty:
+        figures.append(charts["draw_cohort_heatmap"](cohorts))
+
+    figures = [fig for fig in figures if fig is not None]
+    for fig in figures:
+        fig.to_json()                       # ✅ 与 st.plotly_chart 相同的序列化路径
+    return len(figures)
@@ -0,0 +1,297 @@
+# 并发会话压测工具（AppTest 无头驱动 app/main.py）
+
+"""
+用法示例：
+    python management_tools/load_test.py                              # 使用 attachments/ 内置数据，1/2/4/8 并发
+    python management_tools/load_test.py --sessions 1 4 16 --reruns 30
+    python management_tools/load_test.py --synthetic-days 90 --synthetic-merchants 2000
+    python management_tools/load_test.py --memory --synthetic-days 90          # 单会话 rerun 峰值内存（写时复制效果）
+
+说明：
+    - 每个模拟会话是一个独立的 streamlit.testing.v1.AppTest 实例（同一进程内，共享 st.cache_* 缓存，与真实服务端一致）
+    - 会话随机切换「游戏多选框」与「v1/v2 渲染版本」后触发 rerun，记录每次 rerun 耗时
+    - 输出：各并发档位下 rerun 延迟 p50/p95/p99、进程 CPU 占用、RSS 内存
+    - --memory：改为单会话逐次 rerun，用 tracemalloc 记录每次 rerun 的新增内存峰值，并与基础数据集大小对比
+      （pandas 2.x 下可设置 DASHBOARD_COPY_ON_WRITE=0 对比关闭写时复制时的结果）
+    - 全程本地运行，不依赖网络；--synthetic-* 参数会在临时目录生成模拟附件
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+import tracemalloc
+
+# ========== 🛠️ 添加项目根目录到模块搜索路径 ==========
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+MAIN_SCRIPT = os.path.join(PROJECT_ROOT, "app", "main.py")
+
+# ✅ 渲染版本选项（需与 app/main.py 中 radio 的选项保持一致）
+VERSION_OPTIONS = ["快速版（v1）", "高定制版（v2）"]
+
+
+# ========== 📁 模拟附件生成 ==========
+def generate_synthetic_attachments(target_dir, days=60, merchants=500, games=30, seed=0):
+    """
+    在 target_dir 中生成与正式导出模版一致的模拟 Excel 文件（每日一个）。
+
+    参数说明：
+    - target_dir: 输出目录
+    - days: 生成天数（截止到今天）
+    - merchants: 商户数量
+    - games: 游戏数量
+    - seed: 随机种子，保证多次压测数据一致
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    merchant_names = [f"模拟商户-{i}" for i in range(merchants)]
+    game_names = [f"模拟游戏{i:02d}" for i in range(games)]
+    end = pd.Timestamp.today().normalize()
+
+    for d in pd.date_range(end=end, periods=days, freq="D"):
+        # 每日约 60% 商户活跃，每个商户随机经营 1 个游戏
+        n = int(merchants * 0.6)
+        on_sale = rng.integers(0, 2000, n)
+        df = pd.DataFrame({
+            "dt": d.strftime("%Y-%m-%d"),
+            "商户昵称": rng.choice(merchant_names, n, replace=False),
+            "游戏名称": rng.choice(game_names, n),
+            "在售商品数量": on_sale,
+            "商品数量与昨日差值": rng.integers(-50, 50, n),
+            "支付单量": rng.poisson(2, n),
+        })
+        df["完结单量"] = (df["支付单量"] * rng.uniform(0.5, 1.0, n)).astype(int)
+        df.to_excel(os.path.join(target_dir, f"模拟商户商品在售及订单情况 {d:%m%d}.xlsx"), index=False)
+
+
+# ========== 📊 进程资源采样 ==========
+def read_rss_mb():
+    """读取当前进程常驻内存（MB）；优先使用 psutil，不可用时读取 /proc"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        import resource
+        # ⚠️ 无 /proc 时（如 macOS）退化为峰值 RSS（macOS 单位为字节）
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class ResourceSampler(threading.Thread):
+    """后台线程：按固定间隔采样 CPU 占用（进程 CPU 时间 / 墙钟时间）与 RSS"""
+
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.cpu_samples = []
+        self.rss_samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last_wall, last_cpu = time.perf_counter(), time.process_time()
+        while not self._stop_event.wait(self.interval):
+            wall, cpu = time.perf_counter(), time.process_time()
+            self.cpu_samples.append((cpu - last_cpu) / (wall - last_wall) * 100)
+            self.rss_samples.append(read_rss_mb())
+            last_wall, last_cpu = wall, cpu
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ========== 🧍 单个模拟会话 ==========
+def run_session(session_id, reruns, timeout, latencies, errors, barrier):
+    """
+    模拟一个用户会话：首次加载后，随机切换游戏多选 / 渲染版本并记录 rerun 耗时。
+    首次加载（冷启动）不计入 latencies，避免与稳态延迟混在一起。
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(session_id)
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=timeout)
+
+    try:
+        at.run()
+        barrier.wait()  # ✅ 所有会话就绪后同时开始，保证并发度真实
+
+        for _ in range(reruns):
+            if not at.multiselect or rng.random() < 0.3:
+                # 切换 v1 / v2
+                at.sidebar.radio[0].set_value(rng.choice(VERSION_OPTIONS))
+            else:
+                # 随机选取游戏子集（至少 1 个）
+                options = at.multiselect[0].options
+                k = rng.randint(1, len(options))
+                at.multiselect[0].set_value(rng.sample(options, k))
+
+            start = time.perf_counter()
+            at.run()
+            latencies.append(time.perf_counter() - start)
+
+            if at.exception:
+                errors.append(f"会话 {session_id}: {at.exception[0].value}")
+                break
+    except threading.BrokenBarrierError:
+        errors.append(f"会话 {session_id}: 启动超时，未参与本轮压测")
+    except Exception as e:
+        errors.append(f"会话 {session_id}: {e}")
+        barrier.abort()
+
+
+def run_level(n_sessions, reruns, timeout):
+    """以 n_sessions 个并发会话执行一轮压测，返回统计结果字典"""
+    latencies, errors = [], []
+    barrier = threading.Barrier(n_sessions, timeout=timeout)
+    threads = [
+        threading.Thread(target=run_session, args=(i, reruns, timeout, latencies, errors, barrier))
+        for i in range(n_sessions)
+    ]
+
+    sampler = ResourceSampler()
+    sampler.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sampler.stop()
+
+    def pct(values, p):
+        if not values:
+            return float("nan")
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+    return {
+        "sessions": n_sessions,
+        "reruns": len(latencies),
+        "p50": pct(latencies, 50) * 1000,
+        "p95": pct(latencies, 95) * 1000,
+        "p99": pct(latencies, 99) * 1000,
+        "cpu": statistics.mean(sampler.cpu_samples) if sampler.cpu_samples else float("nan"),
+        "rss": max(sampler.rss_samples) if sampler.rss_samples else read_rss_mb(),
+        "errors": errors,
+    }
+
+
+# ========== 🧠 单会话 rerun 内存 ==========
+def base_dataset_mb():
+    """基础数据集（内存后端的合并 DataFrame）占用内存（MB），需在 app 运行过一次后调用"""
+    from config.attachments_loader import get_store
+
+    attachments_dir = os.environ.get("DASHBOARD_ATTACHMENTS_DIR") or os.path.join(PROJECT_ROOT, "attachments")
+    df = get_store(attachments_dir).to_frame()
+    return 0.0 if df is None else df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+def run_memory_profile(reruns, timeout):
+    """
+    单会话逐次 rerun，记录每次 rerun 相对 rerun 前的内存峰值增量（tracemalloc，含 numpy / pandas 缓冲区）。
+    写时复制开启时，筛选出的子表共享基础数据集的缓冲区，峰值增量应明显小于基础数据集本身。
+    """
+    from streamlit.testing.v1 import AppTest
+    from config.data_backend import copy_on_write_enabled
+
+    rng = random.Random(0)
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=timeout)
+    at.run()                                    # 冷启动（导入附件）不计入
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(reruns):
+            if at.multiselect and rng.random() >= 0.3:
+                options = at.multiselect[0].options
+                at.multiselect[0].set_value(rng.sample(options, rng.randint(1, len(options))))
+            else:
+                at.sidebar.radio[0].set_value(rng.choice(VERSION_OPTIONS))
+
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            at.run()
+            peaks.append((tracemalloc.get_traced_memory()[1] - before) / 1024 / 1024)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "copy_on_write": copy_on_write_enabled(),
+        "base": base_dataset_mb(),
+        "median": statistics.median(peaks) if peaks else float("nan"),
+        "max": max(peaks) if peaks else float("nan"),
+        "errors": [e.value for e in at.exception],
+    }
+
+
+# ========== 🚀 主入口 ==========
+def main():
+    parser = argparse.ArgumentParser(description="游戏仪表盘并发会话压测工具")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="并发会话数档位")
+    parser.add_argument("--reruns", type=int, default=20, help="每个会话的 rerun 次数")
+    parser.add_argument("--timeout", type=float, default=120, help="单次 rerun 超时（秒）")
+    parser.add_argument("--synthetic-days", type=int, default=0, help="生成模拟附件的天数（0 表示使用 attachments/）")
+    parser.add_argument("--synthetic-merchants", type=int, default=500, help="模拟商户数量")
+    parser.add_argument("--synthetic-games", type=int, default=30, help="模拟游戏数量")
+    parser.add_argument("--memory", action="store_true", help="只测单会话 rerun 峰值内存（不做并发压测）")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.synthetic_days > 0:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="dashboard_loadtest_")
+        print(f"🧪 生成模拟附件：{args.synthetic_days} 天 × {args.synthetic_merchants} 商户 → {tmp_dir.name}")
+        generate_synthetic_attachments(
+            tmp_dir.name,
+            days=args.synthetic_days,
+            merchants=args.synthetic_merchants,
+            games=args.synthetic_games,
+        )
+        os.environ["DASHBOARD_ATTACHMENTS_DIR"] = tmp_dir.name
+
+    if args.memory:
+        try:
+            r = run_memory_profile(args.reruns, args.timeout)
+        finally:
+            if tmp_dir is not None:
+                tmp_dir.cleanup()
+        print(f"写时复制：{'开启' if r['copy_on_write'] else '关闭'}")
+        print(f"基础数据集：{r['base']:.1f} MB")
+        print(f"单次 rerun 新增内存峰值：中位数 {r['median']:.1f} MB，最大 {r['max']:.1f} MB")
+        for err in r["errors"]:
+            print(f"    ❌ {err}")
+        return
+
+    header = f"{'并发':>6} {'rerun数':>8} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'CPU(%)':>8} {'RSS(MB)':>9}"
+    print(header)
+    print("-" * len(header))
+
+    try:
+        for n in args.sessions:
+            r = run_level(n, args.reruns, args.timeout)
+            print(
+                f"{r['sessions']:>6} {r['reruns']:>8} {r['p50']:>10.1f} {r['p95']:>10.1f} "
+                f"{r['p99']:>10.1f} {r['cpu']:>8.1f} {r['rss']:>9.1f}"
+            )
+            for err in r["errors"]:
+                print(f"    ❌ {err}")
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
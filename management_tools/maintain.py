@@ -0,0 +1,308 @@
+# 附件归档维护工具：压缩为列式归档 / 重建索引 / 校验源文件哈希 / 清理被覆盖的重复导出
+
+"""
+用法示例：
+    python management_tools/maintain.py compact                 # 并行解析 attachments/ 全部 Excel，写出 .dashboard_cache/dataset.arrow
+    python management_tools/maintain.py compact --workers 8
+    python management_tools/maintain.py rebuild                 # 由归档（含汇总层）重建每日汇总 / 索引，与明细逐格核对后写回索引文件
+    python management_tools/maintain.py verify                  # 按归档清单核对源文件 sha256（缺失 / 被修改 / 未归档）
+    python management_tools/maintain.py vacuum                  # 列出已被新版本完全覆盖的重复导出（默认只预览）
+    python management_tools/maintain.py vacuum --apply          # 移入 attachments/_superseded/，并同步更新归档清单
+    python management_tools/maintain.py all --apply             # 依次执行 compact → verify → vacuum
+
+说明：
+    - 归档即 Arrow 共享数据集（config/arrow_dataset.py）：DASHBOARD_BACKEND=arrow 的服务进程直接内存映射打开，
+      compact 同时写出查询索引（indexes_*.bin，服务进程同样内存映射，不各自重建），不再解析 Excel；配合 DASHBOARD_ARROW_INGEST=0，导入完全由定时任务执行，不占用仪表盘进程
+    - 归档的快照信息中附带源文件清单：{文件名: sha256 / 大小 / 修改时间 / 解析行数 / 去重后保留行数 / 所在层}；
+      分层保留（DASHBOARD_RAW_DAYS）时含较早日期行的文件进入汇总层（cold_tier.npz，所在层为 cold），不参与 vacuum
+    - 与仪表盘导入进程互斥（同一把 ingest.lock），导入进程运行时 compact / rebuild / vacuum --apply 直接退出
+    - 退出码：0 正常；1 校验发现问题；2 归档不存在或被导入进程占用
+    - 安装 tqdm 时使用 tqdm 进度条，否则输出简易文本进度条
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# ========== 🛠️ 添加项目根目录到模块搜索路径 ==========
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+# ✅ 默认路径与 app/main.py 保持一致（服务进程据此判断归档是否属于当前附件目录）
+ATTACHMENTS_DIR = os.environ.get("DASHBOARD_ATTACHMENTS_DIR") or os.path.join(PROJECT_ROOT, "attachments")
+SUPERSEDED_DIR_NAME = "_superseded"
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+
+# ========== 📶 进度条 ==========
+def progress(iterable, total, desc):
+    """迭代并显示进度：优先使用 tqdm，未安装时在 stderr 输出文本进度条"""
+    if tqdm is not None:
+        yield from tqdm(iterable, total=total, desc=desc, unit="个")
+        return
+
+    width = 30
+    for i, item in enumerate(iterable, 1):
+        filled = width * i // max(total, 1)
+        sys.stderr.write(f"\r{desc} [{'#' * filled}{'.' * (width - filled)}] {i}/{total}")
+        sys.stderr.flush()
+        yield item
+    if total:
+        sys.stderr.write("\n")
+
+
+# ========== 📁 路径 / 归档 ==========
+def archive_path(cache_dir):
+    from config.arrow_dataset import DATASET_FILE_NAME
+    return os.path.join(cache_dir, DATASET_FILE_NAME)
+
+
+def hold_ingest_lock(cache_dir):
+    """取得导入锁（与仪表盘导入进程互斥），失败时退出"""
+    from config.arrow_dataset import acquire_ingest_role
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if not acquire_ingest_role(cache_dir):
+        print("⛔ 仪表盘导入进程正在运行（ingest.lock 已被占用），其后台线程会维护归档；"
+              "如需由定时任务接管，请以 DASHBOARD_ARROW_INGEST=0 启动仪表盘")
+        sys.exit(2)
+
+
+def open_archive(cache_dir):
+    """打开归档，返回 (DataFrame, 快照信息)；不存在时退出"""
+    from config.arrow_dataset import open_dataset
+
+    path = archive_path(cache_dir)
+    if not os.path.exists(path):
+        print(f"⛔ 归档不存在：{path}（请先执行 compact）")
+        sys.exit(2)
+    return open_dataset(path)
+
+
+def hash_files(paths, workers):
+    """并行计算 sha256（hashlib 计算时释放 GIL，线程池即可），返回 {路径: sha256}"""
+    from config.upload_pipeline import hash_file
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(hash_file, p): p for p in paths}
+        return {futures[f]: f.result() for f in progress(as_completed(futures), len(futures), "🔐 计算哈希")}
+
+
+# ========== 🗜️ compact ==========
+def compact(directory, cache_dir, workers):
+    """
+    解析目录中的全部 Excel（进程池并行），按唯一键去重后写出归档。
+
+    返回：
+        dict 快照信息（写入归档的内容）
+    """
+    from config.arrow_dataset import write_dataset
+    from config.attachments_loader import (
+        READ_COLUMNS, RECENT_DAYS, apply_parsed, build_snapshot, file_fingerprint,
+        in_date_range, parse_attachment, tier_ranges,
+    )
+    from config.cold_tier import COLD_FILE_NAME, RAW_DAYS
+    from config.data_backend import INDEX_KEYS
+    from config.keyed_store import KeyedStore
+
+    hold_ingest_lock(cache_dir)
+    started = time.perf_counter()
+    date_range, _, hot_range = tier_ranges(RECENT_DAYS, RAW_DAYS)
+    names = sorted(f for f in os.listdir(directory) if f.endswith(".xlsx") and in_date_range(f, date_range))
+    all_paths = [os.path.join(directory, n) for n in names]
+    paths = [p for p in all_paths if in_date_range(os.path.basename(p), hot_range)]     # 可能含明细层日期的文件（汇总层由 build_snapshot 汇总）
+
+    # ✅ 并行解析，按完成顺序显示进度；写入存储时按文件名顺序，结果与仪表盘导入一致
+    store, failures, quarantined = KeyedStore(), [], []
+    parse = partial(parse_attachment, columns=READ_COLUMNS, date_range=hot_range)
+    parsed = {}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(parse, p): p for p in paths}
+        for future in progress(as_completed(futures), len(futures), "📖 解析附件"):
+            parsed[futures[future]] = future.result()
+    with store.lock:
+        for path in paths:
+            apply_parsed(store, path, file_fingerprint(path, READ_COLUMNS), parsed[path],
+                         False, failures, quarantined)
+
+    # ✅ 指纹均已入库，build_snapshot 不再重复解析，只负责汇总校验结果与构建索引
+    snapshot = build_snapshot(directory, quarantine=False, store=store, materialize=True,
+                              columns=READ_COLUMNS, recent_days=RECENT_DAYS, raw_days=RAW_DAYS)
+    frame = snapshot.pop("frame")
+    cold_names = set(snapshot["cold_names"])
+    kept = frame["来源文件"].value_counts() if frame is not None else {}
+    hashes = hash_files(all_paths, workers)
+    if snapshot["cold"] is not None:
+        snapshot["cold"].save(os.path.join(cache_dir, COLD_FILE_NAME))
+
+    metadata = {k: v for k, v in snapshot.items() if k != "cold" and k not in INDEX_KEYS}
+    metadata["directory"] = directory
+    metadata["manifest"] = {
+        os.path.basename(path): {
+            "sha256": hashes[path],
+            "size": os.path.getsize(path),
+            "mtime_ns": os.stat(path).st_mtime_ns,
+            "rows": 0 if parsed.get(path, (None,))[0] is None else len(parsed[path][0]),
+            "kept": int(kept.get(os.path.basename(path), 0)),
+            "tier": "cold" if os.path.basename(path) in cold_names else "raw",
+        }
+        for path in all_paths
+    }
+    write_dataset(frame, archive_path(cache_dir), metadata, indexes={k: snapshot[k] for k in INDEX_KEYS})
+
+    print(f"🗜️ 已归档 {metadata['files']} 个文件，{metadata['rows']} 行（重复导出去重 {metadata['duplicates']} 行），"
+          f"耗时 {time.perf_counter() - started:.1f}s → {archive_path(cache_dir)}")
+    if metadata["cold_rows"]:
+        print(f"🧊 汇总层：{metadata['cold_files']} 个文件，{metadata['cold_rows']} 行已按日汇总")
+    for name, error in snapshot["failures"]:
+        print(f"    ❌ {name}：{error}")
+    return metadata
+
+
+# ========== 🧱 rebuild ==========
+def rebuild(cache_dir):
+    """
+    由归档重建全部内存索引（与 compact 写出索引文件时的构建过程相同，含汇总层 cold_tier.npz），
+    将每日汇总与明细逐格核对，一致时连同数据集一起写回（替换原索引文件，服务进程下次打开时映射新索引）。
+
+    返回：
+        bool：核对是否一致
+    """
+    import numpy as np
+    from config.arrow_dataset import write_dataset
+    from config.cold_tier import COLD_FILE_NAME, ColdTier
+    from config.data_backend import build_indexes
+
+    hold_ingest_lock(cache_dir)
+    frame, snapshot = open_archive(cache_dir)
+    started = time.perf_counter()
+    cold = ColdTier.load(os.path.join(cache_dir, COLD_FILE_NAME)) if snapshot.get("cold_rows") else None
+    indexes = build_indexes(frame, cold=cold)
+    elapsed = time.perf_counter() - started
+
+    rollup = indexes["rollup"]
+    if rollup is None:
+        print("ℹ️ 归档为空，无需重建")
+        return True
+
+    ok = True
+    keys = [frame["dt"].dt.normalize(), frame["游戏名称"].astype(str)]
+    for col in progress(list(rollup.totals), len(rollup.totals), "🧮 核对汇总"):
+        expected = frame.groupby(keys)[col].sum().unstack(fill_value=0)
+        actual = rollup.daily_matrix(col).fillna(0).reindex(index=expected.index, columns=expected.columns)
+        if not np.allclose(actual.to_numpy(dtype="float64"), expected.to_numpy(dtype="float64")):
+            print(f"    ❌ {col}：每日汇总与明细不一致")
+            ok = False
+    if ok:
+        write_dataset(frame, archive_path(cache_dir), snapshot, indexes=indexes)
+
+    print(f"🧱 已重建索引：{len(frame)} 行，{len(rollup.dates)} 天 × {len(rollup.games)} 个游戏，"
+          f"{len(rollup.merchants)} 个商户，耗时 {elapsed:.2f}s；核对{'一致，已写回归档' if ok else '失败，未写回'}")
+    return ok
+
+
+# ========== 🔐 verify ==========
+def verify(directory, cache_dir, workers):
+    """
+    按归档清单核对源文件：缺失、内容被修改（sha256 不一致）、未归档的新文件，以及归档中各文件的保留行数。
+
+    返回：
+        bool：是否全部一致
+    """
+    frame, snapshot = open_archive(cache_dir)
+    manifest = snapshot.get("manifest")
+    if manifest is None:
+        print("⛔ 归档由仪表盘导入进程写出，不含源文件清单（请执行 compact）")
+        return False
+
+    names = sorted(f for f in os.listdir(directory) if f.endswith(".xlsx"))
+    present = [n for n in names if n in manifest]
+    hashes = hash_files([os.path.join(directory, n) for n in present], workers)
+    kept = frame["来源文件"].astype(str).value_counts()
+
+    missing = sorted(set(manifest) - set(names))
+    changed = [n for n in present if hashes[os.path.join(directory, n)] != manifest[n]["sha256"]]
+    untracked = [n for n in names if n not in manifest]
+    mismatched = [n for n in manifest if int(kept.get(n, 0)) != manifest[n]["kept"]]
+
+    for title, items in [("缺失", missing), ("内容已变化", changed), ("未归档", untracked), ("保留行数不符", mismatched)]:
+        for name in items:
+            print(f"    ❌ {title}：{name}")
+    ok = not (missing or changed or untracked or mismatched)
+    print(f"🔐 已核对 {len(present)} / {len(manifest)} 个归档文件：{'全部一致' if ok else '存在问题（请重新执行 compact）'}")
+    return ok
+
+
+# ========== 🧹 vacuum ==========
+def vacuum(directory, cache_dir, apply=False):
+    """
+    清理被覆盖的重复导出：归档中一行都没有保留（所有键均被更新版本覆盖）的文件。
+    移入 attachments/_superseded/（不删除），归档数据不变，只从清单中移除这些文件。
+
+    返回：
+        [文件名]：被覆盖的文件
+    """
+    from config.arrow_dataset import write_dataset
+
+    frame, snapshot = open_archive(cache_dir)
+    manifest = snapshot.get("manifest") or {}
+    superseded = sorted(n for n, entry in manifest.items()
+                        if entry.get("tier", "raw") == "raw" and entry["rows"] > 0 and entry["kept"] == 0
+                        and os.path.exists(os.path.join(directory, n)))
+
+    if not superseded:
+        print("🧹 没有被完全覆盖的重复导出")
+        return superseded
+    if not apply:
+        for name in superseded:
+            print(f"    ♻️ {name}（{manifest[name]['rows']} 行均已被新版本覆盖）")
+        print(f"🧹 {len(superseded)} 个文件可清理（预览，加 --apply 执行）")
+        return superseded
+
+    hold_ingest_lock(cache_dir)
+    target_dir = os.path.join(directory, SUPERSEDED_DIR_NAME)
+    os.makedirs(target_dir, exist_ok=True)
+    for name in progress(superseded, len(superseded), "🧹 移出文件"):
+        shutil.move(os.path.join(directory, name), os.path.join(target_dir, name))
+
+    # ✅ 被移出的文件不拥有任何行：归档数据不变，只更新清单与文件数
+    snapshot["manifest"] = {n: e for n, e in manifest.items() if n not in superseded}
+    snapshot["files"] = len(snapshot["manifest"])
+    write_dataset(frame, archive_path(cache_dir), snapshot)
+    print(f"🧹 已将 {len(superseded)} 个文件移入 {target_dir}")
+    return superseded
+
+
+# ========== 🚀 主入口 ==========
+def main():
+    parser = argparse.ArgumentParser(description="游戏仪表盘附件归档维护工具")
+    parser.add_argument("command", choices=["compact", "rebuild", "verify", "vacuum", "all"], help="维护操作")
+    parser.add_argument("--attachments", default=ATTACHMENTS_DIR, help="附件目录（默认与仪表盘一致）")
+    parser.add_argument("--cache-dir", default=os.path.join(PROJECT_ROOT, ".dashboard_cache"), help="归档所在目录")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行解析 / 计算哈希的进程（线程）数")
+    parser.add_argument("--apply", action="store_true", help="vacuum 实际移动文件（默认只预览）")
+    args = parser.parse_args()
+
+    ok = True
+    if args.command in ("compact", "all"):
+        compact(args.attachments, args.cache_dir, args.workers)
+    if args.command == "rebuild":
+        ok = rebuild(args.cache_dir)
+    if args.command in ("verify", "all"):
+        ok = verify(args.attachments, args.cache_dir, args.workers)
+    if args.command in ("vacuum", "all"):
+        vacuum(args.attachments, args.cache_dir, apply=args.apply)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# 启动入口：先在服务进程内完成预热（恢复 / 导入数据 + 默认页面预计算），再启动 Streamlit 服务
+
+"""
+用法示例：
+    python management_tools/serve.py                            # 预热后启动 streamlit run app/main.py
+    python management_tools/serve.py --server.port 8502         # 其余参数原样传给 streamlit run
+    python management_tools/serve.py --warm-only                # 只预热（校验 / 生成磁盘缓存）后退出，可在部署流程中提前执行
+    python management_tools/serve.py --no-warm                  # 跳过预热，等同于直接 streamlit run
+
+说明：
+    - 预热与之后的会话在同一进程内：数据快照、后台导入线程、商户排行缓存、已导入的图表模块均直接复用，
+      首个会话与稳态 rerun 的耗时一致
+    - 数据优先由启动预热缓存恢复（.dashboard_cache/warm_start_*.pkl，见 config/warm_start.py），
+      缓存按附件目录签名（文件名 / 大小 / 修改时间）与运行配置校验；只有目录变化时恢复已导入的文件、只解析变化的文件，
+      运行配置变化时完整导入，导入后重新写入缓存
+    - 预热耗时输出到终端，并显示在仪表盘侧边栏（♨️ 启动预热）
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# ========== 🛠️ 添加项目根目录到模块搜索路径 ==========
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+MAIN_SCRIPT = os.path.join(PROJECT_ROOT, "app", "main.py")
+
+# ✅ 与 app/main.py 保持一致（预热的存储 / 导入线程按附件目录与后端复用）
+ATTACHMENTS_DIR = os.environ.get("DASHBOARD_ATTACHMENTS_DIR") or os.path.join(PROJECT_ROOT, "attachments")
+DATA_BACKEND = os.environ.get("DASHBOARD_BACKEND", "memory")
+
+
+# ========== ♨️ 预热 ==========
+def warm_up(base_dir=PROJECT_ROOT, attachments_dir=ATTACHMENTS_DIR, backend=DATA_BACKEND):
+    """
+    恢复 / 导入数据并按默认页面预计算，结果记录在 config.warm_start.WARM_REPORT 中。
+
+    返回：
+        WARM_REPORT：{"seconds": 总耗时, "source": 数据来源, "phases": {阶段: 耗时}}
+    """
+    from config.attachments_loader import open_backend
+    from config.warm_start import WARM_REPORT, prebuild_payloads
+
+    began = time.perf_counter()
+    backend_obj, source = open_backend(base_dir, attachments_dir, backend)
+    loaded = time.perf_counter()
+    figures = prebuild_payloads(backend_obj) if backend_obj is not None else 0
+    finished = time.perf_counter()
+
+    WARM_REPORT.update(
+        seconds=finished - began,
+        source=source if backend_obj is not None else "无数据",
+        phases={"数据": loaded - began, "默认页面": finished - loaded},
+        figures=figures,
+    )
+    return WARM_REPORT
+
+
+def main():
+    parser = argparse.ArgumentParser(description="游戏仪表盘启动入口（预热后启动 Streamlit）")
+    parser.add_argument("--warm-only", action="store_true", help="只预热后退出（生成 / 校验磁盘缓存）")
+    parser.add_argument("--no-warm", action="store_true", help="跳过预热，直接启动服务")
+    args, streamlit_args = parser.parse_known_args()
+
+    if not args.no_warm:
+        report = warm_up()
+        phases = "，".join(f"{name} {seconds:.2f}s" for name, seconds in report["phases"].items())
+        print(f"♨️ 启动预热完成：{report['seconds']:.2f}s（{report['source']}；{phases}；预生成 {report['figures']} 张图表）",
+              flush=True)
+    if args.warm_only:
+        return 0
+
+    # ✅ 在当前进程内启动服务（不另起进程），预热结果由之后的会话直接复用
+    from streamlit.web import cli as stcli
+
+    sys.argv = ["streamlit", "run", MAIN_SCRIPT, *streamlit_args]
+    return stcli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# 分层保留：行按 dt 进入明细层 / 汇总层，与文件名 MMDD 无关（文件名不含年份）
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.attachments_loader import build_snapshot
+from config.keyed_store import KeyedStore
+
+RAW_DAYS = 30
+
+
+def write_export(path, day, merchants, orders):
+    pd.DataFrame({
+        "dt": day.strftime("%Y-%m-%d"),
+        "商户昵称": merchants,
+        "游戏名称": "原神",
+        "在售商品数量": 10,
+        "商品数量与昨日差值": 0,
+        "支付单量": orders,
+        "完结单量": 0,
+    }).to_excel(path, index=False)
+
+
+def test_same_mmdd_in_earlier_year_goes_to_cold_tier(tmp_path):
+    # ✅ 明细层范围内的某一天，与去年同一 MMDD 的导出（文件名相同的 MMDD）
+    hot_day = pd.Timestamp.today().normalize() - pd.Timedelta(days=5)
+    old_day = hot_day - pd.DateOffset(years=1)
+    mmdd = hot_day.strftime("%m%d")
+    write_export(tmp_path / f"报表 {mmdd}.xlsx", hot_day, ["甲", "乙"], [1, 2])
+    write_export(tmp_path / f"去年报表 {mmdd}.xlsx", old_day, ["甲", "乙", "丙"], [10, 20, 30])
+
+    untiered = build_snapshot(str(tmp_path), quarantine=False, store=KeyedStore())
+    tiered = build_snapshot(str(tmp_path), quarantine=False, store=KeyedStore(), raw_days=RAW_DAYS)
+
+    assert untiered["rows"] == 5
+    assert tiered["rows"] == 2
+    assert tiered["cold_rows"] == 3
+    assert tiered["frame"]["支付单量"].sum() == 3
+    assert tiered["cold"].totals["支付单量"].sum() == 60
+    assert tiered["cold_names"] == [f"去年报表 {mmdd}.xlsx"]
+    assert tiered["files"] == 2
+
+
+def test_file_with_both_tiers_is_split_by_row_date(tmp_path):
+    hot_day = pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+    old_day = hot_day - pd.DateOffset(years=1)
+    path = tmp_path / f"报表 {hot_day.strftime('%m%d')}.xlsx"
+    frames = []
+    for day, orders in ((hot_day, 4), (old_day, 7)):
+        write_export(path, day, ["甲"], [orders])
+        frames.append(pd.read_excel(path))
+    pd.concat(frames).to_excel(path, index=False)
+
+    tiered = build_snapshot(str(tmp_path), quarantine=False, store=KeyedStore(), raw_days=RAW_DAYS)
+
+    assert tiered["rows"] == 1 and tiered["frame"]["支付单量"].sum() == 4
+    assert tiered["cold_rows"] == 1 and tiered["cold"].totals["支付单量"].sum() == 7
+    assert tiered["files"] == 1
+
+
+def test_rows_move_between_tiers_when_raw_range_changes(tmp_path):
+    # ✅ 同一存储先后以不同明细层天数同步（等同于跨天后起点前移 / 调整 DASHBOARD_RAW_DAYS）：行不丢失、不重复
+    today = pd.Timestamp.today().normalize()
+    for offset, orders in ((2, 1), (10, 2), (20, 4)):
+        day = today - pd.Timedelta(days=offset)
+        write_export(tmp_path / f"报表 {day.strftime('%m%d')}.xlsx", day, ["甲"], [orders])
+
+    store = KeyedStore()
+    for raw_days, hot_orders in ((30, 7), (5, 1), (15, 3), (30, 7)):
+        snapshot = build_snapshot(str(tmp_path), quarantine=False, store=store, raw_days=raw_days)
+        cold_orders = 0 if snapshot["cold"] is None else snapshot["cold"].totals["支付单量"].sum()
+        assert snapshot["frame"]["支付单量"].sum() == hot_orders
+        assert hot_orders + cold_orders == 7
@@ -0,0 +1,74 @@
+# 查询索引：SQLite 存储由 SQL 聚合构建（不读出整表、不保留商户-天对，商户索引只含检索部分），Arrow 数据集的索引写在数据集旁并内存映射读取
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.arrow_dataset import INDEX_FILE_KEY, load_dataset, write_dataset
+from config.attachments_loader import build_snapshot
+from config.data_backend import INDEX_KEYS, MemoryBackend, backend_indexes
+from config.keyed_store import KeyedStore
+from config.sqlite_store import SQLiteBackend, SQLiteStore
+
+
+def write_export(path, day, rows):
+    pd.DataFrame([
+        {"dt": day.strftime("%Y-%m-%d"), "商户昵称": merchant, "游戏名称": game,
+         "在售商品数量": stock, "商品数量与昨日差值": 0, "支付单量": orders, "完结单量": 0}
+        for merchant, game, stock, orders in rows
+    ]).to_excel(path, index=False)
+
+
+def write_attachments(directory):
+    day = pd.Timestamp("2025-06-01")
+    write_export(directory / "报表 0601.xlsx", day, [("甲", "原神", 10, 1), ("乙", "原神", 5, 2), ("甲", "王者荣耀", 3, 4)])
+    write_export(directory / "报表 0602.xlsx", day + pd.Timedelta(days=1), [("甲", "原神", 8, 3), ("丙", "王者荣耀", 7, 5)])
+
+
+def test_sqlite_indexes_match_memory_without_pairs(tmp_path):
+    attachments = tmp_path / "attachments"
+    attachments.mkdir()
+    write_attachments(attachments)
+    db_path = str(tmp_path / "dashboard.sqlite")
+
+    memory = build_snapshot(str(attachments), quarantine=False, store=KeyedStore())
+    disk = build_snapshot(str(attachments), quarantine=False, store=SQLiteStore(db_path), materialize=False)
+    expected = MemoryBackend(memory["frame"], **backend_indexes(memory))
+    backend = SQLiteBackend(db_path, **backend_indexes(disk))
+
+    assert disk["frame"] is None and not disk["merchant_index"].has_rows
+    assert not backend.rollup.has_pairs
+    assert backend.search_merchants("甲") == expected.search_merchants("甲") == ["甲"]
+    pd.testing.assert_frame_equal(backend.merchant_series("甲"), expected.merchant_series("甲"), check_dtype=False)
+    assert (backend.rollup.counts == expected.rollup.counts).all()
+    assert (backend.rollup.totals["支付单量"] == expected.rollup.totals["支付单量"]).all()
+    for games in (None, ["原神"]):
+        assert backend.distinct_count("商户昵称", games=games) == expected.distinct_count("商户昵称", games=games)
+        assert backend.merchant_retention(games=games) == expected.merchant_retention(games=games)
+        actual = backend.merchant_totals(games=games).sort_values("商户昵称", ignore_index=True)
+        pd.testing.assert_frame_equal(actual, expected.merchant_totals(games=games).sort_values("商户昵称", ignore_index=True),
+                                      check_dtype=False)
+
+
+def test_arrow_dataset_maps_persisted_indexes(tmp_path):
+    attachments = tmp_path / "attachments"
+    attachments.mkdir()
+    write_attachments(attachments)
+    path = str(tmp_path / "dataset.arrow")
+
+    snapshot = build_snapshot(str(attachments), quarantine=False, store=KeyedStore())
+    metadata = {k: v for k, v in snapshot.items() if k not in ("frame", "cold") and k not in INDEX_KEYS}
+    for _ in range(2):
+        write_dataset(snapshot["frame"], path, metadata, indexes={k: snapshot[k] for k in INDEX_KEYS})
+    frame, loaded = load_dataset(path)
+
+    assert sorted(f for f in os.listdir(tmp_path) if f.startswith("indexes_")) == [loaded[INDEX_FILE_KEY]]
+    expected = MemoryBackend(snapshot["frame"], **backend_indexes(snapshot))
+    backend = MemoryBackend(frame, **backend_indexes(loaded))
+    assert backend.distinct_count("商户昵称") == expected.distinct_count("商户昵称") == 3
+    assert backend.search_merchants("甲") == ["甲"]
+    pd.testing.assert_frame_equal(backend.merchant_series("甲"), expected.merchant_series("甲"))
+    pd.testing.assert_frame_equal(backend.merchant_totals(), expected.merchant_totals())
@@ -0,0 +1,61 @@
+# 唯一键去重存储：同一键以版本最新的文件为准，移除文件时恢复被其覆盖的旧行（内存 / SQLite 两种存储语义一致）
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.keyed_store import KeyedStore
+from config.sqlite_store import SQLiteStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return KeyedStore() if request.param == "memory" else SQLiteStore(str(tmp_path / "dashboard.sqlite"))
+
+
+def export_rows(name, orders):
+    """同一天、同一组 (商户, 游戏) 的一份导出；orders 依次对应 甲/原神、乙/原神"""
+    return pd.DataFrame({
+        "dt": "2025-06-18",
+        "商户昵称": ["甲", "乙"],
+        "游戏名称": "原神",
+        "在售商品数量": 10,
+        "商品数量与昨日差值": 0,
+        "支付单量": orders,
+        "完结单量": 0,
+        "来源文件": name,
+    })
+
+
+def orders_by_merchant(store):
+    df = store.to_frame()
+    return dict(zip(df["商户昵称"], df["支付单量"].astype(int)))
+
+
+def test_reexport_wins(store):
+    store.upsert("0618.xlsx", export_rows("0618.xlsx", [1, 2]), version=(1, "0618.xlsx"))
+    store.upsert("0618 v2.xlsx", export_rows("0618 v2.xlsx", [5, 6]), version=(2, "0618 v2.xlsx"))
+
+    assert len(store.to_frame()) == 2
+    assert orders_by_merchant(store) == {"甲": 5, "乙": 6}
+
+
+def test_removing_reexport_restores_superseded_rows(store):
+    store.upsert("0618.xlsx", export_rows("0618.xlsx", [1, 2]), version=(1, "0618.xlsx"))
+    store.upsert("0618 v2.xlsx", export_rows("0618 v2.xlsx", [5, 6]), version=(2, "0618 v2.xlsx"))
+    store.remove("0618 v2.xlsx")
+
+    assert orders_by_merchant(store) == {"甲": 1, "乙": 2}
+    assert set(store.to_frame()["来源文件"]) == {"0618.xlsx"}
+
+
+def test_older_version_applied_later_does_not_win(store):
+    store.upsert("0618 v2.xlsx", export_rows("0618 v2.xlsx", [5, 6]), version=(2, "0618 v2.xlsx"))
+    store.upsert("0618.xlsx", export_rows("0618.xlsx", [1, 2]), version=(1, "0618.xlsx"))
+
+    assert orders_by_merchant(store) == {"甲": 5, "乙": 6}
+    assert set(store.to_frame()["来源文件"]) == {"0618 v2.xlsx"}
@@ -0,0 +1,47 @@
+# 名称映射：别名冲突合并求和、未收录的游戏名保持原始写法
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.keyed_store import KeyedStore
+from config.mappings import canonical_games, canonicalize_games
+
+
+def export_rows(games, listed, orders):
+    return pd.DataFrame({
+        "dt": "2025-06-18",
+        "商户昵称": "极游电竞-400",
+        "游戏名称": games,
+        "在售商品数量": listed,
+        "商品数量与昨日差值": 0,
+        "支付单量": orders,
+        "完结单量": 0,
+    })
+
+
+def test_alias_collision_is_summed():
+    df, _ = canonicalize_games(export_rows(["崩坏星穹铁道", "星穹铁道"], [10, 20], [1, 2]))
+    store = KeyedStore()
+    store.upsert("0618.xlsx", df.assign(来源文件="0618.xlsx"), version=(0, "0618.xlsx"))
+
+    merged = store.to_frame()
+    assert len(merged) == 1
+    assert merged["游戏名称"].iloc[0] == "星穹铁道崩坏"
+    assert merged["在售商品数量"].iloc[0] == 30
+    assert merged["支付单量"].iloc[0] == 3
+
+
+def test_duplicate_rows_of_one_name_keep_last():
+    df, _ = canonicalize_games(export_rows(["星穹铁道", "星穹铁道", "崩坏星穹铁道"], [5, 20, 10], [9, 2, 1]))
+    assert df["在售商品数量"].tolist() == [30]
+    assert df["支付单量"].tolist() == [3]
+
+
+def test_unmapped_games_keep_original_spelling():
+    assert canonical_games(["PUBG Mobile", "王者", "LOL"]).tolist() == ["PUBG Mobile", "王者荣耀", "英雄联盟"]
+    df, _ = canonicalize_games(export_rows(["PUBG Mobile", "王者"], [1, 2], [0, 0]))
+    assert df["游戏名称"].tolist() == ["PUBG Mobile", "王者荣耀"]
@@ -9,6 +9,7 @@ def render_info_card(
     key=None,
     with_title=True,
     subtitle=None,
+    delta_label="前一日",
     debug=False
 ):
     """
@@ -23,6 +24,7 @@ def render_info_card(
     - key (str/None): 保留字段，当前未使用（为 v2 渲染版本预留）
     - with_title (bool): 是否显示主标题，默认为 True（内嵌卡片顶部）
     - subtitle (str/None): 副标题说明文本，可为空，不显示
+    - delta_label (str): 对比对象的名称，如 "前一日"、"上期"，用于差值文案
     - debug (bool): 是否输出调试信息，True 时将输出渲染参数到控制台
     """
 
@@ -39,17 +41,17 @@ def render_info_card(
         if delta > 0:
             delta_block = (
                 f"<div style='font-size:13px; color:#52c41a; margin-top:6px;'>"
-                f"与前一日相比 增加 {delta}{unit or ''}</div>"
+                f"与{delta_label}相比 增加 {delta}{unit or ''}</div>"
             )
         elif delta < 0:
             delta_block = (
                 f"<div style='font-size:13px; color:#f5222d; margin-top:6px;'>"
-                f"与前一日相比 减少 {abs(delta)}{unit or ''}</div>"
+                f"与{delta_label}相比 减少 {abs(delta)}{unit or ''}</div>"
             )
         else:
             delta_block = (
                 "<div style='font-size:13px; color:#999999; margin-top:6px;'>"
-                "与前一日持平</div>"
+                f"与{delta_label}持平</div>"
             )
 
     # ✅ 主标题块（根据 with_title 控制是否显示，建议包含图标）
@@ -3,7 +3,7 @@
 # utils/charts.py
 
 import plotly.express as px
-from utils_v1.theme import apply_chinese_font
+from utils_v1.theme import TEMPLATE_NAME
 
 
 '''
@@ -107,23 +107,27 @@ def draw_pie_chart(df, title=""):
 '''
 
 # 柱状图：展示各游戏的库存占比（渠道 / 平台）
+# df 通常来自 backend.inventory_by_game()（快照生成时预计算），含 库存占比 列，可选 在售商品数量 / 库存变化 / 售罄率
 def draw_bar_chart(df):
+    hover_cols = [c for c in ["在售商品数量", "库存变化", "售罄率"] if c in df.columns]
     fig = px.bar(
         df,
         x="游戏名称",            # 横轴是游戏名称
         y="库存占比",            # 纵轴是库存占比数值
         text="库存占比",         # 在柱子上显示具体数字
-        color="游戏名称"          # 每个柱子颜色不同（按游戏分）
+        color="游戏名称",         # 每个柱子颜色不同（按游戏分）
+        hover_data={c: (":.2%" if c == "售罄率" else True) for c in hover_cols},   # 悬停时显示其余库存指标
+        template=TEMPLATE_NAME   # 项目统一模板（中文字体）
     )
 
-    # 设置文字显示在柱子外部
-    fig.update_traces(textposition="outside")
+    # 设置文字显示在柱子外部，按百分比显示
+    fig.update_traces(textposition="outside", texttemplate="%{y:.1%}")
 
     # X轴标签防止太挤，自动旋转
     fig.update_xaxes(tickangle=-45)
 
     # Y轴设置 0 到 1.0（百分比），并限制小数点位数
-    fig.update_yaxes(range=[0, 1.05])
+    fig.update_yaxes(range=[0, 1.05], tickformat=".0%")
 
     fig.update_layout(
         showlegend=False,           # 不显示图例，已由X轴表示
@@ -131,4 +135,48 @@ def draw_bar_chart(df):
         margin=dict(l=20, r=20, t=40, b=40)
     )
 
-    return apply_chinese_font(fig)
\ No newline at end of file
+    return fig
+
+# 热力图：商户同期群留存（行 = 首次活跃日，列 = 第 N 天，颜色 = 留存率）
+# df 来自 backend.retention_cohorts()（快照生成时的活跃位图按位运算得到），NaN 表示尚无数据的格子
+def draw_cohort_heatmap(df):
+    day_cols = [c for c in df.columns if c.startswith("第")]
+    rates = df.set_index(df["首次活跃日"].dt.strftime("%m/%d") + "（" + df["新增商户"].astype(str) + " 家）")[day_cols]
+    fig = px.imshow(
+        rates,
+        zmin=0, zmax=1,
+        color_continuous_scale="Blues",
+        text_auto=".0%",                 # 格子内显示留存率
+        aspect="auto",
+        labels={"x": "首次活跃后", "y": "首次活跃日（新增商户）", "color": "留存率"},
+        template=TEMPLATE_NAME
+    )
+
+    fig.update_xaxes(side="top")
+    fig.update_coloraxes(colorbar_tickformat=".0%")
+    fig.update_layout(
+        height=max(300, 28 * len(rates) + 120),   # 行数随日期范围变化，按行数给高度
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+
+    return fig
+
+
+# 热力图：各游戏逐日指标（行 = 游戏，列 = 日期）
+# matrix 来自 backend.daily_matrix()（快照生成时的 (日期, 游戏) 矩阵切片）；key 与 v2 接口保持一致，Plotly 图由调用方渲染
+def draw_heatmap(matrix, metric="支付单量", key=None):
+    fig = px.imshow(
+        matrix.T.set_axis(matrix.index.strftime("%m/%d"), axis=1),
+        color_continuous_scale="YlOrRd",
+        aspect="auto",
+        labels={"x": "日期", "y": "游戏名称", "color": metric},
+        template=TEMPLATE_NAME
+    )
+
+    fig.update_xaxes(tickangle=-30, type="category")
+    fig.update_layout(
+        height=max(300, 22 * len(matrix.columns) + 110),   # 高度随游戏数变化
+        margin=dict(l=20, r=20, t=20, b=40)
+    )
+
+    return fig
@@ -3,10 +3,11 @@
 
 import plotly.express as px             # 导入 Plotly Express 模块，并简写为 px，用于绘图
 import pandas as pd                     # 导入 Pandas 数据分析库，并简写为 pd，用于数据处理
-from utils_v1.theme import apply_chinese_font, apply_plot_style             # 从 utils_v1/theme.py 文件中导入中文字体和风格函数，用于图表美化
+from utils_v1.theme import TEMPLATE_NAME                                   # 从 utils_v1/theme.py 导入项目统一的 Plotly 模板名（中文字体 + 配色，进程内只注册一次）
+from config.ratios import ratio_tickformat                                 # 比率的刻度 / 悬停格式（按有效数字，在售转化率只有万分之几）
 
 
-def draw_line_chart(df, y_col="支付单量", max_ticks=10):              # 定义一个函数，支持指定要绘制的数值列，默认绘制“支付单量”
+def draw_line_chart(df, y_col="支付单量", max_ticks=10, max_days=30, compare_df=None, compare_label="上期"):    # 定义一个函数，支持指定要绘制的数值列，默认绘制“支付单量”
     """
     📊 画一张横轴为“某种时间”、纵轴为“某个数值字段”的趋势折线图。
 
@@ -17,7 +18,8 @@ def draw_line_chart(df, y_col="支付单量", max_ticks=10):              # 定
 
     功能亮点：
     ✅ 自动补全日期（防止跳日期）
-    ✅ 若数据超过30天，仅展示近30天（避免横轴过长）
+    ✅ 若数据超过 max_days 天，仅展示最近 max_days 天（避免横轴过长；由日期选择器控制范围时可传 None 不截断）
+    ✅ 可叠加一条对比折线（如上一周期），虚线显示
     ✅ 横轴显示唯一日期（非重复）
     ✅ 鼠标提示清晰，含辅助线
     ✅ 图表风格统一，支持中文字体
@@ -27,16 +29,19 @@ def draw_line_chart(df, y_col="支付单量", max_ticks=10):              # 定
         df（DataFrame）：要求包含 'dt'（日期列）和要绘制的数值列（由 y_col 指定）
         y_col（str）：指定用于绘图的数值列名，默认是 '支付单量'
         max_ticks（int）：控制横轴最多显示的刻度数量，默认值为 10
+        max_days（int/None）：最多展示的天数，默认 30；None 表示不截断
+        compare_df（DataFrame/None）：对比数据（同样包含 'dt' 与 y_col），调用方需先把日期平移到本期对应的日期上
+        compare_label（str）：对比折线的名称，默认“上期”
     """
 
     # === ✅ 0. 日期预处理：确保 dt 为 datetime 类型 ===
-    df["dt"] = pd.to_datetime(df["dt"])  # 把“dt”列从字符串转换为 pandas 支持的 datetime 类型（datetime64[ns]），否则后续不能使用时间差、格式化、绘图等操作
+    df = df.assign(dt=pd.to_datetime(df["dt"]))  # 把“dt”列从字符串转换为 pandas 支持的 datetime 类型（datetime64[ns]），否则后续不能使用时间差、格式化、绘图等操作；assign 返回新表，入参视为只读（写时复制，其余列不拷贝）
 
 
-    # === ✅ 1. 如果时间跨度超过30天，只保留最近30天的数据 ===
-    if (df["dt"].max() - df["dt"].min()).days > 30:                 # 检查当前数据中的时间跨度是否超过30天（最大日期 - 最小日期），如果没超过则不做处理
-        cutoff_date = df["dt"].max() - pd.Timedelta(days=29)        # 如果超过30天，则以“最大日期 - 29天”作为起始时间，构造一个“最近30天”的截取时间点
-        df = df[df["dt"] >= cutoff_date].copy()                     # 筛选出“日期大于等于 cutoff_date”的所有数据行，并生成新副本（避免原表引用产生警告）
+    # === ✅ 1. 如果时间跨度超过 max_days 天，只保留最近 max_days 天的数据 ===
+    if max_days and (df["dt"].max() - df["dt"].min()).days > max_days:     # 检查当前数据中的时间跨度是否超过 max_days 天（最大日期 - 最小日期），如果没超过则不做处理
+        cutoff_date = df["dt"].max() - pd.Timedelta(days=max_days - 1)      # 如果超过，则以“最大日期 - (max_days-1) 天”作为起始时间，构造“最近 max_days 天”的截取时间点
+        df = df[df["dt"] >= cutoff_date]                            # 筛选出“日期大于等于 cutoff_date”的所有数据行（写时复制下无需 .copy()，后续不会写回原表）
 
 
     # === ✅ 2. 自动补全缺失日期，保证折线连续 ===
@@ -48,6 +53,11 @@ def draw_line_chart(df, y_col="支付单量", max_ticks=10):              # 定
     # === ✅ 3. 对缺失的数值列填 0，并确保为整数类型 ===
     df[y_col] = df[y_col].fillna(0).astype(int)  # # 将指定的数值列中缺失值填为 0，并转换为整数类型，避免绘图断线或报错
 
+    if compare_df is not None:                                                              # 对比数据按（已平移的）日期对齐到本期横轴上，缺失日期同样补 0
+        compare = compare_df.assign(dt=pd.to_datetime(compare_df["dt"]))[["dt", y_col]].rename(columns={y_col: compare_label})
+        df = pd.merge(df, compare, on="dt", how="left")
+        df[compare_label] = df[compare_label].fillna(0).astype(int)
+
 
     # === ✅ 4. 构造横轴字符串列，确保唯一、清晰 ===             # 确保图例是离散、唯一、可控的，比如 "05/01", "05/02" 等，不会重复、挤压
     df["日期"] = df["dt"].dt.strftime("%m/%d")                # 将 datetime 类型的 dt 列格式化为字符串（如 "04/29"），用于作为横轴标签，确保清晰且不重复
@@ -58,12 +68,13 @@ def draw_line_chart(df, y_col="支付单量", max_ticks=10):              # 定
         df,
         x="日期",
         y=y_col,
-        markers=True                    # 固定参数，控制是否显示 marker 点（圆点）
+        markers=True,                   # 固定参数，控制是否显示 marker 点（圆点）
+        template=TEMPLATE_NAME          # 创建时直接套用项目模板（中文字体 + 统一风格），无需事后逐项 update_layout
     )
 
 
     # === ✅ 6. Y 轴刻度适配策略（根据数据量智能处理）===
-    max_val = df[y_col].max()               # 获取当前数值列的最大值，用于判断刻度策略
+    max_val = max(df[y_col].max(), df[compare_label].max() if compare_df is not None else 0)    # 获取当前数值列（含对比线）的最大值，用于判断刻度策略
 
     if max_val <= 10:               # 数据较少时，设置步长为 1，防止出现小数刻度
         fig.update_yaxes(
@@ -99,13 +110,20 @@ def draw_line_chart(df, y_col="支付单量", max_ticks=10):              # 定
         hovertemplate=f"日期: %{{x}}<br>{y_col}: %{{y}} 单<extra></extra>"
     )
 
-
-    # === ✅ 9. 应用全局字体与风格样式（中文 + 项目统一化）===
-    fig = apply_chinese_font(fig)     # 中文字体支持
-    fig = apply_plot_style(fig)       # 项目配色统一样式
+    if compare_df is not None:          # 对比折线：虚线 + 图例，提示中标明为对比值
+        fig.update_traces(name=y_col, showlegend=True)
+        fig.add_scatter(
+            x=df["日期"],
+            y=df[compare_label],
+            mode="lines+markers",
+            name=compare_label,
+            line={"dash": "dot"},
+            hovertemplate=f"{compare_label}{y_col}: %{{y}} 单<extra></extra>"
+        )
+        fig.update_layout(legend={"orientation": "h", "y": 1.1, "title_text": None})
 
 
-    # === ✅ 10. 开启鼠标悬停时的垂直辅助线（crosshair）===
+    # === ✅ 9. 开启鼠标悬停时的垂直辅助线（crosshair）===
     fig.update_layout(
         hovermode="x unified"   # 沿 x 轴显示统一提示 + 辅助线
     )
@@ -114,6 +132,43 @@ def draw_line_chart(df, y_col="支付单量", max_ticks=10):              # 定
     return fig
 
 
+def draw_dual_axis_chart(df, bar_col="支付单量", rate_col="完结率", max_ticks=10):    # 双轴图：左轴为订单量（柱），右轴为比率（折线）
+    """
+    📊 双轴趋势图：左轴柱状显示数量（如“支付单量”），右轴折线显示比率（如“完结率”），两者共用日期横轴。
+
+    参数：
+        df（DataFrame）：包含 'dt'、bar_col、rate_col 三列，通常来自 config.ratios.ratio_by(backend, "dt", ...)
+        bar_col（str）：左轴数量列，默认 '支付单量'
+        rate_col（str）：右轴比率列（0~1 的小数），默认 '完结率'
+        max_ticks（int）：横轴最多显示的刻度数量
+    """
+    from plotly.subplots import make_subplots   # 仅双轴图用到，按需导入
+
+    df = df.assign(日期=pd.to_datetime(df["dt"]).dt.strftime("%m/%d"))    # 横轴为格式化后的日期字符串，入参视为只读
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])    # 创建带右侧副轴的画布
+    fig.add_bar(
+        x=df["日期"], y=df[bar_col], name=bar_col, opacity=0.6,
+        hovertemplate=f"{bar_col}: %{{y}} 单<extra></extra>"
+    )
+    fig.add_scatter(
+        x=df["日期"], y=df[rate_col], name=rate_col, mode="lines+markers",
+        hovertemplate=f"{rate_col}: %{{y:{ratio_tickformat(rate_col)}}}<extra></extra>",
+        secondary_y=True
+    )
+
+    fig.update_yaxes(title_text=bar_col, tickformat="d", rangemode="tozero", showline=True, secondary_y=False)
+    fig.update_yaxes(title_text=rate_col, tickformat=ratio_tickformat(rate_col), rangemode="tozero", showgrid=False,
+                     secondary_y=True)
+    fig.update_xaxes(title_text=None, tickangle=-30, showline=True, type="category", nticks=max_ticks)
+    fig.update_layout(
+        template=TEMPLATE_NAME,                                             # 项目统一模板
+        hovermode="x unified",
+        legend={"orientation": "h", "y": 1.1, "title_text": None}
+    )
+    return fig
+
+
 
 
 
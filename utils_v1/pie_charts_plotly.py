@@ -2,7 +2,7 @@
 
 import plotly.express as px
 import pandas as pd
-from utils_v1.theme import apply_chinese_font, apply_plot_style
+from utils_v1.theme import TEMPLATE_NAME
 
 
 def draw_pie_chart(df, value_col="支付单量", name_col="游戏名称", title=None, max_slices=10, key=None):
@@ -44,7 +44,8 @@ def draw_pie_chart(df, value_col="支付单量", name_col="游戏名称", title=
         values=value_col,
         names=name_col,
         title=title,
-        hole=0.3     # 设置为 0 表示普通饼图，>0 为环形图
+        hole=0.3,    # 设置为 0 表示普通饼图，>0 为环形图
+        template=TEMPLATE_NAME   # 项目统一模板（中文字体 + 配色风格）
     )
 
     # ✅ [步骤4] 优化图例与标签
@@ -62,7 +63,4 @@ def draw_pie_chart(df, value_col="支付单量", name_col="游戏名称", title=
         margin=dict(t=40, b=80)
     )
 
-    fig = apply_chinese_font(fig)               # 支持中文显示
-    fig = apply_plot_style(fig)                 # 应用统一配色风格
-
     return fig
\ No newline at end of file
@@ -1,6 +1,7 @@
 # utils_v2/card_charts_echarts.py
 
 from streamlit_echarts import st_echarts
+from config.chart_theme import ECHARTS_THEME
 
 def render_info_card(title: str, value, delta=None, unit=None, color="#1890ff", key=None):
     """
@@ -95,4 +96,4 @@ def render_info_card(title: str, value, delta=None, unit=None, color="#1890ff",
     }
 
     # ✅ 使用 streamlit_echarts 进行渲染
-    st_echarts(options=option, height="120px", key=key)
\ No newline at end of file
+    st_echarts(options=option, height="120px", theme=ECHARTS_THEME, key=key)
\ No newline at end of file
@@ -0,0 +1,73 @@
+# utils_v2/heatmap_echarts.py
+
+import numpy as np
+import pandas as pd
+from streamlit_echarts import st_echarts
+from config.chart_theme import ECHARTS_THEME
+
+
+def draw_heatmap(matrix: pd.DataFrame, metric="支付单量", key=None):
+    """
+    🗓️ 使用 ECharts 渲染 游戏 × 日期 热力图
+
+    功能特性：
+    ✅ 数据来自 backend.daily_matrix()：快照生成时维护的 (日期, 游戏) 稠密矩阵切片，不在明细上做透视
+    ✅ 只发送有数据的格子，按 [日期下标, 游戏下标, 数值] 的整数三元组传给浏览器
+    ✅ visualMap 可拖动：调整颜色区间 / 高亮范围在浏览器内完成，不触发 rerun
+
+    参数说明：
+    - matrix: 宽表，index 为 dt，columns 为 游戏名称，无数据的格子为 NaN
+    - metric: 指标名称（系列名称，显示在悬浮提示中）
+    - key: Streamlit 渲染用唯一标识
+    """
+
+    # === 1. 稠密矩阵 → 紧凑三元组（跳过 NaN，数值转为 Python 原生 int） ===
+    values = matrix.to_numpy(dtype="float64")
+    day_idx, game_idx = np.nonzero(~np.isnan(values))
+    data = np.column_stack([day_idx, game_idx, values[day_idx, game_idx]]).astype(np.int64).tolist()
+    max_value = max(1, int(np.nanmax(values))) if data else 1
+
+    # === 2. 构建 ECharts 配置项 ===
+    options = {
+        "tooltip": {"position": "top"},
+        "grid": {"left": 110, "right": 20, "top": 10, "bottom": 90},
+        "xAxis": {
+            "type": "category",
+            "data": [d.strftime("%m/%d") for d in pd.to_datetime(matrix.index)],
+            "splitArea": {"show": True},
+            "axisLabel": {"rotate": 30},
+        },
+        "yAxis": {
+            "type": "category",
+            "data": [str(g) for g in matrix.columns],
+            "splitArea": {"show": True},
+        },
+        "visualMap": {
+            "type": "continuous",
+            "min": 0,
+            "max": max_value,
+            "calculable": True,      # ✅ 显示拖动手柄：浏览器内重新着色
+            "orient": "horizontal",
+            "left": "center",
+            "bottom": 0,
+        },
+        "series": [
+            {
+                "name": metric,
+                "type": "heatmap",
+                "data": data,
+                "emphasis": {
+                    "itemStyle": {"shadowBlur": 10, "shadowColor": "rgba(0, 0, 0, 0.5)"}
+                },
+                "progressive": 0,    # 格子数较多时也一次绘制完成
+            }
+        ],
+    }
+
+    # === 3. 渲染图表：高度随游戏数变化 ===
+    st_echarts(
+        options=options,
+        height=f"{max(300, 22 * len(matrix.columns) + 110)}px",
+        theme=ECHARTS_THEME,
+        key=key,
+    )
@@ -2,31 +2,35 @@
 
 import plotly.express as px
 import pandas as pd
-from utils_v2.theme import apply_chinese_font, apply_plot_style
+from config.chart_theme import TEMPLATE_NAME
+from config.ratios import format_ratio, ratio_tickformat
 
 
-def draw_line_chart(df, max_ticks=10):
+def draw_line_chart(df, max_ticks=10, max_days=None, compare_df=None, compare_label="上期"):
     """
-    📊 [v2] 高阶折线图封装（预留未来增强逻辑）
+    📊 [v2] 支付单量趋势折线图
 
-    功能目标（计划）：
-    ✅ 支持多游戏对比折线图（颜色区分）
-    ✅ 可配置单位、图例位置、自定义 Tooltip
-    ✅ 支持双轴（如订单量 vs 转化率）
-    ✅ 响应更复杂的数据结构（按 game_id 分组等）
+    已实现：
+    ✅ 单条支付单量折线（统一模板、中文字体、横轴按日期分类）
+    ✅ 上期对比虚线（compare_df，按本期日期对齐，缺失补 0）
+    ✅ 双轴（订单量 vs 比率）见 draw_dual_axis_chart
 
-    当前状态：
-    🚧 功能占位中，保留接口，仅实现基础结构。
+    计划：
+    🔜 多游戏对比折线（颜色区分）
+    🔜 可配置单位、图例位置、自定义 Tooltip
+
+    max_days：与 v1 接口保持一致，当前不截断（按传入的日期范围完整展示）
+    compare_df：可选的对比数据（'dt' 已平移到本期日期），以虚线叠加显示
     """
 
-    # === 🚧 占位实现（当前保持最小结构，后续逐步扩展）===
-    df["日期"] = df["dt"].dt.strftime("%m/%d")
+    df = df.assign(日期=df["dt"].dt.strftime("%m/%d"))     # ✅ 入参视为只读，新增列生成新表
 
     fig = px.line(
         df,
         x="日期",
         y="支付单量",
-        markers=True
+        markers=True,
+        template=TEMPLATE_NAME      # ✅ 与 v1 共用项目模板
     )
 
     fig.update_yaxes(
@@ -49,8 +53,53 @@ def draw_line_chart(df, max_ticks=10):
         hovertemplate="日期: %{x}<br>支付单量: %{y} 单<extra></extra>"
     )
 
+    if compare_df is not None:
+        # ✅ 与 v1 一致：对比数据按（已平移的）日期对齐到本期横轴，本期有而上期缺失的日期补 0
+        compare = pd.merge(
+            df[["dt", "日期"]],
+            compare_df.assign(dt=pd.to_datetime(compare_df["dt"]))[["dt", "支付单量"]],
+            on="dt", how="left",
+        )
+        compare["支付单量"] = compare["支付单量"].fillna(0).astype(int)
+        fig.update_traces(name="支付单量", showlegend=True)
+        fig.add_scatter(
+            x=compare["日期"],
+            y=compare["支付单量"],
+            mode="lines+markers",
+            name=compare_label,
+            line={"dash": "dot"},
+            hovertemplate=f"{compare_label}支付单量: %{{y}} 单<extra></extra>"
+        )
+
     fig.update_layout(hovermode="x unified")
-    fig = apply_chinese_font(fig)
-    fig = apply_plot_style(fig)
 
-    return fig
\ No newline at end of file
+    return fig
+
+
+def draw_dual_axis_chart(df, bar_col="支付单量", rate_col="完结率", max_ticks=10):
+    """
+    📊 [v2] 双轴图：订单量（柱，左轴）vs 比率（折线，右轴，如完结率 / 在售转化率）。
+
+    df 需包含 'dt'、bar_col、rate_col；比率由调用方按分子、分母之和计算好（见 config.ratios）。
+    """
+    from plotly.subplots import make_subplots
+
+    df = df.assign(日期=pd.to_datetime(df["dt"]).dt.strftime("%m/%d"))
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_bar(x=df["日期"], y=df[bar_col], name=bar_col,
+                text=df[bar_col], textposition="outside",       # ✅ v2：柱顶直接标注数量
+                hovertemplate=f"{bar_col}: %{{y}} 单<extra></extra>")
+    fig.add_scatter(x=df["日期"], y=df[rate_col], name=rate_col, mode="lines+markers+text",
+                    text=[format_ratio(v, rate_col) for v in df[rate_col]], textposition="top center",
+                    line={"width": 3},
+                    hovertemplate=f"{rate_col}: %{{y:{ratio_tickformat(rate_col)}}}<extra></extra>",
+                    secondary_y=True)
+
+    fig.update_yaxes(title_text=bar_col, tickformat="d", rangemode="tozero", secondary_y=False)
+    fig.update_yaxes(title_text=rate_col, tickformat=ratio_tickformat(rate_col), rangemode="tozero", showgrid=False,
+                     secondary_y=True)
+    fig.update_xaxes(title_text=None, tickangle=-30, type="category", nticks=max_ticks)
+    fig.update_layout(template=TEMPLATE_NAME, hovermode="x unified",
+                      legend={"orientation": "h", "y": 1.12, "title_text": None})
+    return fig
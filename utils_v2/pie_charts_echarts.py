@@ -113,6 +113,7 @@ def draw_pie_chart(df: pd.DataFrame, max_slices: int = 10):
 
 from streamlit_echarts import st_echarts
 import pandas as pd
+from config.chart_theme import ECHARTS_THEME
 
 def draw_pie_chart(df: pd.DataFrame, key=None):  # ✅ 加 key
     """
@@ -137,12 +138,13 @@ def draw_pie_chart(df: pd.DataFrame, key=None):  # ✅ 加 key
         ], ignore_index=True)
 
     # === 2. 转换为 ECharts 所需的 data 格式（字典数组） ===
+    # ✅ 按列 tolist() 取出 Python 原生值（兼容 Arrow 字符串列 / numpy 整数，无需逐行 iterrows）
     pie_data = [
         {
-            "name": row["游戏名称"],      # 扇形标签
-            "value": row["支付单量"]      # 扇形的值（用于占比计算）
+            "name": name,                 # 扇形标签
+            "value": value                # 扇形的值（用于占比计算）
         }
-        for _, row in top_df.iterrows()
+        for name, value in zip(top_df["游戏名称"].tolist(), top_df["支付单量"].tolist())
     ]
 
     # === 3. 构建 ECharts 配置项 ===
@@ -185,6 +187,7 @@ def draw_pie_chart(df: pd.DataFrame, key=None):  # ✅ 加 key
     st_echarts(
         options=options,
         height="420px",  # 图表高度
+        theme=ECHARTS_THEME,  # ✅ 项目统一主题（字体 / 配色与 v1 Plotly 模板一致）
         key = key  # ✅ Streamlit 必需的图表唯一标识
     )
 